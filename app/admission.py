@@ -0,0 +1,94 @@
+# admission.py
+"""
+Admission control for ws_server.
+
+- MAX_ACTIVE_SESSIONS caps concurrent callers per process; extra callers get a
+  "busy" message (plus optional hold audio) and are closed with 1013.
+- Each heavy stage (ASR / TTS) runs in the thread pool behind a
+  StageLimiter: at most <STAGE>_CONCURRENCY jobs run, at most
+  <STAGE>_MAX_QUEUE wait, and nobody waits longer than STAGE_QUEUE_TIMEOUT.
+  Anything beyond that raises Busy instead of slowing down every caller.
+  ws_server's replies come from LeadQualification, not the LLM, so there is
+  no LLM stage.
+"""
+import asyncio
+import base64
+import functools
+import os
+
+from config import (
+    ASR_CONCURRENCY, ASR_MAX_QUEUE,
+    TTS_CONCURRENCY, TTS_MAX_QUEUE,
+    STAGE_QUEUE_TIMEOUT, HOLD_AUDIO_FILE,
+)
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class Busy(Exception):
+    def __init__(self, stage: str):
+        super().__init__(f"{stage} stage is at capacity")
+        self.stage = stage
+
+
+class StageLimiter:
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float = STAGE_QUEUE_TIMEOUT):
+        self.name = name
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.running = 0
+        self._slots = asyncio.Semaphore(concurrency)
+
+    def has_free_slot(self) -> bool:
+        """
+        True if a job started now would run right away (used for optional work).
+        """
+        return self.waiting == 0 and not self._slots.locked()
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Runs a blocking func(*args) in the default executor once a slot is free.
+        """
+        if self.waiting >= self.max_queue:
+            raise Busy(self.name)
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise Busy(self.name)
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+
+STAGES = {
+    "asr": StageLimiter("asr", ASR_CONCURRENCY, ASR_MAX_QUEUE),
+    "tts": StageLimiter("tts", TTS_CONCURRENCY, TTS_MAX_QUEUE),
+}
+
+_hold_audio_b64 = None
+
+
+def hold_audio_b64():
+    """
+    Base64 WAV played to callers we can't serve right now (None if not configured).
+    """
+    global _hold_audio_b64
+    if _hold_audio_b64 is None and HOLD_AUDIO_FILE:
+        try:
+            with open(HOLD_AUDIO_FILE, "rb") as f:
+                _hold_audio_b64 = base64.b64encode(f.read()).decode("utf-8")
+        except OSError as e:
+            logger.warning("⚠️ Could not load hold audio %s: %s", os.path.abspath(HOLD_AUDIO_FILE), e)
+            _hold_audio_b64 = ""
+    return _hold_audio_b64 or None
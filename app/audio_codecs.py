@@ -0,0 +1,144 @@
+# audio_codecs.py
+"""
+Per-connection audio codecs for the browser <-> server link.
+
+- pcm_s16le / pcm_f32le: raw PCM (no compression)
+- mulaw / alaw: G.711, 8 bits per sample, numpy lookup tables (no dependencies)
+- opus: only when `opuslib` (and libopus) is installed; one packet per
+  20 ms frame, carried as a list of base64 packets
+
+decode() takes one chunk/packet and returns int16 of shape (n, channels);
+encode() takes mono int16 and returns bytes (or a list of packets for opus).
+"""
+import numpy as np
+
+from audio_format import PCM_ENCODINGS, decode_pcm
+
+try:
+    import opuslib
+except Exception:  # ImportError, or OSError when libopus itself is missing
+    opuslib = None
+
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+OPUS_FRAME_MS = 20
+
+
+# ====================== G.711 TABLES ======================
+def _mulaw_tables():
+    # decode: 256 codes -> int16
+    u = ~np.arange(256, dtype=np.uint8)
+    t = ((u & 0x0F).astype(np.int32) << 3) + 0x84
+    t <<= (u & 0x70).astype(np.int32) >> 4
+    decode = np.where(u & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+    # encode: every int16 value (indexed as uint16) -> code
+    # (14-bit variant from the reference g711.c, same output as audioop.lin2ulaw)
+    x = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    x = np.minimum(np.abs(x), 8159) + 0x21
+    seg_end = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+    seg = np.searchsorted(seg_end, x)
+    uval = (np.minimum(seg, 7) << 4) | ((x >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    encode = ((uval ^ mask) & 0xFF).astype(np.uint8)
+    return encode, decode
+
+
+def _alaw_tables():
+    a = np.arange(256, dtype=np.int32) ^ 0x55
+    seg = (a & 0x70) >> 4
+    t = (a & 0x0F) << 4
+    t = np.where(seg == 0, t + 8, (t + 0x108) << np.maximum(seg - 1, 0))
+    decode = np.where(a & 0x80, t, -t).astype(np.int16)
+
+    x = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32) >> 3
+    mask = np.where(x >= 0, 0xD5, 0x55)
+    x = np.where(x >= 0, x, -x - 1)
+    seg_end = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+    seg = np.searchsorted(seg_end, x)
+    shift = np.where(seg < 2, 1, seg)
+    aval = (np.minimum(seg, 7) << 4) | ((x >> shift) & 0x0F)
+    aval = np.where(seg >= 8, 0x7F, aval)
+    encode = ((aval ^ mask) & 0xFF).astype(np.uint8)
+    return encode, decode
+
+
+_G711 = {}
+
+
+def _g711(name: str):
+    if name not in _G711:
+        _G711[name] = _mulaw_tables() if name == "mulaw" else _alaw_tables()
+    return _G711[name]
+
+
+# ====================== CODECS ======================
+class PcmCodec:
+    def __init__(self, encoding: str, channels: int = 1):
+        self.name = encoding
+        self.channels = channels
+
+    def decode(self, data: bytes) -> np.ndarray:
+        return decode_pcm(data, self.name, self.channels)
+
+    def encode(self, pcm: np.ndarray) -> bytes:
+        if self.name == "pcm_f32le":
+            return (pcm.astype("<f4") / 32768.0).tobytes()
+        return pcm.astype("<i2").tobytes()
+
+
+class G711Codec:
+    def __init__(self, name: str, channels: int = 1):
+        self.name = name
+        self.channels = channels
+        self._encode, self._decode = _g711(name)
+
+    def decode(self, data: bytes) -> np.ndarray:
+        codes = np.frombuffer(data, dtype=np.uint8)
+        usable = len(codes) - len(codes) % self.channels
+        return self._decode[codes[:usable]].reshape(-1, self.channels)
+
+    def encode(self, pcm: np.ndarray) -> bytes:
+        return self._encode[pcm.astype(np.int16).view(np.uint16)].tobytes()
+
+
+class OpusCodec:
+    def __init__(self, sample_rate: int, channels: int = 1):
+        if opuslib is None:
+            raise ValueError("opus is not available on this server")
+        if sample_rate not in OPUS_SAMPLE_RATES:
+            raise ValueError(f"opus does not support {sample_rate} Hz")
+        self.name = "opus"
+        self.channels = channels
+        self.frame_samples = sample_rate * OPUS_FRAME_MS // 1000
+        self._decoder = opuslib.Decoder(sample_rate, channels)
+        self._encoder = None
+        self._sample_rate = sample_rate
+
+    def decode(self, packet: bytes) -> np.ndarray:
+        # Decoder state carries over between packets (streaming)
+        pcm = self._decoder.decode(bytes(packet), self.frame_samples * 6)
+        return np.frombuffer(pcm, dtype="<i2").reshape(-1, self.channels)
+
+    def encode(self, pcm: np.ndarray) -> list:
+        if self._encoder is None:
+            self._encoder = opuslib.Encoder(self._sample_rate, 1, opuslib.APPLICATION_VOIP)
+        n = self.frame_samples
+        padded = np.zeros(-(-len(pcm) // n) * n, dtype="<i2")
+        padded[:len(pcm)] = pcm
+        return [self._encoder.encode(padded[i:i + n].tobytes(), n) for i in range(0, len(padded), n)]
+
+
+def available_codecs() -> list:
+    codecs = ["mulaw", "alaw"] + sorted(PCM_ENCODINGS)
+    return (["opus"] + codecs) if opuslib is not None else codecs
+
+
+def create_codec(name: str, sample_rate: int, channels: int = 1):
+    if name in PCM_ENCODINGS:
+        return PcmCodec(name, channels)
+    if name in ("mulaw", "alaw"):
+        return G711Codec(name, channels)
+    if name == "opus":
+        return OpusCodec(sample_rate, channels)
+    raise ValueError(f"Unsupported codec: {name}")
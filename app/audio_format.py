@@ -0,0 +1,144 @@
+# audio_format.py
+"""
+Turns whatever the client sends into the pipeline's format: 16 kHz mono int16.
+
+- decode_wav:       any PCM WAV (8/16/24/32-bit, any rate, any channel count)
+- encode_wav:       mono int16 or float samples -> 16-bit WAV bytes
+- downmix:          (n, channels) -> mono
+- PolyphaseResampler: streaming rational resampler (windowed-sinc polyphase
+  filter, numpy only), so chunks can be converted as they arrive.
+"""
+import io
+import wave
+from math import gcd
+
+import numpy as np
+
+PIPELINE_SAMPLE_RATE = 16000
+
+# Encodings a client may declare in its "hello" message for streamed chunks
+PCM_ENCODINGS = {"pcm_s16le": np.dtype("<i2"), "pcm_f32le": np.dtype("<f4")}
+
+
+def decode_wav(audio_bytes: bytes):
+    """
+    Returns (samples, sample_rate) with samples as int16 of shape (n, channels).
+    """
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+
+    if width == 2:
+        samples = np.frombuffer(raw, dtype="<i2")
+    elif width == 1:
+        samples = ((np.frombuffer(raw, dtype=np.uint8).astype(np.int16) - 128) << 8)
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        samples = (b[:, 1].astype(np.int16) | (b[:, 2].astype(np.int8).astype(np.int16) << 8))
+    elif width == 4:
+        samples = (np.frombuffer(raw, dtype="<i4") >> 16).astype(np.int16)
+    else:
+        raise wave.Error(f"Unsupported sample width: {width} bytes")
+
+    return samples.reshape(-1, channels), rate
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> bytes:
+    """
+    Mono samples (int16, or float in [-1, 1]) -> 16-bit PCM WAV bytes.
+    """
+    samples = np.asarray(samples)
+    if samples.dtype.kind == "f":
+        samples = np.clip(samples, -1.0, 1.0) * 32767
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def decode_pcm(raw: bytes, encoding: str, channels: int) -> np.ndarray:
+    """
+    Raw interleaved PCM chunk -> int16 of shape (n, channels).
+    """
+    samples = np.frombuffer(raw, dtype=PCM_ENCODINGS[encoding])
+    if samples.dtype.kind == "f":
+        samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels)
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    if samples.ndim == 1 or samples.shape[1] == 1:
+        return samples.reshape(-1)
+    return samples.mean(axis=1, dtype=np.float32).astype(np.int16)
+
+
+class PolyphaseResampler:
+    def __init__(self, src_rate: int, dst_rate: int = PIPELINE_SAMPLE_RATE, taps_per_phase: int = 32):
+        """
+        Streaming resampler by the rational factor dst_rate / src_rate.
+        Call process() with consecutive mono int16 chunks; state (filter
+        history and phase) carries over between calls.
+        """
+        g = gcd(src_rate, dst_rate)
+        self.up = dst_rate // g
+        self.down = src_rate // g
+        self.passthrough = self.up == self.down
+
+        # Anti-aliasing low-pass at the upsampled rate, split into `up` phases
+        taps = self.up * taps_per_phase
+        cutoff = 0.5 / max(self.up, self.down) * 0.95
+        t = np.arange(taps) - (taps - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(taps, 8.0) * self.up
+        # phases[p, k] = h[p + k*up]; reversed so it lines up with a forward input window
+        self.phases = h.reshape(taps_per_phase, self.up).T[:, ::-1].astype(np.float32)
+        self.width = taps_per_phase
+
+        self.history = np.zeros(self.width - 1, dtype=np.float32)
+        self.consumed = 0   # input samples seen so far
+        self.produced = 0   # output samples emitted so far
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if self.passthrough:
+            return chunk.astype(np.int16, copy=False)
+
+        x = np.concatenate((self.history, chunk.astype(np.float32)))
+        start = self.consumed - (self.width - 1)  # absolute index of x[0]
+        self.consumed += len(chunk)
+
+        # Every output m whose newest input sample (m*down // up) has arrived
+        last = (self.consumed * self.up - 1) // self.down
+        m = np.arange(self.produced, last + 1)
+        self.produced = last + 1
+        self.history = x[len(x) - (self.width - 1):]
+        if len(m) == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        pos = m * self.down
+        newest = pos // self.up - start
+        windows = np.lib.stride_tricks.sliding_window_view(x, self.width)[newest - (self.width - 1)]
+        y = np.einsum("ij,ij->i", windows, self.phases[pos % self.up])
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+
+    def flush(self) -> np.ndarray:
+        if self.passthrough:
+            return np.zeros(0, dtype=np.int16)
+        # Push the filter tail out with silence
+        return self.process(np.zeros(self.width // 2, dtype=np.int16))
+
+
+def to_pipeline_pcm(samples: np.ndarray, sample_rate: int) -> np.ndarray:
+    """
+    One-shot conversion of a whole clip to 16 kHz mono int16.
+    """
+    mono = downmix(samples)
+    if sample_rate == PIPELINE_SAMPLE_RATE:
+        return mono
+    resampler = PolyphaseResampler(sample_rate)
+    out = resampler.process(mono)
+    return np.concatenate((out, resampler.flush()))
@@ -0,0 +1,44 @@
+# barge_in.py
+import threading
+
+from vad_utils import VADDetector
+from config import BARGE_IN_MIN_FRAMES, BARGE_IN_VAD_AGGRESSIVENESS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BargeInMonitor:
+    def __init__(self, capture, min_speech_frames: int = BARGE_IN_MIN_FRAMES):
+        """
+        Keeps VAD running on the microphone (a CaptureEngine) while the agent
+        is talking. Uses a stricter VAD than normal capture so speaker echo
+        rarely triggers it (a headset or OS echo cancellation still helps).
+        """
+        self.capture = capture
+        self.vad = VADDetector(aggressiveness=BARGE_IN_VAD_AGGRESSIVENESS)
+        self.min_speech_frames = min_speech_frames
+
+    def watch(self, done: threading.Event, stop_event: threading.Event):
+        """
+        Blocks until `done` is set or the caller starts speaking. On speech,
+        sets `stop_event` (cancels synthesis/playback) and returns the capture
+        position where that speech began, so the next recording starts there.
+        Returns None if the agent finished uninterrupted.
+        """
+        run_start, run = None, 0
+        for pos, frame in self.capture.frames():
+            if done.is_set():
+                return None
+
+            if not self.vad.is_speech(frame.tobytes(), self.capture.sample_rate):
+                run_start, run = None, 0
+                continue
+
+            if run_start is None:
+                run_start = pos
+            run += 1
+            if run >= self.min_speech_frames:
+                stop_event.set()
+                logger.info("✋ Barge-in detected — stopping agent speech")
+                return run_start
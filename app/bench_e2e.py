@@ -0,0 +1,314 @@
+# bench_e2e.py
+"""
+Offline end-to-end benchmark of ws_server.
+
+Starts the provider stand-ins (bench_standins.py) and a ws_server pointed at
+them, then replays a corpus of WAV utterances from N concurrent simulated
+callers over the real websocket protocol (test_ws_client.send_wav). Whisper
+runs for real, as configured in config.py.
+
+    python bench_e2e.py --corpus ./utterances --callers 1,4,8 --turns 5
+    python bench_e2e.py --corpus a.wav b.wav --url ws://localhost:8765   # existing server
+    python bench_e2e.py --corpus ./utterances --framing batch            # coalesced frames, binary audio
+
+Reports, per concurrency level:
+- client view: time from sending an utterance to user_text (ASR done),
+  agent_text and tts_audio (end to end), as p50/p95/p99, and bytes received per turn
+- server view: per-stage percentiles from the TurnTrace records (tracing.py),
+  plus per-turn counters (bytes_sent, encode_cpu_ms)
+- throughput and sessions per core (highest level whose e2e p95 meets --slo-ms)
+
+Results go to a JSON file (default bench_results/<timestamp>.json) with the
+git revision, so runs can be compared between versions.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import websockets
+
+from bench_standins import start_standins
+from test_ws_client import send_wav
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_corpus(paths: list) -> list:
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, "*.wav"))) if os.path.isdir(path) else [path])
+    if not files:
+        sys.exit("No WAV files in the corpus")
+    corpus = []
+    for path in files:
+        with open(path, "rb") as f:
+            corpus.append(f.read())
+    return corpus
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"n": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(values), "p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1),
+            "max": round(max(values), 1)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], cwd=APP_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+# ====================== SIMULATED CALLER ======================
+class Receiver:
+    """
+    Events from the server one at a time, whatever the framing: batches are
+    unpacked, and a {"binary": true} "tts_audio" is only returned once its
+    binary frame arrived. Counts the bytes received.
+    """
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.events = []
+        self.bytes = 0
+
+    async def recv(self, timeout: float) -> dict:
+        while not self.events:
+            frame = await asyncio.wait_for(self.ws.recv(), timeout)
+            self.bytes += len(frame)
+            if isinstance(frame, bytes):
+                continue  # audio of a "tts_audio" already returned
+            msg = json.loads(frame)
+            self.events = msg["events"] if msg.get("type") == "batch" else [msg]
+        msg = self.events.pop(0)
+        if msg.get("type") == "tts_audio" and msg.get("binary"):
+            frame = await asyncio.wait_for(self.ws.recv(), timeout)
+            self.bytes += len(frame)
+        return msg
+
+
+async def caller(url: str, corpus: list, offset: int, turns: int, think_s: float, timeout: float,
+                 framing: str = "json") -> list:
+    """
+    One call: waits for the greeting, then sends `turns` utterances and
+    times the replies. Returns one dict per turn.
+    """
+    results = []
+    async with websockets.connect(url, max_size=None) as ws:
+        receiver = Receiver(ws)
+        if framing != "json":
+            await ws.send(json.dumps({"type": "hello", "framing": framing}))
+
+        # Greeting: wait until its audio arrived
+        while (await receiver.recv(timeout)).get("type") != "tts_audio":
+            pass
+
+        for i in range(turns):
+            sent = time.perf_counter()
+            received = receiver.bytes
+            await send_wav(ws, corpus[(offset + i) % len(corpus)])
+            turn = {"outcome": "timeout"}
+            try:
+                while True:
+                    msg = await receiver.recv(timeout)
+                    at = round((time.perf_counter() - sent) * 1000, 1)
+                    kind = msg.get("type")
+                    if kind == "user_text":
+                        turn["asr_ms"] = at
+                    elif kind == "agent_text":
+                        turn["reply_text_ms"] = at
+                    elif kind == "tts_audio":
+                        turn.update(outcome="ok", e2e_ms=at)
+                        break
+                    elif kind in ("vad", "busy", "error"):
+                        turn["outcome"] = msg.get("value") or kind
+                        break
+            except asyncio.TimeoutError:
+                pass
+            turn["bytes"] = receiver.bytes - received
+            results.append(turn)
+            # Leftovers of this turn (agent_speaking, lead, state) are ignored by the next one
+            await asyncio.sleep(think_s)
+    return results
+
+
+async def run_level(url: str, corpus: list, callers: int, turns: int, think_s: float, timeout: float,
+                    framing: str = "json"):
+    tasks = [caller(url, corpus, i, turns, think_s, timeout, framing) for i in range(callers)]
+    started = time.perf_counter()
+    per_caller = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    turns_done, failures = [], 0
+    for result in per_caller:
+        if isinstance(result, Exception):
+            failures += 1
+        else:
+            turns_done.extend(result)
+    return turns_done, failures, elapsed
+
+
+# ====================== SERVER SIDE ======================
+def start_server(standin_url: str, port: int, trace_file: str, max_sessions: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WS_HOST="127.0.0.1",
+        WS_PORT=str(port),
+        METRICS_PORT="0",
+        TRACE_FILE=trace_file,
+        TRACE_SUMMARY_EVERY="0",
+        OLLAMA_API_URL=standin_url,
+        ELEVENLABS_BASE_URL=standin_url,
+        ELEVENLABS_OUTPUT_FORMAT="pcm_22050",
+        ELEVENLABS_API_KEY=os.environ.get("ELEVENLABS_API_KEY", "bench"),
+        MAX_ACTIVE_SESSIONS=str(max_sessions),
+        TTS_CACHE_MAX_BYTES=os.environ.get("TTS_CACHE_MAX_BYTES", "0"),  # measure synthesis, not the cache
+    )
+    return subprocess.Popen([sys.executable, "ws_server.py"], cwd=APP_DIR, env=env)
+
+
+def wait_for_port(port: int, proc: subprocess.Popen, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            sys.exit(f"ws_server exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.5)
+    sys.exit("ws_server did not start listening in time")
+
+
+def server_stages(trace_file: str, since: float) -> dict:
+    """
+    Per-stage percentiles (ms) from the TurnTrace records written after `since`
+    (counters, e.g. bytes_sent, in their own unit).
+    """
+    stages = {}
+    if not trace_file or not os.path.exists(trace_file):
+        return stages
+    with open(trace_file, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("ts", 0) < since:
+                continue
+            for name, (begin, end) in record.get("spans", {}).items():
+                stages.setdefault(name, []).append(end - begin)
+            for name, at in record.get("marks", {}).items():
+                stages.setdefault(name, []).append(at)
+            for name, value in record.get("counters", {}).items():
+                stages.setdefault(name, []).append(value)
+            stages.setdefault("turn", []).append(record.get("total_ms", 0))
+    return {name: percentiles(values) for name, values in sorted(stages.items())}
+
+
+# ====================== MAIN ======================
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of ws_server")
+    parser.add_argument("--corpus", nargs="+", required=True, help="WAV files and/or directories of WAVs")
+    parser.add_argument("--callers", default="1,4", help="comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=4, help="utterances per caller")
+    parser.add_argument("--think-ms", type=float, default=300, help="pause between a reply and the next utterance")
+    parser.add_argument("--timeout", type=float, default=60, help="seconds to wait for any server message")
+    parser.add_argument("--slo-ms", type=float, default=1500, help="e2e p95 target for sessions-per-core")
+    parser.add_argument("--framing", choices=("json", "batch"), default="json",
+                        help="framing the callers ask for in hello (see framing.py)")
+    parser.add_argument("--url", help="benchmark an already running server (no stand-ins, no server traces)")
+    parser.add_argument("--llm-first-token-ms", type=float, default=150)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=250)
+    parser.add_argument("--tts-rtf", type=float, default=0.1)
+    parser.add_argument("--out", help="results JSON (default bench_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    levels = [int(n) for n in args.callers.split(",") if n.strip()]
+
+    proc, trace_file, url = None, None, args.url
+    if url is None:
+        standins = start_standins(llm_first_token_ms=args.llm_first_token_ms, llm_token_ms=args.llm_token_ms,
+                                  tts_first_byte_ms=args.tts_first_byte_ms, tts_rtf=args.tts_rtf)
+        standin_url = f"http://127.0.0.1:{standins.server_address[1]}"
+        port = free_port()
+        trace_file = os.path.join(tempfile.mkdtemp(prefix="bench_e2e_"), "traces.jsonl")
+        proc = start_server(standin_url, port, trace_file, max(levels) + 1)
+        wait_for_port(port, proc)
+        url = f"ws://127.0.0.1:{port}"
+
+    cores = os.cpu_count() or 1
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cores": cores,
+        "config": {k: v for k, v in vars(args).items() if k != "out"} | {"corpus_files": len(corpus)},
+        "levels": [],
+    }
+
+    try:
+        for callers in levels:
+            since = time.time()
+            turns, failures, elapsed = asyncio.run(
+                run_level(url, corpus, callers, args.turns, args.think_ms / 1000, args.timeout, args.framing)
+            )
+            time.sleep(0.5)  # let the server's log writer catch up
+            ok = [t for t in turns if t["outcome"] == "ok"]
+            outcomes = {}
+            for t in turns:
+                outcomes[t["outcome"]] = outcomes.get(t["outcome"], 0) + 1
+
+            level = {
+                "callers": callers,
+                "failed_callers": failures,
+                "turns": len(turns),
+                "outcomes": outcomes,
+                "turns_per_second": round(len(ok) / elapsed, 2) if elapsed else 0,
+                "client_ms": {
+                    "asr": percentiles([t["asr_ms"] for t in ok if "asr_ms" in t]),
+                    "reply_text": percentiles([t["reply_text_ms"] for t in ok if "reply_text_ms" in t]),
+                    "e2e": percentiles([t["e2e_ms"] for t in ok]),
+                },
+                "client_bytes": percentiles([t["bytes"] for t in ok]),
+                "server_ms": server_stages(trace_file, since),
+            }
+            results["levels"].append(level)
+            e2e = level["client_ms"]["e2e"]
+            print(f"{callers:4d} callers: {len(ok)}/{len(turns)} ok, e2e p50 {e2e.get('p50', '-')} ms, "
+                  f"p95 {e2e.get('p95', '-')} ms, {level['turns_per_second']} turns/s")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    passing = [lv["callers"] for lv in results["levels"]
+               if lv["client_ms"]["e2e"].get("p95", float("inf")) <= args.slo_ms and not lv["failed_callers"]]
+    results["sessions_per_core"] = round(max(passing) / cores, 2) if passing else 0
+
+    out = args.out or os.path.join(APP_DIR, "bench_results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"sessions/core at p95 <= {args.slo_ms:.0f} ms: {results['sessions_per_core']}  →  {out}")
+
+
+if __name__ == "__main__":
+    main()
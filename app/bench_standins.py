@@ -0,0 +1,146 @@
+# bench_standins.py
+"""
+Local stand-ins for the model providers, for offline benchmarks (bench_e2e.py).
+
+- Ollama:     POST /api/generate                  (streaming NDJSON or a single JSON)
+- ElevenLabs: POST /v1/text-to-speech/<voice_id>  (raw 16-bit PCM for output_format=pcm_*)
+
+Latency is configurable: time to first token / first byte, then a steady
+pace (per token for the LLM, a real-time factor for TTS audio).
+
+    python bench_standins.py --port 18080     # serve both until Ctrl-C
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+LLM_REPLY = "Thanks for the details. A specialist will reach out with a tailored proposal shortly."
+TTS_CHARS_PER_SECOND = 15  # roughly conversational speech
+TTS_CHUNK_BYTES = 4096
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            body = {}
+
+        url = urlparse(self.path)
+        if url.path == "/api/generate":
+            self.ollama(body)
+        elif url.path.startswith("/v1/text-to-speech/"):
+            self.tts(body, parse_qs(url.query).get("output_format", ["pcm_22050"])[0])
+        else:
+            self.reply(404, b"not found")
+
+    # ---------- helpers ----------
+    def reply(self, status: int, data: bytes, content_type: str = "text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    # ---------- providers ----------
+    def ollama(self, body: dict):
+        cfg = self.server.config
+        time.sleep(cfg["llm_first_token_ms"] / 1000)
+        words = LLM_REPLY.split(" ")
+
+        if not body.get("stream", True):
+            time.sleep(cfg["llm_token_ms"] * (len(words) - 1) / 1000)
+            self.reply(200, json.dumps({"response": LLM_REPLY, "done": True}).encode(), "application/json")
+            return
+
+        self.start_chunked("application/x-ndjson")
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(cfg["llm_token_ms"] / 1000)
+            text = word if i == len(words) - 1 else word + " "
+            self.chunk(json.dumps({"response": text, "done": False}).encode() + b"\n")
+        self.chunk(json.dumps({"response": "", "done": True}).encode() + b"\n")
+        self.chunk(b"")
+
+    def tts(self, body: dict, output_format: str):
+        cfg = self.server.config
+        if not output_format.startswith("pcm_"):
+            self.reply(400, b"stand-in only serves output_format=pcm_*")
+            return
+
+        rate = int(output_format.split("_")[1])
+        seconds = max(0.5, len(body.get("text", "")) / TTS_CHARS_PER_SECOND)
+        t = np.arange(int(rate * seconds)) / rate
+        pcm = (3000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+        time.sleep(cfg["tts_first_byte_ms"] / 1000)
+        self.start_chunked("audio/pcm")
+        chunk_seconds = TTS_CHUNK_BYTES / 2 / rate
+        try:
+            for i in range(0, len(pcm), TTS_CHUNK_BYTES):
+                if i:
+                    time.sleep(chunk_seconds * cfg["tts_rtf"])
+                self.chunk(pcm[i:i + TTS_CHUNK_BYTES])
+            self.chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client cancelled the synthesis (barge-in, lost hedge)
+
+
+def start_standins(host: str = "127.0.0.1", port: int = 0, llm_first_token_ms: float = 150,
+                   llm_token_ms: float = 20, tts_first_byte_ms: float = 250, tts_rtf: float = 0.1):
+    """
+    Starts the stand-in server on a background thread; returns it (server.server_address has the port).
+    """
+    server = ThreadingHTTPServer((host, port), StandInHandler)
+    server.daemon_threads = True
+    server.config = {
+        "llm_first_token_ms": llm_first_token_ms,
+        "llm_token_ms": llm_token_ms,
+        "tts_first_byte_ms": tts_first_byte_ms,
+        "tts_rtf": tts_rtf,
+    }
+    threading.Thread(target=server.serve_forever, daemon=True, name="standins").start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Ollama / ElevenLabs stand-ins")
+    parser.add_argument("--port", type=int, default=18080)
+    parser.add_argument("--llm-first-token-ms", type=float, default=150)
+    parser.add_argument("--llm-token-ms", type=float, default=20)
+    parser.add_argument("--tts-first-byte-ms", type=float, default=250)
+    parser.add_argument("--tts-rtf", type=float, default=0.1, help="seconds of streaming per second of audio")
+    args = parser.parse_args()
+
+    server = start_standins(port=args.port, llm_first_token_ms=args.llm_first_token_ms, llm_token_ms=args.llm_token_ms,
+                            tts_first_byte_ms=args.tts_first_byte_ms, tts_rtf=args.tts_rtf)
+    print(f"Stand-ins on http://127.0.0.1:{server.server_address[1]} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
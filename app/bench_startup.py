@@ -0,0 +1,139 @@
+# bench_startup.py
+"""
+Startup-time benchmark.
+
+    python bench_startup.py                       # ws_server imports + first connection
+    python bench_startup.py --modules ws_server realtime_agent_v2 voice_agent --repeat 5
+
+For each module, imports it in fresh interpreters and reports the median
+wall-clock import time plus the slowest imports under it (python -X importtime).
+
+Then starts ws_server.py and reports, from process start:
+- accept_ms:        websocket handshake completed (server warmed up and listening)
+- first_message_ms: first message on that connection ("session"; with
+                    WARMUP_ENABLED=0 this includes creating the shared services)
+
+Compare runs before/after a change with --out results.json.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import websockets
+
+from bench_e2e import APP_DIR, free_port, git_revision
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def import_time(module: str, repeat: int) -> float:
+    """
+    Median seconds to import `module` in a fresh interpreter (startup excluded).
+    """
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)], cwd=APP_DIR,
+                             capture_output=True, text=True)
+        if out.returncode != 0:
+            raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "import failed")
+        runs.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(runs)
+
+
+def slowest_imports(module: str, top: int) -> list:
+    """
+    [(name, cumulative ms)] of the heaviest imports pulled in by `module`.
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=APP_DIR,
+                         capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Only modules loaded directly by the target or by one of its top-level imports
+        depth = (len(line.rsplit("|", 1)[1]) - len(line.rsplit("|", 1)[1].lstrip())) // 2
+        if 1 <= depth <= 2 and name != module:
+            rows.append((name, int(cumulative) / 1000))
+    return sorted(rows, key=lambda row: -row[1])[:top]
+
+
+async def first_connection(url: str, proc: subprocess.Popen, started: float, timeout: float) -> dict:
+    result = {"accept_ms": None, "first_message_ms": None, "first_message": None}
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            result["error"] = f"ws_server exited with {proc.returncode}"
+            return result
+        try:
+            async with websockets.connect(url, open_timeout=2, max_size=None) as ws:
+                result["accept_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                try:
+                    msg = json.loads(await asyncio.wait_for(ws.recv(), deadline - time.perf_counter()))
+                    result["first_message_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                    result["first_message"] = msg.get("type")
+                except (asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+                    result["error"] = f"no message: {type(e).__name__}"
+                return result
+        except (OSError, asyncio.TimeoutError, websockets.InvalidHandshake):
+            await asyncio.sleep(0.02)
+    result["error"] = "server not reachable in time"
+    return result
+
+
+def server_startup(timeout: float) -> dict:
+    port = free_port()
+    env = dict(os.environ, WS_HOST="127.0.0.1", WS_PORT=str(port), METRICS_PORT="0")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "ws_server.py"], cwd=APP_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        return asyncio.run(first_connection(f"ws://127.0.0.1:{port}", proc, started, timeout))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first connection")
+    parser.add_argument("--modules", nargs="+", default=["ws_server"], help="modules to time the import of")
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module")
+    parser.add_argument("--top", type=int, default=8, help="slowest imports to list per module")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds to wait for the first connection")
+    parser.add_argument("--no-server", action="store_true", help="only measure imports")
+    parser.add_argument("--out", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = {"revision": git_revision(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "imports": {}}
+    for module in args.modules:
+        try:
+            seconds = import_time(module, args.repeat)
+        except RuntimeError as e:
+            print(f"{module}: import failed ({e})")
+            results["imports"][module] = {"error": str(e)}
+            continue
+        slowest = slowest_imports(module, args.top)
+        results["imports"][module] = {"ms": round(seconds * 1000, 1), "slowest": slowest}
+        print(f"{module}: {seconds * 1000:.0f} ms")
+        for name, ms in slowest:
+            print(f"    {ms:8.1f} ms  {name}")
+
+    if not args.no_server:
+        startup = server_startup(args.timeout)
+        results["server"] = startup
+        print(f"ws_server: accepted after {startup['accept_ms']} ms, "
+              f"first message ({startup['first_message']}) after {startup['first_message_ms']} ms"
+              + (f"  [{startup['error']}]" if "error" in startup else ""))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# bench_vad.py
+"""
+Frames/second of the old per-frame VAD loop vs VADDetector.speech_mask.
+
+    python bench_vad.py                 # synthetic 60 s clip (speech-like bursts + silence)
+    python bench_vad.py some_16k.wav    # your own 16 kHz mono int16 WAV
+"""
+import sys
+import time
+import wave
+
+import numpy as np
+
+from vad_utils import VADDetector
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+
+def synthetic_clip(seconds: int = 60) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(SAMPLE_RATE * seconds) / SAMPLE_RATE
+    voiced = (np.sin(2 * np.pi * 0.25 * t) > 0.3)  # ~40% "speech", rest near-silence
+    tone = 6000 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    noise = rng.normal(0, 30, len(t))
+    return (np.where(voiced, tone, 0) + noise).astype(np.int16)
+
+
+def load_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != SAMPLE_RATE:
+            sys.exit("WAV must be 16 kHz mono 16-bit PCM")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+def per_frame(vad: VADDetector, pcm: np.ndarray) -> int:
+    # What wav_is_speech_by_webrtcvad / record_until_silence used to do
+    frame_samples = SAMPLE_RATE * FRAME_MS // 1000
+    raw = pcm.tobytes()
+    speech = 0
+    for i in range(len(pcm) // frame_samples):
+        frame = raw[i * frame_samples * 2:(i + 1) * frame_samples * 2]
+        speech += vad.is_speech(frame, SAMPLE_RATE)
+    return speech
+
+
+def best_of(fn, repeats: int = 5) -> float:
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    pcm = load_wav(sys.argv[1]) if len(sys.argv) > 1 else synthetic_clip()
+    n_frames = len(pcm) // (SAMPLE_RATE * FRAME_MS // 1000)
+
+    # Fresh detectors: webrtcvad adapts its noise estimate to the frames it has seen,
+    # so the pre-gated run (which never shows it silence) can label frames differently,
+    # especially on the synthetic tone clip. Use a real recording to compare decisions.
+    old_s = best_of(lambda: per_frame(VADDetector(aggressiveness=2), pcm))
+    new_s = best_of(lambda: VADDetector(aggressiveness=2).speech_mask(pcm, SAMPLE_RATE, FRAME_MS))
+    old_speech = per_frame(VADDetector(aggressiveness=2), pcm)
+    new_speech = int(VADDetector(aggressiveness=2).speech_mask(pcm, SAMPLE_RATE, FRAME_MS).sum())
+
+    print(f"frames: {n_frames} ({len(pcm) / SAMPLE_RATE:.1f}s audio)")
+    print(f"per-frame loop : {n_frames / old_s:12,.0f} frames/s  speech={old_speech}")
+    print(f"speech_mask    : {n_frames / new_s:12,.0f} frames/s  speech={new_speech}")
+    print(f"speedup        : {old_s / new_s:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
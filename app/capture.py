@@ -0,0 +1,94 @@
+# capture.py
+import threading
+
+import numpy as np
+
+from config import CAPTURE_RING_SECONDS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CaptureEngine:
+    def __init__(self, sample_rate: int = 16000, frame_duration: int = 30,
+                 ring_seconds: float = CAPTURE_RING_SECONDS):
+        """
+        One long-lived microphone stream feeding a fixed-size int16 ring buffer.
+        Positions are absolute sample counts since start(), so a caller can
+        remember "speech started at sample N" and cut the utterance out later,
+        including audio from before it decided to listen (pre-roll).
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = int(sample_rate * frame_duration / 1000)
+        # Whole number of frames, so aligned frame reads never wrap around
+        self.capacity = int(sample_rate * ring_seconds) // self.frame_samples * self.frame_samples
+        self.ring = np.zeros(self.capacity, dtype=np.int16)
+        self.written = 0  # total samples written since start
+        self._cond = threading.Condition()
+        import sounddevice as sd  # PortAudio; loaded only when a mic is actually opened
+        self.stream = sd.InputStream(
+            samplerate=sample_rate, channels=1, dtype='int16',
+            blocksize=self.frame_samples, callback=self._callback,
+        )
+
+    def start(self):
+        self.stream.start()
+        logger.info("🎙️ Capture started (%.0fs ring buffer)", self.capacity / self.sample_rate)
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            logger.warning("⚠️ Capture status: %s", status)
+        samples = indata[:, 0]
+        n = len(samples)
+        pos = self.written % self.capacity
+        first = min(n, self.capacity - pos)
+        self.ring[pos:pos + first] = samples[:first]
+        self.ring[:n - first] = samples[first:]
+        with self._cond:
+            self.written += n
+            self._cond.notify_all()
+
+    def _copy(self, start: int, end: int) -> np.ndarray:
+        out = np.empty(end - start, dtype=np.int16)
+        i = start % self.capacity
+        first = min(len(out), self.capacity - i)
+        out[:first] = self.ring[i:i + first]
+        out[first:] = self.ring[:len(out) - first]
+        return out
+
+    def frames(self, start: int = None):
+        """
+        Yields (position, frame) for every frame from `start` (default: now)
+        onwards, blocking until audio arrives. Frames are views into the ring,
+        valid until the ring wraps around (CAPTURE_RING_SECONDS later).
+        """
+        n = self.frame_samples
+        pos = self.written if start is None else start
+        while True:
+            with self._cond:
+                while self.written - pos < n:
+                    self._cond.wait(timeout=1.0)
+                written = self.written
+
+            if written - pos > self.capacity - n:
+                logger.warning("⚠️ Capture reader fell behind, skipping ahead")
+                pos = written - n
+
+            while written - pos >= n:
+                i = pos % self.capacity
+                frame = self.ring[i:i + n] if i + n <= self.capacity else self._copy(pos, pos + n)
+                yield pos, frame
+                pos += n
+
+    def extract(self, start: int, end: int) -> np.ndarray:
+        """
+        Copies samples [start, end) out of the ring in one go (clamped to what
+        is still buffered).
+        """
+        start = max(start, self.written - self.capacity, 0)
+        end = min(end, self.written)
+        return self._copy(start, max(start, end))
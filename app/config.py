@@ -11,10 +11,14 @@ OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 # 🎤 Whisper Configuration
 WHISPER_MODEL_SIZE = os.getenv("WHISPER_MODEL_SIZE", "small")  # small | medium | large
 WHISPER_DEVICE = os.getenv("WHISPER_DEVICE", "cuda")  # cuda | cpu
+WHISPER_BATCH_SIZE = int(os.getenv("WHISPER_BATCH_SIZE", "8"))  # chunks per decode in batch mode (voice_agent.py)
 
 # 🗣️ TTS Configuration (Coqui TTS or any installed engine)
 TTS_MODEL_NAME = os.getenv("TTS_MODEL_NAME", "tts_models/en/ljspeech/tacotron2-DDC")
 TTS_OUTPUT_FILE = os.getenv("TTS_OUTPUT_FILE", "output.wav")
+TTS_DEVICE = os.getenv("TTS_DEVICE", "auto")  # auto (cuda if available) | cuda | cpu
+TTS_BATCH_MAX = int(os.getenv("TTS_BATCH_MAX", "8"))  # pending sentences taken per model turn
+TTS_BATCH_WAIT_MS = float(os.getenv("TTS_BATCH_WAIT_MS", "10"))  # wait for more sentences before a turn
 
 # 🎧 Audio / Voice Settings
 INPUT_AUDIO_FILE = os.getenv("INPUT_AUDIO_FILE", "test_audio.wav")
@@ -23,4 +27,111 @@ SAMPLE_RATE = int(os.getenv("SAMPLE_RATE", "22050"))
 
 # 🧰 System Settings
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG | INFO | WARNING | ERROR
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json (one object per line)
+LOG_DEBUG_SAMPLE = int(os.getenv("LOG_DEBUG_SAMPLE", "1"))  # keep 1 in N DEBUG records per message
 TEMP_DIR = os.getenv("TEMP_DIR", "./temp")
+
+# 💾 Session Settings (resume / scale-out)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")  # memory | file
+SESSION_DIR = os.getenv("SESSION_DIR", os.path.join(TEMP_DIR, "sessions"))
+SESSION_HISTORY_TURNS = int(os.getenv("SESSION_HISTORY_TURNS", "6"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "3600"))
+SESSION_STORE_MAX_ENTRIES = int(os.getenv("SESSION_STORE_MAX_ENTRIES", "10000"))  # memory store, per process
+
+# 🌐 WebSocket Server Settings
+WS_HOST = os.getenv("WS_HOST", "localhost")
+WS_PORT = int(os.getenv("WS_PORT", "8765"))
+WS_MAX_MESSAGE_BYTES = int(os.getenv("WS_MAX_MESSAGE_BYTES", str(20 * 1024 * 1024)))
+WS_MAX_QUEUED_BYTES = int(os.getenv("WS_MAX_QUEUED_BYTES", str(1024 * 1024)))  # batch framing: unsent frames before a turn waits
+WS_WORKERS = int(os.getenv("WS_WORKERS", str(os.cpu_count() or 1)))  # supervisor.py only
+WORKER_HEALTH_INTERVAL = float(os.getenv("WORKER_HEALTH_INTERVAL", "2.0"))  # seconds
+WORKER_SHUTDOWN_GRACE = float(os.getenv("WORKER_SHUTDOWN_GRACE", "30"))  # seconds to drain calls
+
+# 🏭 Inference Workers (ASR/TTS in separate processes, see inference_worker.py)
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "local")  # local | remote
+INFERENCE_SOCKET_DIR = os.getenv("INFERENCE_SOCKET_DIR", os.path.join(TEMP_DIR, "inference"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "60"))  # seconds per job
+
+# 🚦 Admission Control (see admission.py)
+MAX_ACTIVE_SESSIONS = int(os.getenv("MAX_ACTIVE_SESSIONS", "50"))  # per process
+ASR_CONCURRENCY = int(os.getenv("ASR_CONCURRENCY", "2"))
+ASR_MAX_QUEUE = int(os.getenv("ASR_MAX_QUEUE", "8"))
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "4"))
+TTS_MAX_QUEUE = int(os.getenv("TTS_MAX_QUEUE", "16"))
+STAGE_QUEUE_TIMEOUT = float(os.getenv("STAGE_QUEUE_TIMEOUT", "5"))  # max seconds waiting for a stage slot
+BUSY_RETRY_AFTER = int(os.getenv("BUSY_RETRY_AFTER", "10"))  # seconds, sent with "busy"
+HOLD_AUDIO_FILE = os.getenv("HOLD_AUDIO_FILE", "")  # optional WAV played when busy
+
+# ✋ Barge-in (caller interrupts the agent while it speaks)
+BARGE_IN_ENABLED = os.getenv("BARGE_IN_ENABLED", "1") == "1"
+BARGE_IN_MIN_FRAMES = int(os.getenv("BARGE_IN_MIN_FRAMES", "8"))  # consecutive 30ms speech frames
+BARGE_IN_VAD_AGGRESSIVENESS = int(os.getenv("BARGE_IN_VAD_AGGRESSIVENESS", "3"))  # stricter than capture, ignores echo
+
+# 🎙️ Microphone Capture (local agents, see capture.py)
+CAPTURE_RING_SECONDS = float(os.getenv("CAPTURE_RING_SECONDS", "30"))
+CAPTURE_PREROLL_MS = int(os.getenv("CAPTURE_PREROLL_MS", "300"))  # audio kept before the first speech frame
+CAPTURE_POSTROLL_MS = int(os.getenv("CAPTURE_POSTROLL_MS", "200"))  # audio kept after the last speech frame
+
+# ⏱️ Endpointing (how long a pause ends the caller's turn, see endpointing.py)
+ENDPOINT_MIN_MS = int(os.getenv("ENDPOINT_MIN_MS", "240"))
+ENDPOINT_MAX_MS = int(os.getenv("ENDPOINT_MAX_MS", "1200"))
+ENDPOINT_EARLY_CHECK_MS = int(os.getenv("ENDPOINT_EARLY_CHECK_MS", "210"))  # pause before a partial transcript is tried
+ENDPOINT_PARTIAL_ASR = os.getenv("ENDPOINT_PARTIAL_ASR", "1") == "1"
+
+# 🔇 VAD pre-gate (cheap energy / zero-crossing check before webrtcvad, see vad_utils.py)
+VAD_ENERGY_FLOOR = float(os.getenv("VAD_ENERGY_FLOOR", "120"))  # RMS (int16 units) below which a frame is silence
+VAD_MAX_ZCR = float(os.getenv("VAD_MAX_ZCR", "0.6"))  # zero-crossing rate above which a frame is treated as hiss
+
+# ✂️ Trim silence before ASR (uses the VAD mask, see VADDetector.trim_speech)
+ASR_TRIM_PAD_MS = int(os.getenv("ASR_TRIM_PAD_MS", "150"))  # audio kept around each speech segment
+ASR_MAX_PAUSE_MS = int(os.getenv("ASR_MAX_PAUSE_MS", "400"))  # longer internal pauses are shortened (0 = keep)
+
+# 🗜️ Audio Transport (codecs negotiated per connection in "hello", see audio_codecs.py)
+OUTPUT_SAMPLE_RATE = int(os.getenv("OUTPUT_SAMPLE_RATE", "16000"))  # TTS audio sent with a compressed codec
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))  # encoded TTS replies kept in memory
+
+# ⏲️ Turn Tracing (per-stage latency, see tracing.py)
+TRACE_ENABLED = os.getenv("TRACE_ENABLED", "1") == "1"
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join(TEMP_DIR, "traces.jsonl"))  # one JSON record per turn
+TRACE_WINDOW = int(os.getenv("TRACE_WINDOW", "1000"))  # recent turns kept per stage for p50/p95/p99
+TRACE_SUMMARY_EVERY = int(os.getenv("TRACE_SUMMARY_EVERY", "50"))  # log the percentiles every N turns (0 = never)
+
+# 📈 Metrics (Prometheus text on a side port, see metrics.py)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))  # 0 = off; supervisor workers use METRICS_PORT + slot
+METRICS_HOST = os.getenv("METRICS_HOST", WS_HOST)
+METRICS_LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", "0.5"))  # seconds between lag probes
+
+# 🔬 Profiling (opt-in, see profiling.py)
+PROFILE_SAMPLE_EVERY = int(os.getenv("PROFILE_SAMPLE_EVERY", "0"))  # profile 1 in N turns (0 = off)
+PROFILE_SESSIONS = os.getenv("PROFILE_SESSIONS", "")  # comma-separated session ids to profile
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")  # enables {"type": "profile"} messages carrying this token
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))  # stack sampling interval
+PROFILE_TRACEMALLOC = os.getenv("PROFILE_TRACEMALLOC", "1") == "1"  # memory diffs for picked sessions
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(TEMP_DIR, "profiles"))
+
+# 🔥 Warm-up (before a process reports ready, see warmup.py)
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_TTS_PROMPTS = int(os.getenv("WARMUP_TTS_PROMPTS", "1"))  # static prompts to pre-synthesize (1 = greeting)
+WARMUP_TTS_CODECS = os.getenv("WARMUP_TTS_CODECS", "wav")  # comma-separated output codecs to cache them in
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "120"))  # seconds per step; a failed step only logs
+
+# 🔀 TTS Fallback (hedged requests to a local engine, see services/tts_router.py)
+TTS_FALLBACK = os.getenv("TTS_FALLBACK", "off")  # off | local (Coqui in-process) | worker (inference_worker.py --tts)
+TTS_HEDGE_MS = float(os.getenv("TTS_HEDGE_MS", "800"))  # first-byte deadline until enough latencies are seen
+TTS_HEDGE_MIN_MS = float(os.getenv("TTS_HEDGE_MIN_MS", "300"))
+TTS_HEDGE_MAX_MS = float(os.getenv("TTS_HEDGE_MAX_MS", "3000"))
+TTS_HEDGE_PERCENTILE = float(os.getenv("TTS_HEDGE_PERCENTILE", "95"))  # deadline = this percentile of remote first byte
+TTS_HEDGE_WINDOW = int(os.getenv("TTS_HEDGE_WINDOW", "200"))  # recent remote requests the deadline is based on
+
+# 🧾 Transcript Cache (identical utterances skip ASR, see transcript_cache.py)
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))  # 0 = off
+
+# 🧮 Session Memory (per-call budget and pooled audio buffers, see session_memory.py)
+MAX_UTTERANCE_SECONDS = float(os.getenv("MAX_UTTERANCE_SECONDS", "30"))  # longer speech gets a forced endpoint
+SESSION_MEMORY_MAX_BYTES = int(os.getenv("SESSION_MEMORY_MAX_BYTES", str(16 * 1024 * 1024)))  # 0 = no limit
+PCM_POOL_BUFFERS = int(os.getenv("PCM_POOL_BUFFERS", "16"))  # utterance buffers kept for reuse per process
+LLM_MAX_REPLY_CHARS = int(os.getenv("LLM_MAX_REPLY_CHARS", "300"))  # the LLM stream is closed past this
+
+# 🔮 Speculation (next prompt rendered while ASR runs, see speculation.py)
+SPECULATION_ENABLED = os.getenv("SPECULATION_ENABLED", "1") == "1"
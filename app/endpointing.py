@@ -0,0 +1,90 @@
+# endpointing.py
+import re
+
+from config import ENDPOINT_MIN_MS, ENDPOINT_MAX_MS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Pause (ms) that ends the turn, per LeadQualification state: one-word answers
+# end quickly, free-form descriptions get room to think.
+STATE_HANGOVER_MS = {
+    "ask_name": 360,
+    "ask_company": 450,
+    "ask_budget": 390,
+    "ask_interest": 750,
+    "handoff": 700,
+}
+DEFAULT_HANGOVER_MS = 600  # 20 frames of 30 ms, the old fixed silence threshold
+
+# A "typical" mid-sentence pause; callers who pause longer get a longer hangover
+REFERENCE_PAUSE_MS = 240.0
+PAUSE_EMA_ALPHA = 0.3
+
+# Answers that end in one of these are clearly unfinished ("my name is ...")
+_DANGLING = {
+    "ask_name": ("is", "am", "i'm", "name", "this", "call", "me"),
+    "ask_company": ("at", "for", "from", "is", "the", "represent", "representing", "with"),
+}
+
+
+def has_slot_rule(state: str) -> bool:
+    """
+    True if slot_complete() can ever say yes in this state; elsewhere a
+    partial transcript is not worth taking.
+    """
+    return state == "ask_budget" or state in _DANGLING
+
+
+def slot_complete(state: str, text: str) -> bool:
+    """
+    True when a partial transcript already holds a usable slot value
+    (a number for the budget, a name, a company).
+    """
+    text = text.strip().rstrip(".!?,").strip().lower()
+    if not text:
+        return False
+
+    if state == "ask_budget":
+        return re.search(r"\d", text) is not None
+
+    if state in _DANGLING:
+        words = re.findall(r"[a-z0-9'\-]+", text)
+        return bool(words) and words[-1] not in _DANGLING[state]
+
+    return False
+
+
+class EndpointPolicy:
+    def __init__(self, frame_duration: int = 30):
+        """
+        Decides when a pause ends the caller's turn. Starts from a per-state
+        hangover and scales it by how long this caller usually pauses
+        mid-utterance (measured over previous turns).
+        """
+        self.frame_duration = frame_duration
+        self.pause_ms_ema = None
+
+    def hangover_ms(self, state: str) -> int:
+        hangover = STATE_HANGOVER_MS.get(state, DEFAULT_HANGOVER_MS)
+        if self.pause_ms_ema is not None:
+            factor = min(1.5, max(0.7, self.pause_ms_ema / REFERENCE_PAUSE_MS))
+            hangover *= factor
+        return int(min(ENDPOINT_MAX_MS, max(ENDPOINT_MIN_MS, hangover)))
+
+    def hangover_frames(self, state: str) -> int:
+        return max(1, self.hangover_ms(state) // self.frame_duration)
+
+    def observe(self, pause_frames: list):
+        """
+        Feed the mid-utterance pauses (in frames) of a finished turn.
+        """
+        if not pause_frames:
+            return
+        pauses = sorted(pause_frames)
+        median_ms = pauses[len(pauses) // 2] * self.frame_duration
+        if self.pause_ms_ema is None:
+            self.pause_ms_ema = float(median_ms)
+        else:
+            self.pause_ms_ema += PAUSE_EMA_ALPHA * (median_ms - self.pause_ms_ema)
+        logger.debug("⏱️ Caller pause estimate: %.0f ms", self.pause_ms_ema)
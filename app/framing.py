@@ -0,0 +1,167 @@
+# framing.py
+"""
+Outgoing message framing for ws_server.
+
+Two modes, chosen per connection in "hello" ({"framing": "batch"}):
+- "json" (default): every event is its own text frame, audio inline as base64.
+- "batch": events a turn emits back to back (with nothing awaited in between)
+  leave as one text frame, {"type": "batch", "events": [...]} (a lone event is
+  sent as is). Audio goes as a binary frame right after the event announcing
+  it: {"type": "tts_audio", ..., "binary": true, "bytes": n} plus, for Opus,
+  "packet_sizes" to split the frame back into packets.
+
+In batch mode a writer task sends the frames in order. Senders wait while
+more than WS_MAX_QUEUED_BYTES are queued for a slow client, and once the
+writer hit a closed connection every send raises its ConnectionClosed, as a
+direct websocket.send would.
+
+JSON is encoded with orjson when it is installed, json otherwise. Bytes sent
+and the CPU time spent encoding are counted per connection, so ws_server can
+report them per turn.
+"""
+import asyncio
+import base64
+import json
+import time
+
+import websockets
+
+from config import WS_MAX_QUEUED_BYTES
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def to_b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("utf-8")
+
+
+def dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode("utf-8")
+    return json.dumps(obj)
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class Framer:
+    def __init__(self, websocket, max_queued_bytes: int = WS_MAX_QUEUED_BYTES):
+        self.websocket = websocket
+        self.batching = False
+        self.pending = []  # events of the batch being collected
+        self.frames = None  # asyncio.Queue feeding the writer task (batch mode)
+        self.writer = None
+        self.max_queued_bytes = max_queued_bytes
+        self.queued_bytes = 0  # in frames the writer has not sent yet
+        self.drained = asyncio.Event()  # set whenever queued_bytes is back under the limit
+        self.closed = None  # ConnectionClosed the writer ran into
+        self.bytes_sent = 0
+        self.encode_seconds = 0.0  # thread CPU time spent encoding JSON
+
+    def enable_batching(self):
+        """
+        Switches to batch mode; frames are then written by one task, in order.
+        """
+        if self.writer is None:
+            self.frames = asyncio.Queue()
+            self.writer = asyncio.create_task(self._write())
+        self.batching = True
+
+    def _encode(self, event: dict) -> str:
+        started = time.thread_time()
+        if orjson is not None:
+            raw = orjson.dumps(event)
+            size, data = len(raw), raw.decode("utf-8")
+        else:
+            data = json.dumps(event)  # ensure_ascii: characters are bytes
+            size = len(data)
+        self.encode_seconds += time.thread_time() - started
+        self.bytes_sent += size
+        return data
+
+    async def send(self, event: dict):
+        if not self.batching:
+            await self.websocket.send(self._encode(event))
+            return
+        await self._wait_for_writer()
+        if not self.pending:
+            # Everything sent before the turn next awaits something goes in this batch
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(event)
+
+    async def _wait_for_writer(self):
+        while self.closed is None and self.queued_bytes > self.max_queued_bytes:
+            self.drained.clear()
+            await self.drained.wait()
+        if self.closed is not None:
+            raise self.closed
+
+    async def send_audio(self, message: dict):
+        """
+        Sends a "tts_audio" message holding raw "audio" bytes (or a list of Opus "packets").
+        """
+        header = {k: v for k, v in message.items() if k not in ("audio", "packets")}
+        packets = message.get("packets")
+        if not self.batching:
+            if packets is not None:
+                header["packets"] = [to_b64(packet) for packet in packets]
+            else:
+                header["b64"] = to_b64(message["audio"])
+            await self.send(header)
+            return
+
+        await self._wait_for_writer()
+        data = b"".join(packets) if packets is not None else message["audio"]
+        header.update(binary=True, bytes=len(data))
+        if packets is not None:
+            header["packet_sizes"] = [len(packet) for packet in packets]
+        self.pending.append(header)
+        self.flush()
+        self._queue(data)
+        self.bytes_sent += len(data)
+
+    def flush(self):
+        """
+        Queues the batch being collected now instead of on the next loop tick.
+        """
+        if not self.pending:
+            return
+        events, self.pending = self.pending, []
+        frame = events[0] if len(events) == 1 else {"type": "batch", "events": events}
+        self._queue(self._encode(frame))
+
+    def _queue(self, frame):
+        self.queued_bytes += len(frame)
+        self.frames.put_nowait(frame)
+
+    async def _write(self):
+        while True:
+            frame = await self.frames.get()
+            if frame is None:
+                return
+            try:
+                await self.websocket.send(frame)  # waits while the client is slow to read
+            except websockets.ConnectionClosed as e:
+                self.closed = e
+                self.drained.set()
+                return
+            self.queued_bytes -= len(frame)
+            if self.queued_bytes <= self.max_queued_bytes:
+                self.drained.set()
+
+    async def close(self):
+        """
+        Sends what is still pending and stops the writer task.
+        """
+        if self.writer is None:
+            return
+        if self.closed is None:
+            self.flush()
+        self.frames.put_nowait(None)
+        await self.writer
@@ -0,0 +1,141 @@
+# inference_worker.py
+"""
+Standalone ASR/TTS inference worker.
+
+Owns a WhisperService (and, with --tts, the local Coqui TTSService) and serves
+jobs over a Unix socket at INFERENCE_SOCKET_DIR/inference-<index>.sock using
+the framing in services/inference_client.py. Front-ends (ws_server workers)
+set INFERENCE_MODE=remote and round-robin over however many of these exist,
+so ASR capacity scales independently of the number of I/O processes.
+
+    python inference_worker.py --workers 4 [--tts]
+"""
+import argparse
+import io
+import multiprocessing as mp
+import os
+import signal
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from config import INFERENCE_SOCKET_DIR, INFERENCE_WORKERS, WARMUP_ENABLED
+from services.inference_client import send_frame, recv_frame
+from warmup import warm_whisper
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class InferenceHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        server = self.server
+        try:
+            header, payload = recv_frame(self.request)
+        except (ConnectionError, ValueError) as e:
+            logger.warning("⚠️ Dropping malformed inference request: %s", e)
+            return
+
+        op = header.get("op")
+        try:
+            # Coqui TTSService queues and batches concurrent jobs itself
+            if op == "tts" and server.tts is not None:
+                audio = server.tts.synthesize_to_memory(header.get("text", ""))
+                send_frame(self.request, {"ok": True, "mime": "audio/wav"}, audio.getbuffer())
+                return
+
+            # One job at a time per model; socket I/O for other jobs keeps flowing
+            with server.model_lock:
+                if op == "transcribe_pcm":
+                    pcm = np.frombuffer(payload, dtype=np.int16)  # zero-copy view of the received buffer
+                    text = server.whisper.transcribe_pcm(pcm, header.get("rate", 16000))
+                    send_frame(self.request, {"ok": True, "text": text})
+                elif op == "transcribe_file":
+                    text = server.whisper.transcribe(io.BytesIO(payload))
+                    send_frame(self.request, {"ok": True, "text": text})
+                else:
+                    send_frame(self.request, {"ok": False, "error": f"Unsupported op: {op}"})
+        except Exception as e:
+            logger.error("❌ Inference job '%s' failed: %s", op, e)
+            try:
+                send_frame(self.request, {"ok": False, "error": str(e)})
+            except OSError:
+                pass
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, with_tts: bool = False):
+        from services.whisper_service import WhisperService
+
+        self.whisper = WhisperService()
+        self.tts = None
+        if with_tts:
+            from services.tts_service import TTSService
+            self.tts = TTSService()
+        self.model_lock = threading.Lock()
+
+        # The socket appears only once the model has run, so front-ends never hit a cold worker
+        if WARMUP_ENABLED:
+            started = time.perf_counter()
+            warm_whisper(self.whisper)
+            logger.info("🔥 Whisper warmed up in %.0f ms", (time.perf_counter() - started) * 1000)
+
+        if os.path.exists(path):
+            os.remove(path)  # stale socket from a previous run
+        super().__init__(path, InferenceHandler)
+
+
+def socket_path(index: int) -> str:
+    return os.path.join(INFERENCE_SOCKET_DIR, f"inference-{index}.sock")
+
+
+def run_worker(index: int, with_tts: bool):
+    path = socket_path(index)
+    server = InferenceServer(path, with_tts=with_tts)
+
+    def _stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _stop)
+    logger.info("🏭 Inference worker %s (pid %s) serving on %s", index, os.getpid(), path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASR/TTS inference worker pool")
+    parser.add_argument("--workers", type=int, default=INFERENCE_WORKERS, help="number of worker processes")
+    parser.add_argument("--index", type=int, default=None, help="run a single worker with this index")
+    parser.add_argument("--tts", action="store_true", help="also serve local Coqui TTS jobs")
+    args = parser.parse_args()
+
+    os.makedirs(INFERENCE_SOCKET_DIR, exist_ok=True)
+
+    if args.index is not None:
+        run_worker(args.index, args.tts)
+        return
+
+    procs = [mp.Process(target=run_worker, args=(i, args.tts), name=f"inference-{i}") for i in range(args.workers)]
+    for proc in procs:
+        proc.start()
+    try:
+        for proc in procs:
+            proc.join()
+    except KeyboardInterrupt:
+        logger.info("👋 Stopping inference workers...")
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.join()
+
+
+if __name__ == "__main__":
+    main()
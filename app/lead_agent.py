@@ -0,0 +1,181 @@
+# lead_agent.py
+"""
+The lead flow without any audio devices: shared services, qualification
+state, slot extractors, short LLM replies and lead saving.
+
+ws_server.py builds one per connection; realtime_agent_v2.RealTimeAgentVAD
+adds the microphone and speaker on top. Importing this module loads no
+model SDKs (see services/*: they are imported when a service is created).
+"""
+import os
+import re
+import json
+from datetime import datetime
+
+from services.whisper_service import WhisperService
+from services.ollama_service import OllamaService
+from services.tts_service_v2 import TTSService
+from routes.leads import LeadQualification
+from config import LLM_MAX_REPLY_CHARS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+SAMPLE_RATE = 16000
+FRAME_DURATION = 30  # ms
+LEADS_FILE = os.path.join(os.getcwd(), "leads.json")  # ✅ absolute path
+
+SHORT_RESPONSE_INSTRUCTION = (
+    "Answer in 1-2 sentences only. "
+    "Keep it conversational and concise. "
+    "Avoid repeating the user's exact phrasing."
+)
+
+
+class LeadAgent:
+    def __init__(self, whisper=None, ollama=None, tts=None):
+        # Services can be injected so a server shares one set of models across calls
+        self.whisper = whisper or WhisperService()
+        self.ollama = ollama or OllamaService()
+        self.tts = tts or TTSService()  # ✅ switched to ElevenLabs TTS
+        self.lead_logic = LeadQualification()
+
+    # ====================== LEAD EXTRACTION HELPERS ======================
+    @staticmethod
+    def extract_name(text: str) -> str:
+        text = text.strip().rstrip(".!?").strip()
+
+        # ✅ remove greeting prefix like "Hello," / "Hi," / "Hey,"
+        text = re.sub(r"^(hello|hi|hey)\s*,?\s*", "", text, flags=re.IGNORECASE).strip()
+
+        lowered = text.lower()
+
+        intro_phrases = [
+            "my name is", "i am", "i'm", "this is",
+            "mi nombre es", "mein name ist", "mijn naam is", "je m'appelle",
+        ]
+
+        for phrase in intro_phrases:
+            if lowered.startswith(phrase):
+                name = text[len(phrase):].strip()
+                name = re.sub(r"[^A-Za-z\s\-]", "", name).strip()
+                return name
+
+        # fallback: just strip non-letters
+        return re.sub(r"[^A-Za-z\s\-]", "", text).strip()
+
+    @staticmethod
+    def extract_company(text: str) -> str:
+        text = text.strip().rstrip(".!?").strip()
+        lowered = text.lower()
+
+        company_phrases = [
+            "i work at",
+            "i work for",
+            "i am from",
+            "i'm from",
+            "my company is",
+            "representing",
+            "represent",
+            "we are",
+            "company name is",
+            "i represent",
+        ]
+
+        for phrase in company_phrases:
+            if lowered.startswith(phrase):
+                company = text[len(phrase):].strip()
+                company = re.sub(r"^(the|at|from)\s+", "", company, flags=re.IGNORECASE)
+                company = re.sub(r"[^A-Za-z0-9\s\-]", "", company)
+                return company.strip()
+
+        return re.sub(r"[^A-Za-z0-9\s\-]", "", text).strip()
+
+    @staticmethod
+    def extract_budget(text: str) -> str:
+        text = text.replace(",", "")
+        match = re.search(r"(\$?\d+)", text)
+        if match:
+            return match.group(1)
+        return text
+
+    @staticmethod
+    def extract_interest(text: str) -> str:
+        text = text.strip().rstrip(".!?").strip()
+        lowered = text.lower()
+
+        interest_phrases = [
+            "i am interested in", "i'm interested in", "interested in",
+            "my interest is", "i want", "i would like", "i need",
+        ]
+
+        for phrase in interest_phrases:
+            if lowered.startswith(phrase):
+                interest = text[len(phrase):].strip()
+                interest = re.sub(r"[^A-Za-z0-9\s\-]", "", interest)
+                return interest
+
+        return re.sub(r"[^A-Za-z0-9\s\-]", "", text).strip()
+
+    # ====================== LLM RESPONSE ======================
+    def prefill_short_response(self):
+        """
+        Has Ollama evaluate the fixed start of the generate_short_response()
+        prompt ahead of time (e.g. while Whisper runs); the real request then
+        only evaluates the caller's words. Best effort.
+        """
+        try:
+            self.ollama.prefill(f"{SHORT_RESPONSE_INSTRUCTION}\nUser:")
+        except Exception as e:
+            logger.warning("⚠️ LLM prefill failed: %s", e)
+
+    def generate_short_response(self, prompt: str, cancel_event=None, trace=None):
+        full_prompt = f"{SHORT_RESPONSE_INSTRUCTION}\nUser: {prompt}\nAssistant:"
+
+        chunks, length = [], 0
+        stream = self.ollama.stream_generate(full_prompt, cancel_event=cancel_event)
+        try:
+            for chunk in stream:
+                if trace is not None:
+                    trace.mark("llm_first_token")
+                chunks.append(chunk)
+                length += len(chunk)
+                if length > LLM_MAX_REPLY_CHARS:
+                    break  # nothing past the cap is spoken; closing the stream stops Ollama
+        finally:
+            stream.close()
+        if trace is not None:
+            trace.mark("llm_last_token")
+
+        llm_response = "".join(chunks)
+        if len(llm_response) > LLM_MAX_REPLY_CHARS:
+            logger.warning("⚠️ Response too long, truncating for TTS.")
+            llm_response = llm_response[:LLM_MAX_REPLY_CHARS] + "..."
+
+        return llm_response.strip()
+
+    # ====================== LEAD SAVING ======================
+    def save_lead_to_json(self, lead_data: dict):
+        entry = {
+            "timestamp": datetime.utcnow().isoformat(),
+            "lead": lead_data
+        }
+
+        try:
+            if os.path.exists(LEADS_FILE):
+                with open(LEADS_FILE, "r", encoding="utf-8") as f:
+                    try:
+                        leads = json.load(f)
+                    except json.JSONDecodeError:
+                        leads = []
+            else:
+                leads = []
+
+            leads.append(entry)
+
+            with open(LEADS_FILE, "w", encoding="utf-8") as f:
+                json.dump(leads, f, indent=2)
+
+            logger.info("💾 Lead saved to %s", LEADS_FILE)
+        except Exception as e:
+            logger.error("❌ Failed to save lead: %s", e)
@@ -1,6 +1,10 @@
+import atexit
+import json
 import logging
 import os
-from config import LOG_LEVEL, TEMP_DIR
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from config import LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE, TEMP_DIR
 
 # Ensure temp/log directory exists
 os.makedirs(TEMP_DIR, exist_ok=True)
@@ -8,18 +12,129 @@ os.makedirs(TEMP_DIR, exist_ok=True)
 # Define log file path
 LOG_FILE = os.path.join(TEMP_DIR, "voice_agent.log")
 
+# Log calls only put the record on a queue; a background thread formats and
+# writes it, so the event loop never waits on the disk or the terminal.
+# Use %-style arguments (logger.info("took %.2fs", t)): nothing is formatted
+# on the calling thread, and not at all when the level is disabled.
+
+
+class _DeferredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The stock QueueHandler formats here (on the caller's thread); the
+        # listener's handlers format instead.
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line (LOG_FORMAT=json).
+    """
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "pid": record.process,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class DebugSampler(logging.Filter):
+    def __init__(self, every: int):
+        """
+        Keeps 1 in `every` DEBUG records per message template; other levels pass.
+        """
+        super().__init__()
+        self.every = every
+        self.seen = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every <= 1:
+            return True
+        if len(self.seen) > 10000:  # f-string messages would each be a new "template"
+            self.seen.clear()
+        key = (record.name, record.msg)
+        count = self.seen.get(key, 0)
+        self.seen[key] = count + 1
+        return count % self.every == 0
+
+
+_pipelines = []  # [queue handler, target handlers, listener]
+
+
+def _start_pipeline(handlers) -> QueueHandler:
+    queue_handler = _DeferredQueueHandler(queue.SimpleQueue())
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _pipelines.append([queue_handler, handlers, listener])
+    return queue_handler
+
+
+def _restart_after_fork():
+    # The writer threads don't exist in a forked child (supervisor workers)
+    for pipeline in _pipelines:
+        queue_handler, handlers, _ = pipeline
+        queue_handler.queue = queue.SimpleQueue()
+        pipeline[2] = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        pipeline[2].start()
+
+
+def flush_logs():
+    """
+    Writes out everything still queued. Runs at exit; call it yourself
+    before os._exit (e.g. at the end of a forked worker). The writers are
+    restarted, so logging keeps working and a second flush is harmless.
+    """
+    for _, _, listener in _pipelines:
+        listener.stop()  # drains the queue
+        listener.start()
+
+
+def _make_formatter() -> logging.Formatter:
+    if LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+
 # Configure logger
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL.upper(), logging.INFO),
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_FILE, mode='a', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+_formatter = _make_formatter()
+_targets = [logging.FileHandler(LOG_FILE, mode='a', encoding='utf-8'), logging.StreamHandler()]
+for _target in _targets:
+    _target.setFormatter(_formatter)
+
+_root_handler = _start_pipeline(_targets)
+_root_handler.addFilter(DebugSampler(LOG_DEBUG_SAMPLE))
+
+_root = logging.getLogger()
+_root.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+_root.addHandler(_root_handler)
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+atexit.register(flush_logs)
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Returns a logger with a consistent configuration across modules.
     """
     return logging.getLogger(name)
+
+
+def get_record_logger(name: str, path: str) -> logging.Logger:
+    """
+    Logger that appends bare messages (e.g. JSON lines) to its own file,
+    through its own background writer. Not propagated to the main log.
+    """
+    record_logger = logging.getLogger(name)
+    if not record_logger.handlers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        target = logging.FileHandler(path, mode="a", encoding="utf-8")
+        target.setFormatter(logging.Formatter("%(message)s"))
+        record_logger.addHandler(_start_pipeline([target]))
+        record_logger.setLevel(logging.INFO)
+        record_logger.propagate = False
+    return record_logger
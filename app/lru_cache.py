@@ -0,0 +1,43 @@
+# lru_cache.py
+import threading
+from collections import OrderedDict
+
+
+class SizedLRUCache:
+    def __init__(self, max_bytes: int):
+        """
+        Thread-safe LRU cache bounded by the total size of its values
+        (sizes are given by the caller on put). max_bytes <= 0 disables it.
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (value, size)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key, value, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._items[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self.bytes -= evicted
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,223 @@
+# metrics.py
+"""
+Operational metrics for ws_server in Prometheus text format.
+
+    curl http://localhost:9108/metrics
+
+Counters, gauges and histograms are plain dicts / lists updated without
+locks: the event loop is single-threaded, and the few updates made from
+executor threads (cache hits, provider errors) are single increments where
+a rare lost update is fine for monitoring. Rendering only reads.
+
+Leads per minute: rate(voice_leads_total[1m]) * 60.
+
+Counters and gauges can be given a callback so values that already live elsewhere
+(active sessions, stage queue depths, cache counters) are read at scrape
+time instead of being copied on the hot path.
+"""
+import asyncio
+import bisect
+
+from config import METRICS_HOST, METRICS_LOOP_LAG_INTERVAL
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+REGISTRY = []
+
+# Seconds; covers VAD (~ms) up to slow LLM/TTS calls
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels=(), callback=None):
+        """
+        callback() returns a number (no labels) or {label_values_tuple: number},
+        read at scrape time instead of the stored values.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.callback = callback
+        self.values = {}
+        REGISTRY.append(self)
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        values = self.values
+        if self.callback is not None:
+            current = self.callback()
+            values = current if isinstance(current, dict) else {(): current}
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in list(values.items())
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels=(), callback=None):
+        super().__init__(name, help_text, labels, callback)
+        if not self.label_names:
+            self.values[()] = 0
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self.series = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> list:
+        lines = self.header()
+        names = self.label_names + ("le",)
+        for key, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        try:
+            lines.extend(metric.render())
+        except Exception as e:
+            logger.warning("⚠️ Could not render metric %s: %s", metric.name, e)
+    return "\n".join(lines) + "\n"
+
+
+# ====================== METRICS ======================
+TURNS = Counter("voice_turns_total", "Caller turns by outcome", ["outcome"])
+STAGE_SECONDS = Histogram("voice_stage_seconds", "Duration of each turn stage", ["stage"])
+TURN_SECONDS = Histogram("voice_turn_seconds", "End of utterance to reply sent")
+WHISPER_RTF = Histogram(
+    "voice_whisper_rtf", "Whisper processing time / audio duration",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 4.0),
+)
+PROVIDER_ERRORS = Counter("voice_provider_errors_total", "Failed calls to model providers", ["provider", "kind"])
+BUSY = Counter("voice_busy_total", "Requests shed by admission control", ["stage"])
+LEADS = Counter("voice_leads_total", "Qualified leads captured")
+TTS_PROVIDER_SECONDS = Histogram("voice_tts_provider_seconds", "TTS request duration per provider", ["provider"])
+TTS_HEDGES = Counter("voice_tts_hedges_total", "Hedged TTS requests by the provider that won", ["winner"])
+TURN_BYTES_SENT = Histogram(
+    "voice_turn_bytes_sent", "Websocket bytes sent per turn", ["framing"],
+    buckets=(1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 2.5e6, 5e6),
+)
+TURN_ENCODE_SECONDS = Histogram(
+    "voice_turn_encode_seconds", "CPU time spent encoding JSON per turn", ["framing"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05),
+)
+SPECULATIONS = Counter("voice_speculations_total", "Next prompts synthesized while ASR ran, by outcome", ["outcome"])
+SESSION_PEAK_BYTES = Histogram(
+    "voice_session_peak_bytes", "Peak memory accounted to a call",
+    buckets=(64e3, 256e3, 512e3, 1e6, 2e6, 4e6, 8e6, 16e6, 32e6),
+)
+LOOP_LAG = Histogram(
+    "voice_event_loop_lag_seconds", "Event-loop scheduling delay",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+def provider_error(provider: str, error: Exception):
+    timeout = isinstance(error, TimeoutError) or "timeout" in type(error).__name__.lower()
+    PROVIDER_ERRORS.inc(provider, "timeout" if timeout else "error")
+
+
+# ====================== HTTP SIDE PORT ======================
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), 5)
+        path = request.split(b" ", 2)[1] if request.count(b" ") >= 2 else b""
+        if path.split(b"?")[0] == b"/metrics":
+            status, body = "200 OK", render().encode("utf-8")
+        else:
+            status, body = "404 Not Found", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("ascii") + body
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _watch_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(METRICS_LOOP_LAG_INTERVAL)
+        lag = max(0.0, loop.time() - started - METRICS_LOOP_LAG_INTERVAL)
+        LOOP_LAG.observe(lag)
+
+
+async def start_metrics_server(port: int, host: str = METRICS_HOST, retry_interval: float = 0):
+    """
+    Serves /metrics on host:port from the running event loop (port 0 = off).
+    Returns the asyncio server, or None.
+
+    With retry_interval, a port that is still taken (by the worker being
+    replaced in a rolling reload, see supervisor.py) is retried until it is
+    free; run it as a task then.
+    """
+    if not port:
+        return None
+    waiting = False
+    while True:
+        try:
+            server = await asyncio.start_server(_handle, host, port)
+            break
+        except OSError as e:
+            if not retry_interval:
+                logger.warning("⚠️ Metrics endpoint not started on %s:%s: %s", host, port, e)
+                return None
+            if not waiting:
+                logger.info("⏳ Metrics port %s:%s busy (%s), retrying until it is free", host, port, e)
+                waiting = True
+            await asyncio.sleep(retry_interval)
+    server.lag_task = asyncio.create_task(_watch_loop_lag())
+    logger.info("📈 Metrics on http://%s:%s/metrics", host, port)
+    return server
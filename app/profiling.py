@@ -0,0 +1,194 @@
+# profiling.py
+"""
+Opt-in per-turn profiling.
+
+A turn is profiled when any of these hold:
+- PROFILE_SAMPLE_EVERY=N   one turn in N (process-wide)
+- PROFILE_SESSIONS=a,b     every turn of those session ids
+- the session sent {"type": "profile", "enabled": true, "token": PROFILE_TOKEN}
+  (ws_server; ignored unless PROFILE_TOKEN is set)
+
+While at least one turn is being profiled, a background thread samples the
+stacks of every other thread (sys._current_frames) every PROFILE_INTERVAL_MS.
+Each profiled turn gets a collapsed-stack file in PROFILE_DIR, one
+"thread;outer;...;inner count" line per stack, ready for flamegraph.pl or
+speedscope. Stacks are process-wide: turns of other callers running at the
+same time show up too.
+
+With PROFILE_TRACEMALLOC=1, profiled sessions also get tracemalloc diffs
+(top allocation growth since the session's previous profiled turn) appended
+to <session>.memory.txt. tracemalloc runs only while such a session is open.
+
+When nothing is enabled, start_turn_profile() is a couple of comparisons.
+"""
+import itertools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from config import (
+    PROFILE_SAMPLE_EVERY, PROFILE_SESSIONS, PROFILE_TOKEN, PROFILE_INTERVAL_MS, PROFILE_TRACEMALLOC, PROFILE_DIR,
+)
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_PROFILE_SESSIONS = {s.strip() for s in PROFILE_SESSIONS.split(",") if s.strip()}
+_turn_counter = itertools.count(1)
+
+# Leaf frames of threads that are just waiting (event loop select, idle pool workers)
+_IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _Sampler:
+    def __init__(self, interval_ms: float = PROFILE_INTERVAL_MS):
+        self.interval = interval_ms / 1000
+        self.active = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, profile):
+        with self.lock:
+            self.active.add(profile)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True, name="profiler")
+                self.thread.start()
+
+    def remove(self, profile):
+        """
+        Stops sampling for `profile`; waits for a sample being counted.
+        """
+        with self.lock:
+            self.active.discard(profile)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+
+            names = {t.ident: t.name for t in threading.enumerate()}
+            keys = []
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                keys.append(names.get(ident, str(ident)) + ";" + ";".join(reversed(stack)))
+
+            # Counted under the lock: once remove() returns, a profile's stacks no longer change
+            with self.lock:
+                for profile in self.active:
+                    for key in keys:
+                        profile.stacks[key] += 1
+            time.sleep(self.interval)
+
+
+_SAMPLER = _Sampler()
+
+
+class TurnProfile:
+    def __init__(self, session_id: str, turn: int):
+        self.session_id = session_id or "local"
+        self.turn = turn
+        self.stacks = Counter()
+        self.started = time.perf_counter()
+
+    def stop(self, outcome: str = "ok") -> str:
+        """
+        Stops sampling for this turn and writes the collapsed stacks; returns the file path.
+        """
+        _SAMPLER.remove(self)
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{self.session_id}-{self.turn}-{int(time.time())}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info("🔬 Profiled turn %s of %s (%s, %.0f ms, %d samples) → %s",
+                    self.turn, self.session_id, outcome, elapsed_ms, sum(self.stacks.values()), path)
+
+        if PROFILE_TRACEMALLOC and self.session_id in _memory:
+            memory_checkpoint(self.session_id, f"turn {self.turn} ({outcome})")
+        return path
+
+
+def profiling_requested(payload: dict) -> bool:
+    """
+    True if a {"type": "profile"} message carries the configured token.
+    """
+    return bool(PROFILE_TOKEN) and payload.get("token") == PROFILE_TOKEN
+
+
+def start_turn_profile(session_id: str, forced: bool = False):
+    """
+    Returns a running TurnProfile if this turn should be profiled, else None.
+    """
+    session_id = session_id or "local"
+    turn = next(_turn_counter)
+    if not (forced
+            or (PROFILE_SAMPLE_EVERY and turn % PROFILE_SAMPLE_EVERY == 0)
+            or (_PROFILE_SESSIONS and session_id in _PROFILE_SESSIONS)):
+        return None
+
+    # Memory diffs only for sessions picked on purpose, not for 1-in-N samples
+    if PROFILE_TRACEMALLOC and (forced or session_id in _PROFILE_SESSIONS) and session_id not in _memory:
+        memory_checkpoint(session_id, "first profiled turn")
+
+    profile = TurnProfile(session_id, turn)
+    _SAMPLER.add(profile)
+    return profile
+
+
+# ====================== MEMORY ======================
+_memory = {}  # session id -> last tracemalloc snapshot
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+)
+
+
+def memory_checkpoint(session_id: str, label: str, top: int = 15):
+    """
+    Appends the allocation growth since this session's previous checkpoint
+    to PROFILE_DIR/<session>.memory.txt (starts tracemalloc on first use).
+    """
+    session_id = session_id or "local"
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+    snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+    previous = _memory.get(session_id)
+    _memory[session_id] = snapshot
+    if previous is None:
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    current, peak = tracemalloc.get_traced_memory()
+    with open(os.path.join(PROFILE_DIR, f"{session_id}.memory.txt"), "a", encoding="utf-8") as f:
+        f.write(f"=== {time.strftime('%H:%M:%S')} {label}: traced {current / 1e6:.1f} MB (peak {peak / 1e6:.1f} MB)\n")
+        for stat in snapshot.compare_to(previous, "lineno")[:top]:
+            f.write(f"{stat}\n")
+
+
+def end_session(session_id: str):
+    """
+    Drops the session's snapshot; stops tracemalloc when no profiled session is left.
+    """
+    if _memory.pop(session_id or "local", None) is not None and not _memory and tracemalloc.is_tracing():
+        tracemalloc.stop()
@@ -5,8 +5,6 @@ import json
 import time
 import threading
 import queue
-import sounddevice as sd
-import numpy as np
 import soundfile as sf
 import simpleaudio as sa
 from datetime import datetime
@@ -15,14 +13,23 @@ from vad_utils import VADDetector
 from services.whisper_service import WhisperService
 from services.ollama_service import OllamaService
 from services.tts_service import TTSService
+from barge_in import BargeInMonitor
+from capture import CaptureEngine
+from endpointing import EndpointPolicy, has_slot_rule, slot_complete
+from config import (
+    BARGE_IN_ENABLED, CAPTURE_RING_SECONDS, CAPTURE_PREROLL_MS, CAPTURE_POSTROLL_MS,
+    ENDPOINT_EARLY_CHECK_MS, ENDPOINT_PARTIAL_ASR, ASR_TRIM_PAD_MS, ASR_MAX_PAUSE_MS, MAX_UTTERANCE_SECONDS,
+    LLM_MAX_REPLY_CHARS,
+)
 from routes.leads import LeadQualification
+from tracing import TurnTrace
+from profiling import start_turn_profile
 from logger import get_logger
 
 logger = get_logger(__name__)
 
 SAMPLE_RATE = 16000
 FRAME_DURATION = 30  # ms
-SILENCE_THRESHOLD = 20
 LEADS_FILE = os.path.join(os.getcwd(), "leads.json")  # ✅ absolute path
 
 TTS_QUEUE = queue.Queue()
@@ -36,40 +43,96 @@ class RealTimeAgentVAD:
         self.tts = TTSService()
         self.vad = VADDetector(aggressiveness=2)
         self.lead_logic = LeadQualification()
+        self.capture = None  # opened on first use, so ws_server never touches the mic
+        self.barge_in = None
+        self.barge_in_start = None  # capture position where the caller talked over the agent
+        self.endpointing = EndpointPolicy(FRAME_DURATION)
+        self.partial_text = None  # transcript of an utterance that was ended early
         logger.info("🎧 RealTimeAgent with VAD initialized")
 
     # ====================== AUDIO RECORDING ======================
+    def _start_audio(self):
+        """
+        Opens the long-lived mic stream and the playback worker (local mode only).
+        """
+        if self.capture is not None:
+            return
+        self.capture = CaptureEngine(SAMPLE_RATE, FRAME_DURATION)
+        self.capture.start()
+        self.barge_in = BargeInMonitor(self.capture) if BARGE_IN_ENABLED else None
+        threading.Thread(target=self._tts_worker, daemon=True).start()
+
     def record_until_silence(self):
+        self._start_audio()
         logger.info("🎤 Start speaking...")
-        buffer = []
         silence_frames = 0
         speech_frames = 0
-        frame_samples = int(SAMPLE_RATE * FRAME_DURATION / 1000)
-
-        sd.sleep(500)
-
-        with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype='int16') as stream:
-            while True:
-                audio_chunk, _ = stream.read(frame_samples)
-                audio_bytes = audio_chunk.tobytes()
-
-                if self.vad.is_speech(audio_bytes, SAMPLE_RATE):
-                    buffer.append(audio_chunk)
-                    silence_frames = 0
-                    speech_frames += 1
-                else:
-                    if speech_frames > 5:
-                        silence_frames += 1
-
-                if speech_frames > 0 and silence_frames > SILENCE_THRESHOLD:
-                    logger.info("🛑 Silence detected — stopping recording")
+        speech_start = speech_end = None
+        pauses = []
+
+        # ⏱️ Short answers (name, budget) end sooner than free-form ones
+        state = self.lead_logic.state
+        hangover = self.endpointing.hangover_frames(state)
+        # ⚡ Partial ASR only where a slot rule can end the turn early (name, company, budget)
+        early_check = ENDPOINT_EARLY_CHECK_MS // FRAME_DURATION if ENDPOINT_PARTIAL_ASR and has_slot_rule(state) else 0
+        self.partial_text = None
+        preroll = int(SAMPLE_RATE * CAPTURE_PREROLL_MS / 1000)
+        postroll = int(SAMPLE_RATE * CAPTURE_POSTROLL_MS / 1000)
+        # Never more than the ring holds, or the start of the utterance would be overwritten
+        max_samples = int(SAMPLE_RATE * min(MAX_UTTERANCE_SECONDS, CAPTURE_RING_SECONDS - 1))
+
+        # Start from whatever the caller already said while barging in
+        start, self.barge_in_start = self.barge_in_start, None
+
+        for pos, audio_chunk in self.capture.frames(start):
+            if self.vad.is_speech(audio_chunk.tobytes(), SAMPLE_RATE):
+                if speech_start is None:
+                    speech_start = pos
+                if silence_frames:
+                    pauses.append(silence_frames)
+                speech_end = pos + len(audio_chunk)
+                silence_frames = 0
+                speech_frames += 1
+            else:
+                if speech_frames > 5:
+                    silence_frames += 1
+
+            if speech_frames > 0 and silence_frames > hangover:
+                logger.info("🛑 Silence detected — stopping recording")
+                break
+
+            # ⏱️ Mic held open: force an endpoint at MAX_UTTERANCE_SECONDS
+            if speech_start is not None and pos - speech_start >= max_samples:
+                logger.warning("⏱️ Utterance reached %.0fs — forcing endpoint", max_samples / SAMPLE_RATE)
+                break
+
+            # ⚡ Short pause after what may already be a full answer: check a partial transcript
+            if early_check and speech_frames > 5 and silence_frames == early_check:
+                audio_data = self.capture.extract(speech_start - preroll, speech_end + postroll)
+                partial = self.whisper.transcribe_pcm(audio_data).strip()
+                if slot_complete(state, partial):
+                    logger.info("⚡ Complete answer heard early: %s", partial)
+                    self.partial_text = partial
                     break
 
-        if len(buffer) == 0:
+        self.endpointing.observe(pauses)
+
+        # One copy out of the ring, including a little audio around the speech
+        audio_data = self.capture.extract(speech_start - preroll, speech_end + postroll)
+        if len(audio_data) == 0:
             logger.warning("⚠️ No speech captured.")
             return None
 
-        audio_data = np.concatenate(buffer, axis=0)
+        # ✂️ Shorten long mid-sentence pauses so Whisper decodes less silence
+        if ASR_MAX_PAUSE_MS:
+            mask = self.vad.speech_mask(audio_data, SAMPLE_RATE, FRAME_DURATION)
+            if mask.any():
+                audio_data = self.vad.trim_speech(
+                    audio_data, mask, self.capture.frame_samples,
+                    pad_frames=ASR_TRIM_PAD_MS // FRAME_DURATION,
+                    max_pause_frames=ASR_MAX_PAUSE_MS // FRAME_DURATION,
+                )
+
         wav_buffer = io.BytesIO()
         sf.write(wav_buffer, audio_data, SAMPLE_RATE, format='WAV')
         wav_buffer.seek(0)
@@ -77,6 +140,11 @@ class RealTimeAgentVAD:
 
     # ====================== SPEECH TO TEXT ======================
     def transcribe(self, audio_buffer):
+        # Already transcribed while deciding to end the turn early
+        if self.partial_text is not None:
+            transcription, self.partial_text = self.partial_text, None
+            return transcription
+
         transcription = self.whisper.transcribe(audio_buffer)
         return transcription.strip()
 
@@ -156,7 +224,7 @@ class RealTimeAgentVAD:
         return re.sub(r"[^A-Za-z0-9\s\-]", "", text).strip()
 
     # ====================== TEXT TO SPEECH ======================
-    def speak(self, text: str):
+    def speak(self, text: str, trace=None):
         try:
             chunks = re.split(r'(?<=[.!?])\s+', text.strip())
             clean_chunks = [
@@ -173,17 +241,47 @@ class RealTimeAgentVAD:
                 logger.warning("⚠️ Nothing to speak after cleaning text.")
                 return
 
-            logger.info(f"🧠 Speaking cleaned text: {clean_text}")
-            audio_buffer = self.tts.synthesize_to_memory(clean_text)
-            wave_obj = sa.WaveObject(audio_buffer.read(), 1, 2, 22050)
-            play_obj = wave_obj.play()
-            play_obj.wait_done()
+            logger.info("🧠 Speaking cleaned text: %s", clean_text)
+            self._start_audio()
+            TTS_STOP_EVENT.clear()
+            done = threading.Event()
+            TTS_QUEUE.put((clean_text, done, trace))
+
+            # ✋ Keep listening while the agent talks; speech cancels synthesis/playback
+            if self.barge_in is not None:
+                self.barge_in_start = self.barge_in.watch(done, TTS_STOP_EVENT)
+            done.wait()
 
         except Exception as e:
-            logger.error(f"❌ TTS synthesis/playback failed: {e}")
+            logger.error("❌ TTS synthesis/playback failed: %s", e)
+
+    def _tts_worker(self):
+        """
+        Synthesizes and plays queued replies; TTS_STOP_EVENT stops playback.
+        """
+        while True:
+            text, done, trace = TTS_QUEUE.get()
+            try:
+                audio_buffer = self.tts.synthesize_to_memory(text)
+                if TTS_STOP_EVENT.is_set():
+                    continue
+                if trace is not None:
+                    trace.mark("playback_start")
+                wave_obj = sa.WaveObject(audio_buffer.read(), 1, 2, 22050)
+                play_obj = wave_obj.play()
+                while play_obj.is_playing():
+                    if TTS_STOP_EVENT.is_set():
+                        play_obj.stop()
+                        break
+                    time.sleep(0.02)
+            except Exception as e:
+                logger.error("❌ TTS synthesis/playback failed: %s", e)
+            finally:
+                done.set()
+                TTS_QUEUE.task_done()
 
     # ====================== LLM RESPONSE ======================
-    def generate_short_response(self, prompt: str):
+    def generate_short_response(self, prompt: str, cancel_event=None, trace=None):
         instruction = (
             "Answer in 1-2 sentences only. "
             "Keep it conversational and concise. "
@@ -191,13 +289,25 @@ class RealTimeAgentVAD:
         )
         full_prompt = f"{instruction}\nUser: {prompt}\nAssistant:"
 
-        llm_response = ""
-        for chunk in self.ollama.stream_generate(full_prompt):
-            llm_response += chunk
-
-        if len(llm_response) > 300:
+        chunks, length = [], 0
+        stream = self.ollama.stream_generate(full_prompt, cancel_event=cancel_event)
+        try:
+            for chunk in stream:
+                if trace is not None:
+                    trace.mark("llm_first_token")
+                chunks.append(chunk)
+                length += len(chunk)
+                if length > LLM_MAX_REPLY_CHARS:
+                    break  # nothing past the cap is spoken; closing the stream stops Ollama
+        finally:
+            stream.close()
+        if trace is not None:
+            trace.mark("llm_last_token")
+
+        llm_response = "".join(chunks)
+        if len(llm_response) > LLM_MAX_REPLY_CHARS:
             logger.warning("⚠️ Response too long, truncating for TTS.")
-            llm_response = llm_response[:300] + "..."
+            llm_response = llm_response[:LLM_MAX_REPLY_CHARS] + "..."
 
         return llm_response.strip()
 
@@ -223,9 +333,9 @@ class RealTimeAgentVAD:
             with open(LEADS_FILE, "w", encoding="utf-8") as f:
                 json.dump(leads, f, indent=2)
 
-            logger.info(f"💾 Lead saved to {LEADS_FILE}")
+            logger.info("💾 Lead saved to %s", LEADS_FILE)
         except Exception as e:
-            logger.error(f"❌ Failed to save lead: {e}")
+            logger.error("❌ Failed to save lead: %s", e)
 
     # ====================== MAIN LOOP ======================
     def run(self):
@@ -236,26 +346,34 @@ class RealTimeAgentVAD:
                 logger.info("⚠️ Nothing recorded, listening again...")
                 continue
 
-            text_input = self.transcribe(audio_buffer)
+            # ⏲️ One trace per turn, starting when the caller stopped talking
+            trace = TurnTrace("local", self.lead_logic.state)
+            profile = start_turn_profile("local")  # None unless PROFILE_* asks for it
+            with trace.span("asr"):
+                text_input = self.transcribe(audio_buffer)
             if not text_input:
                 logger.info("⚠️ No speech detected, listening again...")
+                trace.finish("empty_transcript")
+                if profile is not None:
+                    profile.stop("empty_transcript")
                 continue
 
-            logger.info(f"📝 You said: {text_input}")
+            logger.info("📝 You said: %s", text_input)
 
             if not self.lead_logic.is_qualified():
                 state = self.lead_logic.state
-                if state == "ask_name":
-                    text_input = self.extract_name(text_input)
-                elif state == "ask_company":
-                    text_input = self.extract_company(text_input)
-                elif state == "ask_budget":
-                    text_input = self.extract_budget(text_input)
-                elif state == "ask_interest":
-                    text_input = self.extract_interest(text_input)
-
-                bot_response = self.lead_logic.next_prompt(text_input)
-                logger.info(f"🏷 Lead qualification step. State: {state}")
+                with trace.span("extract"):
+                    if state == "ask_name":
+                        text_input = self.extract_name(text_input)
+                    elif state == "ask_company":
+                        text_input = self.extract_company(text_input)
+                    elif state == "ask_budget":
+                        text_input = self.extract_budget(text_input)
+                    elif state == "ask_interest":
+                        text_input = self.extract_interest(text_input)
+
+                    bot_response = self.lead_logic.next_prompt(text_input)
+                logger.info("🏷 Lead qualification step. State: %s", state)
 
                 if self.lead_logic.is_qualified():
                     lead_data = self.lead_logic.get_lead_data()
@@ -269,17 +387,23 @@ class RealTimeAgentVAD:
                     if "interest" in lead_data:
                         lead_data["interest"] = self.extract_interest(lead_data["interest"])
 
-                    logger.info(f"📥 Lead qualified and captured: {lead_data}")
+                    logger.info("📥 Lead qualified and captured: %s", lead_data)
                     self.save_lead_to_json(lead_data)
 
                     # 🧠 Add goodbye message after qualification
                     bot_response += " Bye!"
 
             else:
-                bot_response = self.generate_short_response(text_input)
-                logger.info(f"✅ Final LLM response: {bot_response}")
-
-            self.speak(bot_response)
+                with trace.span("llm"):
+                    bot_response = self.generate_short_response(text_input, trace=trace)
+                logger.info("✅ Final LLM response: %s", bot_response)
+
+            with trace.span("tts"):
+                self.speak(bot_response, trace=trace)  # synthesis + playback
+            outcome = "cancelled" if TTS_STOP_EVENT.is_set() else "ok"
+            trace.finish(outcome)
+            if profile is not None:
+                profile.stop(outcome)
 
 
 # ====================== ENTRY POINT ======================
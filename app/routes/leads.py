@@ -71,3 +71,16 @@ class LeadQualification:
 
     def get_lead_data(self) -> dict:
         return self.lead_data
+
+    def to_dict(self) -> dict:
+        """
+        Compact, JSON-safe snapshot of the flow (used by session_store).
+        """
+        return {"st": self.state, "m": self.mode, "lead": dict(self.lead_data)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LeadQualification":
+        flow = cls(mode=data.get("m", "bye"))
+        flow.state = data.get("st", "start")
+        flow.lead_data = dict(data.get("lead") or {})
+        return flow
@@ -0,0 +1,122 @@
+import glob
+import io
+import itertools
+import json
+import os
+import socket
+import struct
+
+import numpy as np
+
+from config import INFERENCE_SOCKET_DIR, INFERENCE_TIMEOUT, INPUT_AUDIO_FILE, WHISPER_MODEL_SIZE
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+# Frame = 4-byte big-endian header length + JSON header + raw payload of header["size"] bytes.
+# PCM travels as the raw payload (no pickling, no base64), received straight into one buffer.
+_HEADER_LEN = struct.Struct(">I")
+
+
+def socket_paths(directory: str = INFERENCE_SOCKET_DIR) -> list:
+    return sorted(glob.glob(os.path.join(directory, "inference-*.sock")))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    got = 0
+    while got < size:
+        n = sock.recv_into(view[got:], size - got)
+        if n == 0:
+            raise ConnectionError("Inference socket closed mid-frame")
+        got += n
+    return buf
+
+
+def send_frame(sock: socket.socket, header: dict, payload=b""):
+    payload = memoryview(payload).cast("B")
+    head = json.dumps(dict(header, size=payload.nbytes)).encode("utf-8")
+    # scatter/gather write: the payload is never concatenated or copied
+    parts = [memoryview(_HEADER_LEN.pack(len(head)) + head), payload]
+    while parts:
+        sent = sock.sendmsg(parts)
+        while parts and sent >= parts[0].nbytes:
+            sent -= parts[0].nbytes
+            parts.pop(0)
+        if parts:
+            parts[0] = parts[0][sent:]
+
+
+def recv_frame(sock: socket.socket):
+    (head_len,) = _HEADER_LEN.unpack(_recv_exact(sock, _HEADER_LEN.size))
+    header = json.loads(_recv_exact(sock, head_len))
+    payload = _recv_exact(sock, header.get("size", 0))
+    return header, payload
+
+
+class _InferenceClient:
+    """
+    Round-robins jobs over every inference worker socket found in
+    INFERENCE_SOCKET_DIR, skipping workers that refuse connections.
+    """
+
+    def __init__(self, directory: str = INFERENCE_SOCKET_DIR):
+        self.directory = directory
+        self._counter = itertools.count()
+
+    def call(self, header: dict, payload=b""):
+        paths = socket_paths(self.directory)
+        if not paths:
+            raise RuntimeError(f"No inference workers found in {self.directory}")
+
+        start = next(self._counter)
+        last_error = None
+        for i in range(len(paths)):
+            path = paths[(start + i) % len(paths)]
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(INFERENCE_TIMEOUT)
+                    sock.connect(path)
+                    send_frame(sock, header, payload)
+                    reply, data = recv_frame(sock)
+            except (ConnectionRefusedError, FileNotFoundError) as e:
+                last_error = e
+                continue
+
+            if not reply.get("ok"):
+                raise RuntimeError(f"Inference worker error: {reply.get('error')}")
+            return reply, data
+
+        raise RuntimeError(f"No inference worker reachable: {last_error}")
+
+
+class RemoteWhisperService(_InferenceClient):
+    """
+    Drop-in for WhisperService that runs inference in inference_worker.py.
+    """
+    profile = ("inference-worker", WHISPER_MODEL_SIZE)
+
+    def transcribe(self, audio_file=INPUT_AUDIO_FILE) -> str:
+        if isinstance(audio_file, (str, os.PathLike)):
+            with open(audio_file, "rb") as f:
+                data = f.read()
+        else:
+            data = audio_file.read()
+        reply, _ = self.call({"op": "transcribe_file"}, data)
+        return reply.get("text", "")
+
+    def transcribe_pcm(self, pcm: np.ndarray, sample_rate: int = 16000) -> str:
+        pcm = np.ascontiguousarray(pcm, dtype=np.int16)
+        reply, _ = self.call({"op": "transcribe_pcm", "rate": sample_rate}, pcm)
+        return reply.get("text", "")
+
+
+class RemoteTTSService(_InferenceClient):
+    """
+    Drop-in for the local Coqui TTSService (worker started with --tts).
+    """
+
+    def synthesize_to_memory(self, text: str):
+        _, data = self.call({"op": "tts", "text": text})
+        return io.BytesIO(data)
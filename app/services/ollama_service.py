@@ -2,6 +2,7 @@ import requests
 import json
 from config import OLLAMA_API_URL, OLLAMA_MODEL
 from logger import get_logger
+from metrics import provider_error
 
 logger = get_logger(__name__)
 
@@ -9,7 +10,7 @@ logger = get_logger(__name__)
 class OllamaService:
     def __init__(self, model: str = OLLAMA_MODEL):
         self.model = model
-        logger.info(f"🧠 OllamaService initialized with model: {self.model}")
+        logger.info("🧠 OllamaService initialized with model: %s", self.model)
 
     def generate(self, prompt: str) -> str:
         """
@@ -18,30 +19,70 @@ class OllamaService:
         url = f"{OLLAMA_API_URL}/api/generate"
         payload = {"model": self.model, "prompt": prompt, "stream": False}
 
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
+        try:
+            response = requests.post(url, json=payload)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            provider_error("ollama", e)
+            raise
         data = response.json()
         return data.get("response", "")
 
-    def stream_generate(self, prompt: str):
+    def preload(self):
+        """
+        Loads the model into Ollama's memory without generating anything
+        (empty prompt), so the first caller doesn't wait for it.
+        """
+        url = f"{OLLAMA_API_URL}/api/generate"
+        try:
+            response = requests.post(url, json={"model": self.model, "stream": False})
+            response.raise_for_status()
+        except requests.RequestException as e:
+            provider_error("ollama", e)
+            raise
+
+    def prefill(self, prompt: str):
+        """
+        Evaluates `prompt` and generates a single token. Ollama keeps the
+        evaluated prompt in the model's cache, so a later prompt starting
+        with it only pays for the part after it.
+        """
+        url = f"{OLLAMA_API_URL}/api/generate"
+        payload = {"model": self.model, "prompt": prompt, "stream": False, "options": {"num_predict": 1}}
+        try:
+            response = requests.post(url, json=payload)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            provider_error("ollama", e)
+            raise
+
+    def stream_generate(self, prompt: str, cancel_event=None):
         """
         Stream chunks of LLM response as they are generated.
+        Setting cancel_event closes the stream so Ollama stops generating.
         """
         url = f"{OLLAMA_API_URL}/api/generate"
         payload = {"model": self.model, "prompt": prompt, "stream": True}
 
-        with requests.post(url, json=payload, stream=True) as response:
-            response.raise_for_status()
-            for line in response.iter_lines():
-                if not line:
-                    continue
-                try:
-                    data = json.loads(line.decode("utf-8"))
-                    chunk = data.get("response", "")
-                    if chunk:
-                        yield chunk
-                    if data.get("done"):
+        try:
+            with requests.post(url, json=payload, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if cancel_event is not None and cancel_event.is_set():
+                        logger.info("✋ LLM stream cancelled")
                         break
-                except Exception as e:
-                    logger.error(f"❌ Stream parse error: {e}")
-                    continue
+                    if not line:
+                        continue
+                    try:
+                        data = json.loads(line.decode("utf-8"))
+                        chunk = data.get("response", "")
+                        if chunk:
+                            yield chunk
+                        if data.get("done"):
+                            break
+                    except Exception as e:
+                        logger.error("❌ Stream parse error: %s", e)
+                        continue
+        except requests.RequestException as e:
+            provider_error("ollama", e)
+            raise
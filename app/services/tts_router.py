@@ -0,0 +1,135 @@
+# services/tts_router.py
+"""
+Hedged TTS: ElevenLabs first, a local engine when it is slow or failing.
+
+The remote request starts right away. If its first byte hasn't arrived
+within the hedge deadline, the same text also goes to the local engine and
+whichever finishes first is used: a losing remote stream is closed (no more
+audio is billed), a losing local job's result is dropped (Coqui can't be
+interrupted mid-call). A remote error falls over to the local engine at once.
+
+The deadline follows the remote provider: TTS_HEDGE_PERCENTILE of its recent
+first-byte latencies, clamped to [TTS_HEDGE_MIN_MS, TTS_HEDGE_MAX_MS], so
+only its slow tail gets hedged.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from config import (
+    TTS_CONCURRENCY, TTS_HEDGE_MS, TTS_HEDGE_MIN_MS, TTS_HEDGE_MAX_MS, TTS_HEDGE_PERCENTILE, TTS_HEDGE_WINDOW,
+)
+from services.tts_service_v2 import SynthesisCancelled
+from metrics import TTS_HEDGES, TTS_PROVIDER_SECONDS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+POLL_SECONDS = 0.01
+MIN_SAMPLES = 20  # remote requests seen before the deadline adapts
+
+
+class _FirstByte(threading.Event):
+    """
+    Event that remembers when it was first set.
+    """
+    at = None
+
+    def set(self):
+        if self.at is None:
+            self.at = time.perf_counter()
+        super().set()
+
+
+class TTSRouter:
+    def __init__(self, remote, local):
+        """
+        remote: tts_service_v2.TTSService (ElevenLabs).
+        local:  anything with synthesize_to_memory(text) -> WAV BytesIO
+                (tts_service.TTSService, inference_client.RemoteTTSService).
+        """
+        self.remote = remote
+        self.local = local
+        self.first_byte_ms = deque(maxlen=TTS_HEDGE_WINDOW)
+        # Both attempts of a request run here while the calling (stage) thread waits
+        self.pool = ThreadPoolExecutor(max_workers=2 * TTS_CONCURRENCY, thread_name_prefix="tts-router")
+        logger.info("🔀 TTS router: ElevenLabs with %s fallback", type(local).__name__)
+
+    def deadline(self) -> float:
+        """
+        Seconds to wait for the remote first byte before hedging.
+        """
+        samples = list(self.first_byte_ms)
+        ms = np.percentile(samples, TTS_HEDGE_PERCENTILE) if len(samples) >= MIN_SAMPLES else TTS_HEDGE_MS
+        return min(max(ms, TTS_HEDGE_MIN_MS), TTS_HEDGE_MAX_MS) / 1000
+
+    def _timed(self, provider: str, func, *args, **kwargs):
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        TTS_PROVIDER_SECONDS.observe(time.perf_counter() - started, provider)
+        return result
+
+    def _start_local(self, text: str, trace):
+        if trace is not None:
+            trace.mark("tts_hedge")
+        return self.pool.submit(self._timed, "local", self.local.synthesize_to_memory, text)
+
+    def synthesize_to_memory(self, text: str, cancel_event=None, trace=None):
+        """
+        Same contract as tts_service_v2.TTSService.synthesize_to_memory.
+        """
+        started = time.perf_counter()
+        remote_cancel = threading.Event()
+        first_byte = _FirstByte()
+        remote = self.pool.submit(self._timed, "remote", self.remote.synthesize_to_memory, text,
+                                  cancel_event=remote_cancel, trace=trace, first_byte_event=first_byte)
+        local, hedged = None, False
+        deadline = started + self.deadline()
+
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise SynthesisCancelled(text)
+
+                if remote.done():
+                    if remote.exception() is None:
+                        if hedged:
+                            TTS_HEDGES.inc("remote")
+                        return remote.result()
+                    if local is None:
+                        logger.warning("⚠️ ElevenLabs failed (%s), falling back to local TTS", remote.exception())
+                        local, hedged = self._start_local(text, trace), True
+
+                if local is not None and local.done():
+                    if local.exception() is None:
+                        TTS_HEDGES.inc("local")
+                        return local.result()
+                    if remote.done():
+                        raise remote.exception()  # both failed; the provider's error is the one to report
+                    logger.warning("⚠️ Local TTS failed (%s), waiting for ElevenLabs", local.exception())
+                    local = None
+
+                if not hedged and not first_byte.is_set() and time.perf_counter() >= deadline:
+                    logger.info("🔀 No ElevenLabs audio after %.0f ms, hedging to local TTS",
+                                (time.perf_counter() - started) * 1000)
+                    local, hedged = self._start_local(text, trace), True
+
+                if not hedged and not first_byte.is_set():
+                    first_byte.wait(POLL_SECONDS)  # the deadline still matters: wake up for it
+                else:
+                    # first_byte stays set from here on; sleep on the attempts instead
+                    pending = [f for f in (remote, local) if f is not None and not f.done()]
+                    wait(pending, timeout=POLL_SECONDS, return_when=FIRST_COMPLETED)
+        finally:
+            remote_cancel.set()  # closes the remote stream if it is still running
+            if first_byte.at is not None:
+                self.first_byte_ms.append((first_byte.at - started) * 1000)
+            elif hedged and not remote.done():
+                # Lost without a byte: what we waited is a lower bound, and keeps a slow provider hedged
+                self.first_byte_ms.append((time.perf_counter() - started) * 1000)
+
+    def play(self, audio_buffer, stop_event=None) -> bool:
+        return self.remote.play(audio_buffer, stop_event=stop_event)
@@ -1,54 +1,112 @@
 import os
 import io
-import soundfile as sf
-from TTS.api import TTS
-from config import TTS_MODEL_NAME, TTS_OUTPUT_FILE
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from audio_format import encode_wav
+from config import TTS_MODEL_NAME, TTS_OUTPUT_FILE, TTS_DEVICE, TTS_BATCH_MAX, TTS_BATCH_WAIT_MS
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+
+def pick_device(device: str = TTS_DEVICE) -> str:
+    """
+    "auto" -> "cuda" when torch sees a GPU, else "cpu".
+    """
+    if device != "auto":
+        return device
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
 class TTSService:
-    def __init__(self, model_name: str = TTS_MODEL_NAME):
+    def __init__(self, model_name: str = TTS_MODEL_NAME, device: str = TTS_DEVICE):
         """
         Initialize the TTS model (Glow-TTS).
+
+        The model is owned by one worker thread: any number of threads
+        (sessions, hedged requests) can call synthesize_to_memory at once.
+        Pending sentences are taken in batches of up to TTS_BATCH_MAX and the
+        same sentence asked for by several callers is synthesized once.
         """
-        logger.info(f"🔊 Initializing TTS model: {model_name}")
+        device = pick_device(device)
+        logger.info("🔊 Initializing TTS model: %s on %s", model_name, device)
         try:
-            self.tts = TTS(model_name=model_name, progress_bar=False, gpu=True)
+            from TTS.api import TTS  # Coqui pulls in torch; only when the model is loaded
+            self.tts = TTS(model_name=model_name, progress_bar=False).to(device)
+            self.sample_rate = self.tts.synthesizer.output_sample_rate
             logger.info("✅ TTS model loaded successfully.")
         except Exception as e:
-            logger.error(f"❌ Failed to load TTS model: {e}")
+            logger.error("❌ Failed to load TTS model: %s", e)
             raise
 
+        self.jobs = queue.SimpleQueue()  # (text, Future)
+        threading.Thread(target=self._worker, daemon=True, name="coqui-tts").start()
+
+    # ====================== MODEL WORKER ======================
+    def _next_batch(self) -> list:
+        batch = [self.jobs.get()]
+        deadline = time.perf_counter() + TTS_BATCH_WAIT_MS / 1000
+        while len(batch) < TTS_BATCH_MAX:
+            try:
+                batch.append(self.jobs.get(timeout=max(0.0, deadline - time.perf_counter())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            waiting = {}  # text -> futures, in arrival order
+            for text, future in batch:
+                if future.set_running_or_notify_cancel():
+                    waiting.setdefault(text, []).append(future)
+            if len(batch) > 1:
+                logger.debug("🔊 TTS batch: %d requests, %d distinct", len(batch), len(waiting))
+
+            for text, futures in waiting.items():
+                try:
+                    wav = np.asarray(self.tts.tts(text=text), dtype=np.float32)
+                    result = encode_wav(wav, self.sample_rate)
+                except Exception as e:
+                    logger.error("❌ TTS in-memory synthesis failed: %s", e)
+                    for future in futures:
+                        future.set_exception(e)
+                    continue
+                for future in futures:
+                    future.set_result(result)
+
+    # ====================== API ======================
+    def synthesize_wav_bytes(self, text: str) -> bytes:
+        future = Future()
+        self.jobs.put((text, future))
+        return future.result()
+
     def synthesize(self, text: str, output_file: str = TTS_OUTPUT_FILE) -> str:
         """
         Generate audio from text and save to file.
         """
         try:
-            logger.info(f"📝 Generating speech for text: {text}")
-            self.tts.tts_to_file(text=text, file_path=output_file)
-            logger.info(f"✅ Audio generated at: {os.path.abspath(output_file)}")
+            logger.info("📝 Generating speech for text: %s", text)
+            with open(output_file, "wb") as f:
+                f.write(self.synthesize_wav_bytes(text))
+            logger.info("✅ Audio generated at: %s", os.path.abspath(output_file))
             return output_file
         except Exception as e:
-            logger.error(f"❌ TTS synthesis failed: {e}")
+            logger.error("❌ TTS synthesis failed: %s", e)
             raise
 
     def synthesize_to_memory(self, text: str):
         """
-        Convert text to speech and return as BytesIO (WAV format),
-        so playback can happen without writing to disk.
+        Convert text to speech and return as BytesIO (WAV format), straight
+        from the model's waveform: no temp file, safe to call concurrently.
         """
-        try:
-            # Write to temp wav file
-            temp_path = TTS_OUTPUT_FILE
-            self.tts.tts_to_file(text=text, file_path=temp_path)
-
-            # Read the file into memory
-            data, samplerate = sf.read(temp_path)
-            buffer = io.BytesIO()
-            sf.write(buffer, data, samplerate, format='WAV')
-            buffer.seek(0)
-            return buffer
-        except Exception as e:
-            logger.error(f"❌ TTS in-memory synthesis failed: {e}")
-            raise
+        return io.BytesIO(self.synthesize_wav_bytes(text))
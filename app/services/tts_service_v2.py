@@ -1,10 +1,9 @@
 import os
 import io
-import simpleaudio as sa
+import time
 from dotenv import load_dotenv
-from elevenlabs.client import ElevenLabs
-from pydub import AudioSegment
 from logger import get_logger
+from metrics import provider_error
 
 logger = get_logger(__name__)
 
@@ -14,36 +13,53 @@ load_dotenv()
 ELEVEN_API_KEY = os.getenv("ELEVENLABS_API_KEY")
 ELEVEN_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID", "Xb7hH8MSUJpSbSDYk0k2")
 ELEVEN_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
+ELEVEN_BASE_URL = os.getenv("ELEVENLABS_BASE_URL") or None  # e.g. a local stand-in (bench_e2e.py)
+# mp3_* (default) or pcm_16000 / pcm_22050 / pcm_24000 / pcm_44100 (raw 16-bit, no MP3 decode)
+ELEVEN_OUTPUT_FORMAT = os.getenv("ELEVENLABS_OUTPUT_FORMAT", "mp3_44100_128")
+ELEVEN_TIMEOUT = float(os.getenv("ELEVENLABS_TIMEOUT", "15"))  # seconds per HTTP read; the SDK default is 60
 
 # Playback settings
 TARGET_SAMPLE_RATE = 22050
 TARGET_CHANNELS = 1
 
+
+class SynthesisCancelled(Exception):
+    """
+    Raised when a synthesis is aborted via its cancel_event (barge-in).
+    """
+
+
 class TTSService:
     def __init__(self):
         """
         Initialize ElevenLabs TTS client.
         """
-        logger.info(f"🔊 Initializing ElevenLabs TTS voice: {ELEVEN_VOICE_ID}")
+        logger.info("🔊 Initializing ElevenLabs TTS voice: %s", ELEVEN_VOICE_ID)
         try:
-            self.client = ElevenLabs(api_key=ELEVEN_API_KEY)
+            from elevenlabs.client import ElevenLabs  # SDK (httpx, pydantic models) only once a client is built
+            self.client = ElevenLabs(api_key=ELEVEN_API_KEY, base_url=ELEVEN_BASE_URL, timeout=ELEVEN_TIMEOUT)
             logger.info("✅ ElevenLabs TTS initialized successfully.")
         except Exception as e:
-            logger.error(f"❌ Failed to initialize ElevenLabs TTS: {e}")
+            logger.error("❌ Failed to initialize ElevenLabs TTS: %s", e)
             raise
 
-    def synthesize_to_memory(self, text: str):
+    def synthesize_to_memory(self, text: str, cancel_event=None, trace=None, first_byte_event=None):
         """
         Convert text to speech using ElevenLabs and return as BytesIO WAV.
         Downsamples to match the pipeline's target playback settings.
+        If cancel_event gets set while audio is streaming in, the request is
+        closed (no more audio is billed) and SynthesisCancelled is raised.
+        A TurnTrace (tracing.py) gets tts_first_byte / tts_last_byte marks;
+        first_byte_event is set once audio starts arriving (tts_router.py).
         """
         try:
-            logger.info(f"📝 Generating speech for text: {text}")
+            logger.info("📝 Generating speech for text: %s", text)
 
-            # Stream MP3 audio from ElevenLabs
+            # Stream MP3 (or raw PCM) audio from ElevenLabs
             response = self.client.text_to_speech.convert(
                 voice_id=ELEVEN_VOICE_ID,
                 model_id=ELEVEN_MODEL_ID,
+                output_format=ELEVEN_OUTPUT_FORMAT,
                 text=text,
                 voice_settings={
                     "stability": 0.5,
@@ -52,10 +68,30 @@ class TTSService:
             )
 
             # Combine response chunks
-            mp3_data = b"".join(response)
+            chunks = []
+            for chunk in response:
+                if cancel_event is not None and cancel_event.is_set():
+                    close = getattr(response, "close", None)
+                    if close:
+                        close()
+                    raise SynthesisCancelled(text)
+                if trace is not None:
+                    trace.mark("tts_first_byte")
+                if first_byte_event is not None:
+                    first_byte_event.set()
+                chunks.append(chunk)
+            audio_data = b"".join(chunks)
+            if trace is not None:
+                trace.mark("tts_last_byte")
 
-            # Convert MP3 to WAV and downsample
-            audio_segment = AudioSegment.from_file(io.BytesIO(mp3_data), format="mp3")
+            # Convert MP3 / PCM to WAV and downsample
+            from pydub import AudioSegment
+            if ELEVEN_OUTPUT_FORMAT.startswith("pcm_"):
+                rate = int(ELEVEN_OUTPUT_FORMAT.split("_")[1])
+                audio_data = audio_data[:len(audio_data) - len(audio_data) % 2]
+                audio_segment = AudioSegment(data=audio_data, sample_width=2, frame_rate=rate, channels=1)
+            else:
+                audio_segment = AudioSegment.from_file(io.BytesIO(audio_data), format="mp3")
             audio_segment = audio_segment.set_frame_rate(TARGET_SAMPLE_RATE).set_channels(TARGET_CHANNELS)
 
             # Optional slight slowdown for more natural pacing
@@ -69,18 +105,35 @@ class TTSService:
 
             logger.info("✅ Speech synthesis completed in-memory.")
             return wav_buffer
+        except SynthesisCancelled:
+            logger.info("✋ Speech synthesis cancelled")
+            raise
         except Exception as e:
-            logger.error(f"❌ ElevenLabs TTS synthesis failed: {e}")
+            logger.error("❌ ElevenLabs TTS synthesis failed: %s", e)
+            provider_error("elevenlabs", e)
             raise
 
-    def play(self, audio_buffer: io.BytesIO):
+    def play(self, audio_buffer: io.BytesIO, stop_event=None) -> bool:
         """
         Play audio directly from in-memory buffer.
+        With a stop_event, playback stops as soon as it is set (barge-in).
+        Returns False if playback was interrupted.
         """
         try:
+            import simpleaudio as sa  # local playback only; the server never plays audio
             wave_obj = sa.WaveObject(audio_buffer.read(), num_channels=TARGET_CHANNELS, bytes_per_sample=2, sample_rate=TARGET_SAMPLE_RATE)
             play_obj = wave_obj.play()
-            play_obj.wait_done()
+            if stop_event is None:
+                play_obj.wait_done()
+                return True
+
+            while play_obj.is_playing():
+                if stop_event.is_set():
+                    play_obj.stop()
+                    logger.info("✋ Playback interrupted")
+                    return False
+                time.sleep(0.02)
+            return True
         except Exception as e:
-            logger.error(f"❌ Playback failed: {e}")
+            logger.error("❌ Playback failed: %s", e)
             raise
@@ -1,6 +1,7 @@
-from faster_whisper import WhisperModel
-from config import WHISPER_MODEL_SIZE, WHISPER_DEVICE, INPUT_AUDIO_FILE
+import numpy as np
+from config import WHISPER_MODEL_SIZE, WHISPER_DEVICE, WHISPER_BATCH_SIZE, INPUT_AUDIO_FILE
 from logger import get_logger
+from metrics import provider_error
 
 logger = get_logger(__name__)
 
@@ -10,11 +11,14 @@ class WhisperService:
         Initialize Whisper model on the chosen device.
         """
         try:
-            logger.info(f"🎤 Loading Whisper model: {model_size} on {device}")
+            logger.info("🎤 Loading Whisper model: %s on %s", model_size, device)
+            from faster_whisper import WhisperModel  # heavy (ctranslate2); only when a model is loaded
             self.model = WhisperModel(model_size, device=device)
+            self.profile = ("faster-whisper", model_size, device)  # decoding settings (transcript_cache.py)
+            self.batched = None  # BatchedInferencePipeline, created on first transcribe_batched()
             logger.info("✅ Whisper model loaded successfully")
         except Exception as e:
-            logger.error(f"❌ Failed to load Whisper model: {e}")
+            logger.error("❌ Failed to load Whisper model: %s", e)
             raise
 
     def transcribe(self, audio_file: str = INPUT_AUDIO_FILE) -> str:
@@ -22,11 +26,58 @@ class WhisperService:
         Transcribe the given audio file and return the transcribed text.
         """
         try:
-            logger.info(f"🎧 Transcribing audio file: {audio_file}")
+            logger.info("🎧 Transcribing audio file: %s", audio_file)
             segments, info = self.model.transcribe(audio_file)
             transcription = " ".join([seg.text for seg in segments])
-            logger.info(f"📝 Transcription complete (lang: {info.language}): {transcription}")
+            logger.info("📝 Transcription complete (lang: %s): %s", info.language, transcription)
             return transcription
         except Exception as e:
-            logger.error(f"❌ Whisper transcription failed: {e}")
+            logger.error("❌ Whisper transcription failed: %s", e)
+            provider_error("whisper", e)
+            raise
+
+    def transcribe_batched(self, audio_file: str, batch_size: int = WHISPER_BATCH_SIZE) -> str:
+        """
+        Transcribe a long recording by decoding batch_size of its speech
+        chunks at once (faster-whisper >= 1.1); plain transcribe() otherwise.
+        """
+        if self.batched is None:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+            except ImportError:
+                logger.warning("⚠️ faster-whisper has no BatchedInferencePipeline, decoding sequentially")
+                self.batched = False
+            else:
+                self.batched = BatchedInferencePipeline(model=self.model)
+        if self.batched is False:
+            return self.transcribe(audio_file)
+
+        try:
+            logger.info("🎧 Transcribing audio file (batch of %d): %s", batch_size, audio_file)
+            segments, info = self.batched.transcribe(audio_file, batch_size=batch_size)
+            transcription = " ".join([seg.text for seg in segments])
+            logger.info("📝 Transcription complete (lang: %s, %.1fs)", info.language, info.duration)
+            return transcription
+        except Exception as e:
+            logger.error("❌ Whisper transcription failed: %s", e)
+            provider_error("whisper", e)
+            raise
+
+    def transcribe_pcm(self, pcm: np.ndarray, sample_rate: int = 16000) -> str:
+        """
+        Transcribe raw 16 kHz mono int16 PCM without going through a file.
+        """
+        if sample_rate != 16000:
+            raise ValueError(f"Expected 16000 Hz PCM, got {sample_rate} Hz")
+        try:
+            audio = pcm.astype(np.float32) / 32768.0
+            logger.info("🎧 Transcribing %.2fs of PCM audio", len(audio) / sample_rate)
+            # Callers pass speech already trimmed by our webrtcvad mask; no second VAD pass
+            segments, info = self.model.transcribe(audio, vad_filter=False)
+            transcription = " ".join([seg.text for seg in segments])
+            logger.info("📝 Transcription complete (lang: %s): %s", info.language, transcription)
+            return transcription
+        except Exception as e:
+            logger.error("❌ Whisper transcription failed: %s", e)
+            provider_error("whisper", e)
             raise
@@ -0,0 +1,120 @@
+# session_memory.py
+"""
+Per-session memory accounting and pooled utterance buffers (ws_server).
+
+- SessionMemory: bytes a call currently holds, by kind (streamed audio,
+  queued WAV payloads, decoded PCM, history), the peak, and a budget
+  (SESSION_MEMORY_MAX_BYTES) checked before a call takes more.
+- PCM_POOL: int16 buffers of MAX_UTTERANCE_SECONDS at 16 kHz, created once
+  and reused across turns and calls instead of growing a list of chunks.
+- UtteranceBuffer: one pooled buffer being filled by a streamed utterance;
+  when it is full the caller hit MAX_UTTERANCE_SECONDS and the server
+  forces an endpoint.
+"""
+import numpy as np
+
+from audio_format import PIPELINE_SAMPLE_RATE
+from config import MAX_UTTERANCE_SECONDS, PCM_POOL_BUFFERS, SESSION_MEMORY_MAX_BYTES
+from logger import get_logger
+from metrics import SESSION_PEAK_BYTES
+
+logger = get_logger(__name__)
+
+MAX_UTTERANCE_SAMPLES = int(MAX_UTTERANCE_SECONDS * PIPELINE_SAMPLE_RATE)
+
+
+class BufferPool:
+    def __init__(self, samples: int, size: int):
+        """
+        `size` int16 buffers of `samples` each. np.empty only reserves address
+        space; pages become resident the first time a buffer is written.
+        """
+        self.samples = samples
+        self.size = size
+        self.free = [np.empty(samples, dtype=np.int16) for _ in range(size)]
+        self.misses = 0  # acquires that found the pool empty
+
+    def acquire(self) -> np.ndarray:
+        if self.free:
+            return self.free.pop()
+        self.misses += 1
+        return np.empty(self.samples, dtype=np.int16)
+
+    def release(self, buffer: np.ndarray):
+        # Extra buffers allocated on a miss are left to the GC
+        if len(self.free) < self.size:
+            self.free.append(buffer)
+
+
+PCM_POOL = BufferPool(MAX_UTTERANCE_SAMPLES, PCM_POOL_BUFFERS)
+
+
+class SessionMemory:
+    def __init__(self, limit: int = SESSION_MEMORY_MAX_BYTES):
+        self.limit = limit
+        self.held = {}  # kind -> bytes
+        self.current = 0
+        self.peak = 0
+        self.peak_held = {}
+
+    def fits(self, nbytes: int) -> bool:
+        return not self.limit or self.current + nbytes <= self.limit
+
+    def charge(self, kind: str, nbytes: int):
+        self.held[kind] = self.held.get(kind, 0) + nbytes
+        self.current += nbytes
+        if self.current > self.peak:
+            self.peak = self.current
+            self.peak_held = dict(self.held)
+
+    def release(self, kind: str, nbytes: int):
+        self.charge(kind, -nbytes)
+
+    def set(self, kind: str, nbytes: int):
+        self.charge(kind, nbytes - self.held.get(kind, 0))
+
+    def report(self, session_id: str) -> dict:
+        """
+        Logs the session's peak and records it in voice_session_peak_bytes.
+        """
+        SESSION_PEAK_BYTES.observe(self.peak)
+        breakdown = ", ".join(f"{kind} {nbytes / 1024:.0f} KB" for kind, nbytes in self.peak_held.items() if nbytes)
+        logger.info("🧮 Session %s peak memory %.0f KB (%s)", session_id, self.peak / 1024, breakdown or "nothing held")
+        return {"peak": self.peak, "held": self.peak_held}
+
+
+class UtteranceBuffer:
+    def __init__(self, memory: SessionMemory = None, pool: BufferPool = PCM_POOL):
+        self.pool = pool
+        self.memory = memory
+        self.data = pool.acquire()
+        self.length = 0
+        if memory is not None:
+            memory.charge("audio", self.data.nbytes)
+
+    @property
+    def full(self) -> bool:
+        return self.length >= len(self.data)
+
+    def append(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Copies in as much as fits; returns the samples that did not (empty unless full).
+        """
+        n = min(len(samples), len(self.data) - self.length)
+        self.data[self.length:self.length + n] = samples[:n]
+        self.length += n
+        return samples[n:]
+
+    def pcm(self) -> np.ndarray:
+        """
+        The utterance so far: a view, valid until release().
+        """
+        return self.data[:self.length]
+
+    def release(self):
+        if self.data is None:
+            return
+        if self.memory is not None:
+            self.memory.release("audio", self.data.nbytes)
+        self.pool.release(self.data)
+        self.data = None
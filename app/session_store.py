@@ -0,0 +1,148 @@
+# session_store.py
+"""
+Serializable conversation sessions.
+
+A snapshot is a small JSON dict:
+
+    {
+      "v": 1,                        # format version
+      "sid": "<session id>",
+      "flow": {"st": ..., "m": ..., "lead": {...}},   # LeadQualification.to_dict()
+      "h": [["a", "Hi there!..."], ["u", "my name is shahid"], ...],
+      "ts": 1767458114.32            # last update (unix time)
+    }
+
+Only the last SESSION_HISTORY_TURNS turns of history are kept, so a snapshot
+stays a few hundred bytes and can be written after every turn.
+"""
+import json
+import os
+import time
+import uuid
+
+from config import (
+    SESSION_STORE, SESSION_DIR, SESSION_HISTORY_TURNS, SESSION_TTL_SECONDS, SESSION_STORE_MAX_ENTRIES,
+)
+from routes.leads import LeadQualification
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def make_snapshot(session_id: str, flow: LeadQualification, history: list) -> dict:
+    # history items are (role, text) pairs, role is "u" (user) or "a" (agent)
+    keep = SESSION_HISTORY_TURNS * 2
+    return {
+        "v": SNAPSHOT_VERSION,
+        "sid": session_id,
+        "flow": flow.to_dict(),
+        "h": [list(item) for item in history[-keep:]],
+        "ts": time.time(),
+    }
+
+
+def restore_snapshot(snapshot: dict):
+    """
+    Returns (flow, history) rebuilt from a snapshot.
+    """
+    flow = LeadQualification.from_dict(snapshot.get("flow") or {})
+    history = [tuple(item) for item in snapshot.get("h") or []]
+    return flow, history
+
+
+def _expired(snapshot: dict) -> bool:
+    return time.time() - snapshot.get("ts", 0) > SESSION_TTL_SECONDS
+
+
+class InMemorySessionStore:
+    """
+    Per-process store. Default; sessions survive a dropped socket but not a
+    move to another worker process.
+
+    Snapshots are kept oldest first, so save() can drop the expired ones and,
+    past `max_entries`, the least recently saved without scanning the rest.
+    """
+
+    def __init__(self, max_entries: int = SESSION_STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._sessions = {}  # sid -> snapshot, in order of last save
+
+    def save(self, snapshot: dict):
+        self._sessions.pop(snapshot["sid"], None)
+        self._sessions[snapshot["sid"]] = snapshot
+        self._sweep()
+
+    def _sweep(self):
+        while self._sessions:
+            session_id, oldest = next(iter(self._sessions.items()))
+            if not _expired(oldest) and len(self._sessions) <= self.max_entries:
+                return
+            del self._sessions[session_id]
+
+    def load(self, session_id: str):
+        snapshot = self._sessions.get(session_id)
+        if snapshot is None or _expired(snapshot):
+            self._sessions.pop(session_id, None)
+            return None
+        return snapshot
+
+    def delete(self, session_id: str):
+        self._sessions.pop(session_id, None)
+
+
+class FileSessionStore:
+    """
+    One JSON file per session under SESSION_DIR. Shared by every worker on the
+    host, so a client can reconnect to any of them (local key-value stand-in).
+    """
+
+    def __init__(self, directory: str = SESSION_DIR):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        # session ids are uuid hex; refuse anything that could escape the dir
+        if not session_id.isalnum():
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.json")
+
+    def save(self, snapshot: dict):
+        path = self._path(snapshot["sid"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(tmp_path, path)  # atomic: readers never see half a snapshot
+
+    def load(self, session_id: str):
+        try:
+            path = self._path(session_id)
+            with open(path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if _expired(snapshot):
+            self.delete(session_id)
+            return None
+        return snapshot
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except (OSError, ValueError):
+            pass
+
+
+def create_session_store(kind: str = SESSION_STORE):
+    if kind == "file":
+        logger.info("💾 Using file session store: %s", SESSION_DIR)
+        return FileSessionStore()
+    if kind != "memory":
+        logger.warning("⚠️ Unknown SESSION_STORE '%s', falling back to memory", kind)
+    return InMemorySessionStore()
@@ -0,0 +1,82 @@
+# speculation.py
+"""
+Speculative synthesis of the agent's next prompt.
+
+Most replies of the lead flow don't depend on what the caller says: after
+the company comes the budget question, after the budget the interest
+question, and in "handoff" a fixed closing line. predicted_reply() works
+that out on a copy of the flow, so ws_server can render the prompt (or pick
+it up from TTS_AUDIO_CACHE) while Whisper is still transcribing. Once the
+transcript is in, the real reply either matches, and its audio is ready or
+in flight (confirm), or it doesn't and the synthesis is cancelled (discard).
+
+Replies that repeat the caller's answer (after the name, the qualification
+summary) are never predicted.
+
+The local agent (realtime_agent_v2) answers from the LLM after "handoff";
+there the counterpart is LeadAgent.prefill_short_response(), which gets the
+fixed start of the prompt evaluated by Ollama while Whisper runs.
+"""
+import asyncio
+import threading
+
+from routes.leads import LeadQualification
+from metrics import SPECULATIONS
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+_MARKER = "\x00"  # stands in for the caller's answer
+
+
+def predicted_reply(flow: LeadQualification):
+    """
+    The flow's next reply if it is the same whatever the caller answers, else None.
+    """
+    probe = LeadQualification.from_dict(flow.to_dict())
+    reply = probe.next_prompt(_MARKER)
+    return None if _MARKER in reply else reply
+
+
+def _consume(task: asyncio.Task):
+    # A discarded speculation may still fail (cancelled synthesis, busy stage): nobody awaits it
+    if not task.cancelled():
+        task.exception()
+
+
+class Speculation:
+    def __init__(self, text: str, start):
+        """
+        start(cancel_event) returns the coroutine rendering `text`; it is
+        scheduled right away.
+        """
+        self.text = text
+        self.cancel_event = threading.Event()
+        self.task = asyncio.ensure_future(start(self.cancel_event))
+        self.settled = False
+
+    async def confirm(self, text: str):
+        """
+        The speculated result if `text` is the predicted reply (None if it
+        isn't, or if the speculative run failed); discards it otherwise.
+        """
+        if text != self.text:
+            self.discard()
+            return None
+        self.settled = True
+        try:
+            result = await self.task
+        except Exception as e:
+            logger.warning("⚠️ Speculative synthesis failed, rendering again: %s", e or type(e).__name__)
+            SPECULATIONS.inc("failed")
+            return None
+        SPECULATIONS.inc("confirmed")
+        return result
+
+    def discard(self):
+        if self.settled:
+            return
+        self.settled = True
+        self.cancel_event.set()
+        self.task.add_done_callback(_consume)
+        SPECULATIONS.inc("discarded")
@@ -0,0 +1,207 @@
+# supervisor.py
+"""
+Multi-process ws_server.
+
+Forks WS_WORKERS worker processes that all bind WS_HOST:WS_PORT with
+SO_REUSEPORT, so the kernel spreads incoming calls across cores. The
+supervisor itself never imports ws_server (or any model code), so every
+forked worker loads the current code from disk.
+
+Signals (to the supervisor):
+  SIGHUP          rolling reload: start a replacement, wait until it reports
+                  healthy, then drain and stop the old worker — one at a time
+  SIGTERM/SIGINT  drain all workers (up to WORKER_SHUTDOWN_GRACE) and exit
+
+Health: each worker reports pid, active sessions and event-loop lag every
+WORKER_HEALTH_INTERVAL seconds; the supervisor restarts dead workers and
+writes the latest picture to TEMP_DIR/workers.json.
+"""
+import asyncio
+import json
+import multiprocessing as mp
+import os
+import queue
+import signal
+import time
+
+from config import (
+    WS_HOST, WS_PORT, WS_WORKERS, WORKER_HEALTH_INTERVAL, WORKER_SHUTDOWN_GRACE, TEMP_DIR, METRICS_PORT,
+    WARMUP_TIMEOUT,
+)
+from logger import get_logger, flush_logs
+
+logger = get_logger(__name__)
+
+HEALTH_FILE = os.path.join(TEMP_DIR, "workers.json")
+STALE_AFTER = WORKER_HEALTH_INTERVAL * 3
+
+
+# ====================== WORKER SIDE ======================
+async def _report_health(slot: int, health_queue, ws_server, draining: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(WORKER_HEALTH_INTERVAL)
+        lag = max(0.0, loop.time() - started - WORKER_HEALTH_INTERVAL)
+        health_queue.put({
+            "slot": slot,
+            "pid": os.getpid(),
+            "sessions": ws_server.ACTIVE_SESSIONS,
+            "loop_lag_ms": round(lag * 1000, 1),
+            "draining": draining.is_set(),
+            "ts": time.time(),
+        })
+
+
+async def _worker(slot: int, health_queue):
+    import ws_server  # imported after fork so a reload picks up new code
+    from metrics import start_metrics_server
+
+    loop = asyncio.get_running_loop()
+    draining = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, draining.set)
+    loop.add_signal_handler(signal.SIGINT, lambda: None)  # Ctrl-C hits the whole group; supervisor decides
+
+    # Metrics can't share a port like the websocket does: one side port per slot. After a
+    # reload the old worker of this slot holds it until it has drained, so keep retrying.
+    metrics = asyncio.create_task(start_metrics_server(METRICS_PORT + slot if METRICS_PORT else 0,
+                                                       retry_interval=1.0))
+
+    # Warm up before binding: a replacement takes calls (and reports healthy) only once it is ready
+    await ws_server.prepare()
+
+    async with ws_server.serve(reuse_port=True) as server:
+        reporter = asyncio.create_task(_report_health(slot, health_queue, ws_server, draining))
+        logger.info("👷 Worker %s (pid %s) listening on ws://%s:%s", slot, os.getpid(), WS_HOST, WS_PORT)
+
+        await draining.wait()
+
+        # Stop accepting, but let in-flight calls finish
+        server.server.close()
+        deadline = loop.time() + WORKER_SHUTDOWN_GRACE
+        while ws_server.ACTIVE_SESSIONS and loop.time() < deadline:
+            await asyncio.sleep(0.2)
+
+        if ws_server.ACTIVE_SESSIONS:
+            logger.warning("⚠️ Worker %s closing %s session(s) after grace period", slot, ws_server.ACTIVE_SESSIONS)
+        reporter.cancel()
+        metrics.cancel()
+
+    logger.info("👋 Worker %s (pid %s) stopped", slot, os.getpid())
+
+
+def worker_main(slot: int, health_queue):
+    try:
+        asyncio.run(_worker(slot, health_queue))
+    finally:
+        flush_logs()  # forked children skip atexit
+
+
+# ====================== SUPERVISOR SIDE ======================
+class Supervisor:
+    def __init__(self, workers: int = WS_WORKERS):
+        self.workers = max(1, workers)
+        self.ctx = mp.get_context("fork")
+        self.health_queue = self.ctx.Queue()
+        self.procs = {}    # slot -> Process
+        self.reports = {}  # pid -> latest health report
+        self.reload_requested = False
+        self.stopping = False
+
+    def start_worker(self, slot: int):
+        proc = self.ctx.Process(target=worker_main, args=(slot, self.health_queue), name=f"ws-worker-{slot}")
+        proc.start()
+        logger.info("🚀 Started worker %s (pid %s)", slot, proc.pid)
+        return proc
+
+    def stop_worker(self, proc):
+        if proc.is_alive():
+            proc.terminate()  # SIGTERM -> graceful drain
+        proc.join(WORKER_SHUTDOWN_GRACE + 5)
+        if proc.is_alive():
+            logger.warning("⚠️ Worker pid %s did not drain in time, killing", proc.pid)
+            proc.kill()
+            proc.join()
+        self.reports.pop(proc.pid, None)
+
+    def drain_health(self, timeout: float):
+        try:
+            report = self.health_queue.get(timeout=timeout)
+            while True:
+                self.reports[report["pid"]] = report
+                report = self.health_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def wait_ready(self, proc, timeout: float = WARMUP_TIMEOUT + 60) -> bool:
+        deadline = time.time() + timeout
+        while time.time() < deadline and proc.is_alive():
+            self.drain_health(0.5)
+            if proc.pid in self.reports:
+                return True
+        return False
+
+    def rolling_reload(self):
+        logger.info("🔄 Rolling reload requested")
+        for slot, old in list(self.procs.items()):
+            new = self.start_worker(slot)
+            if not self.wait_ready(new):
+                logger.error("❌ Replacement for worker %s never became healthy; keeping pid %s", slot, old.pid)
+                self.stop_worker(new)
+                continue
+            self.procs[slot] = new
+            self.stop_worker(old)
+        logger.info("✅ Rolling reload complete")
+
+    def check_workers(self):
+        now = time.time()
+        status = []
+        for slot, proc in list(self.procs.items()):
+            if not proc.is_alive():
+                logger.error("❌ Worker %s (pid %s) exited with %s, restarting", slot, proc.pid, proc.exitcode)
+                self.reports.pop(proc.pid, None)
+                proc = self.procs[slot] = self.start_worker(slot)
+
+            report = self.reports.get(proc.pid)
+            healthy = report is not None and now - report["ts"] < STALE_AFTER
+            if report is not None and not healthy:
+                logger.warning("⚠️ Worker %s (pid %s) has not reported for %.1fs", slot, proc.pid, now - report["ts"])
+            status.append({"slot": slot, "pid": proc.pid, "healthy": healthy, **(report or {})})
+
+        tmp_path = f"{HEALTH_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"ts": now, "workers": status}, f, indent=2)
+        os.replace(tmp_path, HEALTH_FILE)
+
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+
+        logger.info("🧭 Supervisor (pid %s) starting %s worker(s) on ws://%s:%s", os.getpid(), self.workers, WS_HOST, WS_PORT)
+        for slot in range(self.workers):
+            self.procs[slot] = self.start_worker(slot)
+
+        while not self.stopping:
+            self.drain_health(WORKER_HEALTH_INTERVAL)
+            if self.reload_requested:
+                self.reload_requested = False
+                self.rolling_reload()
+            self.check_workers()
+
+        logger.info("🛑 Supervisor stopping, draining workers...")
+        for proc in self.procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        for proc in self.procs.values():
+            self.stop_worker(proc)
+
+
+if __name__ == "__main__":
+    Supervisor().run()
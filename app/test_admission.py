@@ -0,0 +1,53 @@
+# test_admission.py
+import asyncio
+import threading
+
+import pytest
+
+from admission import StageLimiter, Busy
+
+
+def test_runs_in_executor_and_frees_the_slot():
+    async def scenario():
+        stage = StageLimiter("asr", concurrency=1, max_queue=1)
+        caller = threading.get_ident()
+        ident = await stage.run(threading.get_ident)
+        return ident != caller, stage.running, stage.has_free_slot()
+
+    assert asyncio.run(scenario()) == (True, 0, True)
+
+
+def test_full_queue_raises_busy():
+    async def scenario():
+        stage = StageLimiter("tts", concurrency=1, max_queue=1)
+        release = threading.Event()
+        running = asyncio.ensure_future(stage.run(release.wait))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.ensure_future(stage.run(lambda: "second"))
+        await asyncio.sleep(0.01)
+        try:
+            assert (stage.running, stage.waiting, stage.has_free_slot()) == (1, 1, False)
+            with pytest.raises(Busy) as excinfo:
+                await stage.run(lambda: "third")
+        finally:
+            release.set()
+        return excinfo.value.stage, await running, await waiting
+
+    assert asyncio.run(scenario()) == ("tts", True, "second")
+
+
+def test_queue_timeout_raises_busy():
+    async def scenario():
+        stage = StageLimiter("asr", concurrency=1, max_queue=4, queue_timeout=0.05)
+        release = threading.Event()
+        running = asyncio.ensure_future(stage.run(release.wait))
+        await asyncio.sleep(0.01)
+        try:
+            with pytest.raises(Busy):
+                await stage.run(lambda: None)
+            return stage.waiting
+        finally:
+            release.set()
+            await running
+
+    assert asyncio.run(scenario()) == 0
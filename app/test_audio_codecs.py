@@ -0,0 +1,75 @@
+# test_audio_codecs.py
+import warnings
+
+import numpy as np
+import pytest
+
+from audio_codecs import available_codecs, create_codec, opuslib
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop  # removed in Python 3.13
+    except ImportError:
+        audioop = None
+
+ALL_INT16 = np.arange(-32768, 32768, dtype=np.int16)
+
+
+@pytest.mark.parametrize("name", ["mulaw", "alaw"])
+def test_g711_round_trip_error_is_bounded(name):
+    codec = create_codec(name, 8000)
+    encoded = codec.encode(ALL_INT16)
+    decoded = codec.decode(encoded)
+
+    assert len(encoded) == len(ALL_INT16)
+    assert decoded.shape == (len(ALL_INT16), 1)
+    error = np.abs(decoded[:, 0].astype(np.int32) - ALL_INT16)
+    # logarithmic: the step grows with the magnitude, up to ~1/16 of it
+    assert np.all(error <= np.maximum(np.abs(ALL_INT16.astype(np.int32)) // 16, 16) + 8)
+
+
+@pytest.mark.skipif(audioop is None, reason="audioop not available")
+@pytest.mark.parametrize("name, lin2x, x2lin", [("mulaw", "lin2ulaw", "ulaw2lin"), ("alaw", "lin2alaw", "alaw2lin")])
+def test_g711_matches_audioop(name, lin2x, x2lin):
+    codec = create_codec(name, 8000)
+    pcm = ALL_INT16.tobytes()
+
+    assert codec.encode(ALL_INT16) == getattr(audioop, lin2x)(pcm, 2)
+    codes = bytes(range(256))
+    assert codec.decode(codes)[:, 0].tobytes() == getattr(audioop, x2lin)(codes, 2)
+
+
+def test_g711_decode_keeps_whole_frames():
+    assert create_codec("mulaw", 8000, channels=2).decode(b"\xff\xff\xff").shape == (1, 2)
+
+
+@pytest.mark.parametrize("name", ["pcm_s16le", "pcm_f32le"])
+def test_pcm_round_trip(name):
+    pcm = np.array([0, 1000, -1000, 32767, -32767], dtype=np.int16)
+    codec = create_codec(name, 16000)
+
+    decoded = codec.decode(codec.encode(pcm))[:, 0]
+
+    assert np.all(np.abs(decoded.astype(np.int32) - pcm) <= 1)
+
+
+def test_unknown_codec_is_rejected():
+    with pytest.raises(ValueError):
+        create_codec("mp3", 16000)
+
+
+@pytest.mark.skipif(opuslib is None, reason="opuslib not installed")
+def test_opus_packets_are_20ms_frames():
+    codec = create_codec("opus", 16000)
+    packets = codec.encode(np.zeros(16000 // 10 + 1, dtype=np.int16))
+
+    assert len(packets) == 6  # 100 ms + 1 sample, padded to whole 20 ms frames
+    assert codec.decode(packets[0]).shape == (320, 1)
+
+
+def test_available_codecs_lists_opus_only_when_installed():
+    codecs = available_codecs()
+
+    assert {"mulaw", "alaw", "pcm_s16le", "pcm_f32le"} <= set(codecs)
+    assert ("opus" in codecs) == (opuslib is not None)
@@ -0,0 +1,96 @@
+# test_audio_format.py
+import io
+import wave
+
+import numpy as np
+import pytest
+
+from audio_format import (
+    PolyphaseResampler, decode_pcm, decode_wav, downmix, encode_wav, to_pipeline_pcm, PIPELINE_SAMPLE_RATE,
+)
+
+
+def tone(freq: float, rate: int, seconds: float = 0.5, amplitude: int = 10000) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return (np.sin(2 * np.pi * freq * t) * amplitude).astype(np.int16)
+
+
+def dominant_freq(samples: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[np.argmax(spectrum)]
+
+
+def test_wav_round_trip():
+    samples = tone(440, 22050)
+    decoded, rate = decode_wav(encode_wav(samples, 22050))
+
+    assert rate == 22050
+    assert decoded.shape == (len(samples), 1)
+    assert np.array_equal(decoded[:, 0], samples)
+
+
+def test_encode_wav_scales_float_samples():
+    decoded, _ = decode_wav(encode_wav(np.array([0.0, 0.5, -1.0, 2.0]), 16000))
+
+    assert decoded[:, 0].tolist() == [0, 16383, -32767, 32767]
+
+
+@pytest.mark.parametrize("width", [1, 3, 4])
+def test_decode_wav_other_sample_widths(width):
+    samples = np.array([0, 256, -256, 32512], dtype=np.int16)
+    wide = samples.astype(np.int32) << 16
+    raw = {
+        1: ((samples >> 8) + 128).astype(np.uint8).tobytes(),
+        3: b"".join(int(v >> 8).to_bytes(3, "little", signed=True) for v in wide),
+        4: wide.astype("<i4").tobytes(),
+    }[width]
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(width)
+        wf.setframerate(8000)
+        wf.writeframes(raw)
+
+    decoded, _ = decode_wav(buffer.getvalue())
+
+    assert decoded[:, 0].tolist() == samples.tolist()
+
+
+def test_decode_pcm_drops_partial_frames():
+    raw = np.array([0.5, -0.5, 1.5], dtype="<f4").tobytes()
+
+    assert decode_pcm(raw, "pcm_f32le", 2).tolist() == [[16383, -16383]]
+    assert decode_pcm(np.arange(5, dtype="<i2").tobytes(), "pcm_s16le", 2).shape == (2, 2)
+
+
+def test_downmix_averages_channels():
+    stereo = np.array([[100, 300], [-100, -300]], dtype=np.int16)
+
+    assert downmix(stereo).tolist() == [200, -200]
+    assert downmix(stereo[:, :1]).tolist() == [100, -100]
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 44100, 48000])
+def test_to_pipeline_pcm_keeps_length_and_pitch(rate):
+    out = to_pipeline_pcm(tone(440, rate).reshape(-1, 1), rate)
+
+    assert out.dtype == np.int16
+    assert abs(len(out) - PIPELINE_SAMPLE_RATE // 2) <= 80  # + the flushed filter tail
+    assert abs(dominant_freq(out, PIPELINE_SAMPLE_RATE) - 440) < 5
+
+
+def test_resampler_streams_like_one_shot():
+    samples = tone(300, 48000, seconds=0.3)
+    one_shot = PolyphaseResampler(48000)
+    whole = one_shot.process(samples)
+
+    streaming = PolyphaseResampler(48000)
+    chunks = [streaming.process(samples[i:i + 777]) for i in range(0, len(samples), 777)]
+
+    assert np.array_equal(np.concatenate(chunks), whole)
+
+
+def test_resampler_filters_content_above_the_new_nyquist():
+    out = to_pipeline_pcm(tone(12000, 48000), 48000)
+
+    assert np.abs(out[100:-100]).max() < 200  # 12 kHz can't exist at 16 kHz; no alias at 4 kHz
@@ -0,0 +1,52 @@
+# test_endpointing.py
+import pytest
+
+from endpointing import EndpointPolicy, has_slot_rule, slot_complete, STATE_HANGOVER_MS, DEFAULT_HANGOVER_MS
+from config import ENDPOINT_MIN_MS, ENDPOINT_MAX_MS
+
+
+@pytest.mark.parametrize("state, text, expected", [
+    ("ask_budget", "around 5000 dollars", True),
+    ("ask_budget", "not sure yet", False),
+    ("ask_name", "my name is shahid.", True),
+    ("ask_name", "my name is", False),
+    ("ask_company", "I work at", False),
+    ("ask_company", "I work at Acme", True),
+    ("ask_interest", "web development", False),  # free-form: always wait for the pause
+    ("ask_name", "  ...  ", False),
+])
+def test_slot_complete(state, text, expected):
+    assert slot_complete(state, text) is expected
+
+
+def test_hangover_starts_from_the_state():
+    policy = EndpointPolicy(frame_duration=30)
+
+    assert policy.hangover_ms("ask_name") == STATE_HANGOVER_MS["ask_name"]
+    assert policy.hangover_ms("unknown") == DEFAULT_HANGOVER_MS
+    assert policy.hangover_frames("ask_name") == STATE_HANGOVER_MS["ask_name"] // 30
+
+
+def test_hangover_follows_the_callers_pauses():
+    slow, fast = EndpointPolicy(30), EndpointPolicy(30)
+    slow.observe([14, 16, 20])  # ~480 ms pauses
+    fast.observe([2, 3, 4])  # ~90 ms pauses
+
+    assert slow.hangover_ms("ask_interest") > STATE_HANGOVER_MS["ask_interest"]
+    assert fast.hangover_ms("ask_interest") < STATE_HANGOVER_MS["ask_interest"]
+    for policy in (slow, fast):
+        assert ENDPOINT_MIN_MS <= policy.hangover_ms("ask_name") <= ENDPOINT_MAX_MS
+
+
+def test_observe_ignores_turns_without_pauses():
+    policy = EndpointPolicy(30)
+    policy.observe([])
+
+    assert policy.pause_ms_ema is None
+
+
+def test_has_slot_rule_matches_the_states_slot_complete_can_end():
+    assert [s for s in ("start", "ask_name", "ask_company", "ask_budget", "ask_interest", "handoff")
+            if has_slot_rule(s)] == ["ask_name", "ask_company", "ask_budget"]
+    for state in ("start", "ask_interest", "handoff"):
+        assert not slot_complete(state, "anything at all 42")
@@ -0,0 +1,113 @@
+# test_framing.py
+import asyncio
+import json
+
+import pytest
+import websockets
+
+from framing import Framer
+
+
+class RecordingSocket:
+    def __init__(self, delay: float = 0, fail_after: int = None):
+        self.frames = []
+        self.delay = delay
+        self.fail_after = fail_after
+
+    async def send(self, frame):
+        if self.fail_after is not None and len(self.frames) >= self.fail_after:
+            raise websockets.ConnectionClosedError(None, None)
+        await asyncio.sleep(self.delay)
+        self.frames.append(frame)
+
+    def events(self) -> list:
+        return [json.loads(f) if isinstance(f, str) else f for f in self.frames]
+
+
+def test_json_mode_sends_each_event():
+    async def scenario():
+        socket = RecordingSocket()
+        framer = Framer(socket)
+        await framer.send({"type": "state", "value": "ask_name"})
+        await framer.send_audio({"type": "tts_audio", "audio": b"\x01\x02"})
+        return socket.events(), framer.bytes_sent
+
+    events, bytes_sent = asyncio.run(scenario())
+
+    assert events == [{"type": "state", "value": "ask_name"}, {"type": "tts_audio", "b64": "AQI="}]
+    assert bytes_sent > 0
+
+
+def test_batch_mode_cuts_a_batch_per_loop_tick():
+    async def scenario():
+        socket = RecordingSocket()
+        framer = Framer(socket)
+        framer.enable_batching()
+        await framer.send({"type": "user_text", "text": "hi"})
+        await framer.send({"type": "agent_text", "text": "hello"})
+        await asyncio.sleep(0)  # the turn awaits something: the batch is cut
+        await framer.send({"type": "state", "value": "ask_company"})
+        await framer.close()
+        return socket.events()
+
+    assert asyncio.run(scenario()) == [
+        {"type": "batch", "events": [{"type": "user_text", "text": "hi"}, {"type": "agent_text", "text": "hello"}]},
+        {"type": "state", "value": "ask_company"},  # a lone event goes as is
+    ]
+
+
+def test_batch_mode_sends_audio_as_a_binary_frame_after_its_header():
+    async def scenario():
+        socket = RecordingSocket()
+        framer = Framer(socket)
+        framer.enable_batching()
+        await framer.send({"type": "agent_text", "text": "hello"})
+        await framer.send_audio({"type": "tts_audio", "codec": "opus", "packets": [b"ab", b"cde"]})
+        await framer.close()
+        return socket.events(), framer.bytes_sent, len(socket.frames[0])
+
+    events, bytes_sent, text_bytes = asyncio.run(scenario())
+
+    assert events == [
+        {"type": "batch", "events": [
+            {"type": "agent_text", "text": "hello"},
+            {"type": "tts_audio", "codec": "opus", "binary": True, "bytes": 5, "packet_sizes": [2, 3]},
+        ]},
+        b"abcde",
+    ]
+    assert bytes_sent == text_bytes + 5
+
+
+def test_senders_wait_while_the_queue_is_over_the_limit():
+    async def scenario():
+        socket = RecordingSocket(delay=0.01)
+        framer = Framer(socket, max_queued_bytes=1000)
+        framer.enable_batching()
+        peak = 0
+        for _ in range(20):
+            await framer.send_audio({"type": "tts_audio", "audio": bytes(400)})
+            peak = max(peak, framer.queued_bytes)
+        await framer.close()
+        return peak, len(socket.frames)
+
+    peak, frames = asyncio.run(scenario())
+
+    assert peak <= 1000 + 400 + 100  # the limit plus the one message let through
+    assert frames == 40
+
+
+def test_closed_connection_reaches_the_sender():
+    async def scenario():
+        socket = RecordingSocket(fail_after=1)
+        framer = Framer(socket)
+        framer.enable_batching()
+        await framer.send({"type": "state", "value": "ask_name"})
+        await asyncio.sleep(0)
+        await framer.send({"type": "state", "value": "ask_company"})
+        await asyncio.sleep(0.01)  # the writer hits the closed socket
+        with pytest.raises(websockets.ConnectionClosed):
+            await framer.send({"type": "state", "value": "ask_budget"})
+        await framer.close()
+        return len(socket.frames)
+
+    assert asyncio.run(scenario()) == 1
@@ -0,0 +1,55 @@
+# test_metrics.py
+from metrics import Counter, Gauge, Histogram, render
+
+
+def _series(text: str, name: str) -> list:
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def test_counter_renders_help_type_and_escaped_labels():
+    counter = Counter("test_calls_total", "Calls by outcome", ["outcome"])
+    counter.inc('said "hi"\n')
+    counter.inc("ok", amount=2.5)
+
+    lines = counter.render()
+
+    assert lines[:2] == ["# HELP test_calls_total Calls by outcome", "# TYPE test_calls_total counter"]
+    assert lines[2:] == ['test_calls_total{outcome="said \\"hi\\"\\n"} 1', 'test_calls_total{outcome="ok"} 2.5']
+
+
+def test_unlabelled_counter_starts_at_zero():
+    assert Counter("test_starts_total", "Starts").render()[-1] == "test_starts_total 0"
+
+
+def test_gauge_callback_is_read_at_render_time():
+    depth = {"asr": 1}
+    gauge = Gauge("test_queue_depth", "Queue depth", ["stage"],
+                  callback=lambda: {(name,): value for name, value in depth.items()})
+    depth["asr"] = 3
+
+    assert gauge.render()[-1] == 'test_queue_depth{stage="asr"} 3'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "asr")
+
+    assert histogram.render()[2:] == [
+        'test_latency_seconds_bucket{stage="asr",le="0.1"} 2',
+        'test_latency_seconds_bucket{stage="asr",le="1.0"} 3',
+        'test_latency_seconds_bucket{stage="asr",le="+Inf"} 4',
+        'test_latency_seconds_sum{stage="asr"} 2.65',
+        'test_latency_seconds_count{stage="asr"} 4',
+    ]
+
+
+def test_render_skips_a_failing_metric():
+    Gauge("test_broken", "Raises", callback=lambda: 1 / 0)
+    Counter("test_after_broken_total", "Rendered anyway").inc()
+
+    text = render()
+
+    assert text.endswith("\n")
+    assert _series(text, "test_broken") == []
+    assert _series(text, "test_after_broken_total") == ["test_after_broken_total 1"]
@@ -0,0 +1,57 @@
+# test_session_memory.py
+import numpy as np
+
+from session_memory import BufferPool, SessionMemory, UtteranceBuffer
+
+
+def test_memory_tracks_current_and_peak_by_kind():
+    memory = SessionMemory(limit=1000)
+    memory.charge("audio", 600)
+    memory.charge("pcm", 300)
+    memory.release("audio", 600)
+    memory.set("history", 200)
+    memory.set("history", 50)
+
+    assert memory.current == 350
+    assert memory.peak == 900
+    assert memory.peak_held == {"audio": 600, "pcm": 300}
+    assert memory.fits(650) and not memory.fits(651)
+    assert SessionMemory(limit=0).fits(10 ** 12)  # 0 = no limit
+
+
+def test_report_returns_the_peak():
+    memory = SessionMemory()
+    memory.charge("pcm", 2048)
+
+    assert memory.report("abc") == {"peak": 2048, "held": {"pcm": 2048}}
+
+
+def test_pool_reuses_buffers_and_counts_misses():
+    pool = BufferPool(samples=16, size=1)
+    first = pool.acquire()
+    extra = pool.acquire()
+    pool.release(first)
+    pool.release(extra)  # pool already full: left to the GC
+
+    assert pool.misses == 1
+    assert len(pool.free) == 1 and pool.free[0] is first
+    assert pool.acquire() is first
+
+
+def test_utterance_buffer_fills_up_and_returns_the_overflow():
+    pool = BufferPool(samples=10, size=1)
+    memory = SessionMemory()
+    buffer = UtteranceBuffer(memory, pool)
+
+    assert len(buffer.append(np.arange(6, dtype=np.int16))) == 0
+    overflow = buffer.append(np.arange(6, 12, dtype=np.int16))
+
+    assert buffer.full
+    assert buffer.pcm().tolist() == list(range(10))
+    assert overflow.tolist() == [10, 11]
+    assert memory.held["audio"] == 20
+
+    buffer.release()
+    buffer.release()  # twice is harmless
+    assert memory.current == 0
+    assert len(pool.free) == 1
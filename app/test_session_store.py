@@ -0,0 +1,64 @@
+# test_session_store.py
+import time
+
+from routes.leads import LeadQualification
+from session_store import InMemorySessionStore, FileSessionStore, make_snapshot, restore_snapshot
+from config import SESSION_TTL_SECONDS
+
+
+def _snapshot(session_id: str, age: float = 0) -> dict:
+    snapshot = make_snapshot(session_id, LeadQualification(), [("a", "Hi there!")])
+    snapshot["ts"] -= age
+    return snapshot
+
+
+def test_snapshot_round_trip():
+    flow = LeadQualification()
+    flow.next_prompt()
+    flow.next_prompt("shahid")
+    history = [("a", "Hi there!"), ("u", "shahid")]
+
+    restored_flow, restored_history = restore_snapshot(make_snapshot("abc", flow, history))
+
+    assert restored_flow.state == "ask_company"
+    assert restored_flow.lead_data == {"name": "shahid"}
+    assert restored_history == history
+
+
+def test_memory_store_expires_on_load():
+    store = InMemorySessionStore()
+    store.save(_snapshot("old", age=SESSION_TTL_SECONDS + 1))
+
+    assert store.load("old") is None
+    assert "old" not in store._sessions
+
+
+def test_memory_store_sweeps_expired_on_save():
+    store = InMemorySessionStore()
+    store.save(_snapshot("old", age=SESSION_TTL_SECONDS + 1))
+    store.save(_snapshot("new"))
+
+    assert list(store._sessions) == ["new"]
+
+
+def test_memory_store_evicts_least_recently_saved():
+    store = InMemorySessionStore(max_entries=2)
+    for session_id in ("a", "b"):
+        store.save(_snapshot(session_id))
+    store.save(_snapshot("a"))  # saved again: now the newest
+    store.save(_snapshot("c"))
+
+    assert store.load("b") is None
+    assert store.load("a") is not None and store.load("c") is not None
+
+
+def test_file_store_expires_and_rejects_bad_ids(tmp_path):
+    store = FileSessionStore(str(tmp_path))
+    store.save(_snapshot("fresh"))
+    store.save(_snapshot("stale", age=SESSION_TTL_SECONDS + 1))
+
+    assert store.load("fresh")["sid"] == "fresh"
+    assert store.load("stale") is None
+    assert not (tmp_path / "stale.json").exists()
+    assert store.load("../etc/passwd") is None
+    assert time.time() - store.load("fresh")["ts"] < 5
@@ -0,0 +1,67 @@
+# test_speculation.py
+import asyncio
+
+from routes.leads import LeadQualification
+from speculation import Speculation, predicted_reply
+
+
+def _flow_at(state: str, mode: str = "bye") -> LeadQualification:
+    flow = LeadQualification(mode)
+    flow.next_prompt()
+    while flow.state != state:
+        flow.next_prompt("answer")
+    return flow
+
+
+def test_predicts_only_replies_that_ignore_the_answer():
+    assert predicted_reply(_flow_at("ask_name")) is None  # repeats the name
+    assert predicted_reply(_flow_at("ask_company")).startswith("Got it. What's your estimated budget")
+    assert predicted_reply(_flow_at("ask_budget")).startswith("Great. Could you tell me")
+    assert predicted_reply(_flow_at("ask_interest")) is None  # summarises the lead
+    assert predicted_reply(_flow_at("handoff")) == "Thanks again — bye!"
+
+
+def test_prediction_leaves_the_flow_untouched():
+    flow = _flow_at("ask_company")
+    predicted_reply(flow)
+
+    assert flow.state == "ask_company"
+    assert "company" not in flow.lead_data
+
+
+def test_confirm_returns_the_speculated_result():
+    async def scenario():
+        async def render(cancel_event):
+            return "audio"
+        speculation = Speculation("Thanks again — bye!", render)
+        return await speculation.confirm("Thanks again — bye!")
+
+    assert asyncio.run(scenario()) == "audio"
+
+
+def test_a_different_reply_cancels_the_speculation():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def render(cancel_event):
+            started.set()
+            while not cancel_event.is_set():
+                await asyncio.sleep(0.001)
+            raise RuntimeError("cancelled")
+        speculation = Speculation("Thanks again — bye!", render)
+        await started.wait()
+        result = await speculation.confirm("Something else")
+        await asyncio.sleep(0.01)  # the failed render is consumed, not reported
+        return result, speculation.cancel_event.is_set(), speculation.task.done()
+
+    assert asyncio.run(scenario()) == (None, True, True)
+
+
+def test_a_failed_render_is_not_used():
+    async def scenario():
+        async def render(cancel_event):
+            raise RuntimeError("tts busy")
+        speculation = Speculation("Thanks again — bye!", render)
+        return await speculation.confirm("Thanks again — bye!")
+
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,51 @@
+# test_transcript_cache.py
+import numpy as np
+
+from lru_cache import SizedLRUCache
+from transcript_cache import transcript_key
+
+
+def test_lru_evicts_least_recently_used_by_size():
+    cache = SizedLRUCache(max_bytes=10)
+    cache.put("a", "A", 4)
+    cache.put("b", "B", 4)
+    assert cache.get("a") == "A"  # "b" is now the oldest
+
+    cache.put("c", "C", 4)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    assert (len(cache), cache.bytes) == (2, 8)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_replacing_a_key_updates_its_size():
+    cache = SizedLRUCache(max_bytes=10)
+    cache.put("a", "short", 2)
+    cache.put("a", "longer", 6)
+
+    assert (cache.get("a"), cache.bytes, len(cache)) == ("longer", 6, 1)
+
+
+def test_lru_skips_values_larger_than_the_cache():
+    cache = SizedLRUCache(max_bytes=10)
+    cache.put("a", "A", 4)
+    cache.put("huge", "H", 11)
+
+    assert cache.get("huge") is None
+    assert cache.get("a") == "A"
+
+    disabled = SizedLRUCache(max_bytes=0)
+    disabled.put("a", "A", 1)
+    assert len(disabled) == 0
+
+
+def test_transcript_key_depends_on_pcm_and_profile():
+    pcm = np.arange(1600, dtype=np.int16)
+    profile = ("faster-whisper", "small", "cpu")
+    key = transcript_key(pcm, profile)
+
+    assert transcript_key(pcm.copy(), profile) == key
+    assert transcript_key(pcm[::-1], profile) != key
+    assert transcript_key(pcm, ("faster-whisper", "medium", "cpu")) != key
+    assert transcript_key(pcm, profile, sample_rate=8000) != key
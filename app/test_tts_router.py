@@ -0,0 +1,68 @@
+# test_tts_router.py
+import io
+import threading
+import time
+
+import pytest
+
+from services.tts_router import TTSRouter
+from services.tts_service_v2 import SynthesisCancelled
+
+
+class FakeRemote:
+    def __init__(self, first_byte_after: float = 0.01, total: float = 0.5, fail: bool = False):
+        self.first_byte_after = first_byte_after
+        self.total = total
+        self.fail = fail
+
+    def synthesize_to_memory(self, text, cancel_event=None, trace=None, first_byte_event=None):
+        if cancel_event.wait(self.first_byte_after):
+            raise SynthesisCancelled(text)
+        if self.fail:
+            raise RuntimeError("remote down")
+        first_byte_event.set()
+        if cancel_event.wait(self.total - self.first_byte_after):
+            raise SynthesisCancelled(text)
+        return io.BytesIO(b"remote")
+
+
+class FakeLocal:
+    def __init__(self, seconds: float = 0.05):
+        self.seconds = seconds
+
+    def synthesize_to_memory(self, text):
+        time.sleep(self.seconds)
+        return io.BytesIO(b"local")
+
+
+def test_waiting_for_a_streaming_remote_does_not_spin():
+    router = TTSRouter(FakeRemote(first_byte_after=0.01, total=0.5), FakeLocal())
+    cpu = time.thread_time()
+
+    audio = router.synthesize_to_memory("hello")
+
+    assert audio.getvalue() == b"remote"
+    assert time.thread_time() - cpu < 0.1  # was ~0.5 s: a busy loop once the first byte arrived
+
+
+def test_remote_failure_falls_back_to_local():
+    router = TTSRouter(FakeRemote(fail=True), FakeLocal())
+
+    assert router.synthesize_to_memory("hello").getvalue() == b"local"
+
+
+def test_slow_first_byte_is_hedged():
+    router = TTSRouter(FakeRemote(first_byte_after=5, total=5), FakeLocal())
+    started = time.perf_counter()
+
+    assert router.synthesize_to_memory("hello").getvalue() == b"local"
+    assert time.perf_counter() - started < 4
+
+
+def test_cancel_event_stops_waiting():
+    router = TTSRouter(FakeRemote(first_byte_after=0.01, total=5), FakeLocal())
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+
+    with pytest.raises(SynthesisCancelled):
+        router.synthesize_to_memory("hello", cancel_event=cancel)
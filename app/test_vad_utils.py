@@ -0,0 +1,79 @@
+# test_vad_utils.py
+import numpy as np
+
+from vad_utils import VADDetector
+
+SAMPLE_RATE = 16000
+FRAME_SAMPLES = 480  # 30 ms
+
+
+def voiced(seconds: float) -> np.ndarray:
+    # A few harmonics of 150 Hz: loud, low zero-crossing rate, accepted by webrtcvad
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    wave = sum(np.sin(2 * np.pi * 150 * k * t) / k for k in range(1, 6))
+    return (wave * 6000).astype(np.int16)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(SAMPLE_RATE * seconds), dtype=np.int16)
+
+
+def test_speech_mask_one_flag_per_complete_frame():
+    vad = VADDetector(2)
+    pcm = np.concatenate((silence(0.3), voiced(0.6), silence(0.3)))
+    mask = vad.speech_mask(np.concatenate((pcm, voiced(0.01))), SAMPLE_RATE, 30)
+
+    assert len(mask) == len(pcm) // FRAME_SAMPLES
+    assert not mask[:10].any() and not mask[-10:].any()
+    assert mask[10:30].all()
+
+
+def test_speech_mask_rejects_hiss_before_webrtcvad():
+    hiss = np.tile(np.array([4000, -4000], dtype=np.int16), SAMPLE_RATE // 4)  # zero-crossing rate ~1
+
+    assert not VADDetector(2).speech_mask(hiss).any()
+
+
+def test_speech_mask_of_a_short_buffer_is_empty():
+    assert VADDetector(2).speech_mask(silence(0.01)).shape == (0,)
+
+
+def test_speech_segments_merge_short_gaps():
+    mask = np.array([0, 1, 1, 0, 1, 0, 0, 0, 1, 0], dtype=bool)
+
+    assert VADDetector.speech_segments(mask, 10) == [(10, 30), (40, 50), (80, 90)]
+    assert VADDetector.speech_segments(mask, 10, max_gap_frames=1) == [(10, 50), (80, 90)]
+    assert VADDetector.speech_segments(np.zeros(4, dtype=bool), 10) == []
+
+
+def test_trim_speech_keeps_padding_around_speech():
+    pcm = np.arange(100, dtype=np.int16)
+    mask = np.array([0, 0, 0, 1, 1, 0, 0, 0, 0, 0], dtype=bool)
+
+    trimmed = VADDetector.trim_speech(pcm, mask, 10, pad_frames=1)
+
+    assert trimmed.tolist() == list(range(20, 60))
+
+
+def test_trim_speech_shortens_long_pauses():
+    pcm = np.concatenate((voiced(0.3), silence(1.5), voiced(0.3)))
+    mask = np.zeros(len(pcm) // FRAME_SAMPLES, dtype=bool)
+    mask[:10] = mask[-10:] = True
+
+    trimmed = VADDetector.trim_speech(pcm, mask, FRAME_SAMPLES, pad_frames=2, max_pause_frames=10)
+
+    # both 300 ms words survive; the 1.5 s pause shrinks to max_pause_frames (5 + 5)
+    assert len(trimmed) == (10 + 5) * FRAME_SAMPLES * 2
+    assert np.array_equal(trimmed[:10 * FRAME_SAMPLES], pcm[:10 * FRAME_SAMPLES])
+
+
+def test_trim_speech_without_speech_is_empty():
+    assert len(VADDetector.trim_speech(silence(0.3), np.zeros(10, dtype=bool), FRAME_SAMPLES)) == 0
+
+
+def test_pause_frames_only_counts_gaps_inside_the_utterance():
+    mask = np.array([0, 0, 1, 1, 0, 0, 0, 1, 0, 1, 1, 0, 0], dtype=bool)
+
+    assert VADDetector.pause_frames(mask) == [3, 1]
+    assert VADDetector.pause_frames(np.ones(5, dtype=bool)) == []
+    assert VADDetector.pause_frames(np.zeros(5, dtype=bool)) == []
@@ -5,6 +5,11 @@ import websockets
 
 WAV_PATH = "test_audio.wav"
 
+
+async def send_wav(ws, wav_bytes: bytes):
+    await ws.send(json.dumps({"type": "audio", "b64": base64.b64encode(wav_bytes).decode("utf-8")}))
+
+
 async def run():
     async with websockets.connect("ws://localhost:8765") as ws:
         # Initial messages from server
@@ -12,9 +17,7 @@ async def run():
         print("INIT:", await ws.recv())
 
         with open(WAV_PATH, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode("utf-8")
-
-        await ws.send(json.dumps({"type": "audio", "b64": b64}))
+            await send_wav(ws, f.read())
 
         # Print responses until we get an agent reply (or error)
         for _ in range(10):
@@ -23,4 +26,6 @@ async def run():
             if '"type": "error"' in msg:
                 break
 
-asyncio.run(run())
+
+if __name__ == "__main__":
+    asyncio.run(run())
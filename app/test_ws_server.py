@@ -0,0 +1,263 @@
+# test_ws_server.py
+"""
+CallSession end to end through handler(), with a fake websocket and fake
+Whisper / TTS services.
+"""
+import asyncio
+import base64
+import io
+import itertools
+import json
+import threading
+
+import numpy as np
+import pytest
+
+import ws_server
+from admission import StageLimiter
+from audio_format import encode_wav
+from lru_cache import SizedLRUCache
+from services.tts_service_v2 import SynthesisCancelled
+from session_memory import MAX_UTTERANCE_SAMPLES, SessionMemory
+from session_store import InMemorySessionStore
+
+_profiles = itertools.count()
+
+
+class FakeSocket:
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.changed = asyncio.Event()
+        self.close_code = None
+        self.request = None
+        self.path = ""
+
+    async def send(self, frame):
+        self.sent.append(frame)
+        self.changed.set()
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        self.close_code = code
+        self.incoming.put_nowait(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    def push(self, message):
+        self.incoming.put_nowait(message if message is None else json.dumps(message))
+
+    def events(self) -> list:
+        # Batch frames flattened; binary audio frames kept as bytes
+        events = []
+        for frame in self.sent:
+            if isinstance(frame, bytes):
+                events.append(frame)
+                continue
+            event = json.loads(frame)
+            events.extend(event["events"] if event.get("type") == "batch" else [event])
+        return events
+
+    def types(self) -> list:
+        return [e if isinstance(e, bytes) else e["type"] for e in self.events()]
+
+    async def wait_for(self, predicate, timeout: float = 5):
+        async def poll():
+            while not predicate(self.events()):
+                self.changed.clear()
+                await self.changed.wait()
+        await asyncio.wait_for(poll(), timeout)
+
+
+class FakeWhisper:
+    def __init__(self, text: str = "my name is shahid", delay: float = 0):
+        self.text = text
+        self.delay = delay
+        self.profile = ("fake", next(_profiles))  # no transcript cache hits across tests
+
+    def transcribe_pcm(self, pcm, sample_rate: int = 16000) -> str:
+        threading.Event().wait(self.delay)
+        return self.text
+
+
+class FakeTTS:
+    def __init__(self, block: bool = False):
+        self.block = block  # hold every synthesis until it is cancelled
+        self.started = threading.Event()
+
+    def synthesize_to_memory(self, text, cancel_event=None, trace=None):
+        self.started.set()
+        if self.block and cancel_event is not None and cancel_event.wait(5):
+            raise SynthesisCancelled(text)
+        return io.BytesIO(encode_wav(np.zeros(160, dtype=np.int16), 16000))
+
+
+def utterance(freq: float = 150) -> dict:
+    # ~0.6 s of voiced sound between silences: passes the VAD gate
+    t = np.arange(int(16000 * 0.6)) / 16000
+    voiced = sum(np.sin(2 * np.pi * freq * k * t) / k for k in range(1, 6)) * 6000
+    pcm = np.concatenate((np.zeros(4800), voiced, np.zeros(4800))).astype(np.int16)
+    return {"type": "audio", "b64": base64.b64encode(encode_wav(pcm, 16000)).decode("ascii")}
+
+
+@pytest.fixture
+def services(monkeypatch, tmp_path):
+    services = {"whisper": FakeWhisper(), "ollama": object(), "tts": FakeTTS()}
+    monkeypatch.setattr(ws_server, "_SERVICES", services)
+    monkeypatch.setattr(ws_server, "SESSIONS", InMemorySessionStore())
+    monkeypatch.setattr(ws_server, "LEADS_FILE", str(tmp_path / "leads.json"))
+    monkeypatch.setattr(ws_server, "SPECULATION_ENABLED", False)
+    monkeypatch.setattr(ws_server, "TTS_AUDIO_CACHE", SizedLRUCache(1024 * 1024))  # every prompt is synthesized
+    return services
+
+
+async def open_call(socket: FakeSocket):
+    call = asyncio.ensure_future(ws_server.handler(socket))
+    await socket.wait_for(lambda events: any(e["type"] == "tts_audio" for e in events))
+    return call
+
+
+async def hang_up(socket: FakeSocket, call):
+    socket.push(None)
+    await asyncio.wait_for(call, 5)
+
+
+def test_reset_after_barge_in_speaks_the_greeting(services):
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        socket.push({"type": "barge_in"})
+        await socket.wait_for(lambda events: events[-1]["type"] == "tts_cancel")
+        socket.push({"type": "reset"})
+        await socket.wait_for(lambda events: events[-1]["type"] == "agent_speaking" and not events[-1]["value"])
+        await hang_up(socket, call)
+        types = socket.types()
+        return types[types.index("tell"):]
+
+    assert asyncio.run(scenario()) == [
+        "tell", "session", "state", "agent_text", "agent_speaking", "tts_audio", "agent_speaking",
+    ]
+
+
+def test_barge_in_cancels_the_reply_being_synthesized(services):
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        services["tts"].block = True
+        services["tts"].started.clear()
+        socket.push(utterance())
+        await asyncio.get_running_loop().run_in_executor(None, services["tts"].started.wait, 5)
+        socket.push({"type": "barge_in"})
+        await socket.wait_for(lambda events: "tts_cancel" in [e["type"] for e in events])
+        await hang_up(socket, call)
+        types = socket.types()
+        return types[types.index("user_text"):]
+
+    # The caller's answer is taken, the reply text goes out, its audio never does
+    assert asyncio.run(scenario()) == ["user_text", "state", "agent_text", "tts_cancel"]
+
+
+def test_callers_over_the_session_cap_are_turned_away(services, monkeypatch):
+    monkeypatch.setattr(ws_server, "MAX_ACTIVE_SESSIONS", 0)
+
+    async def scenario():
+        socket = FakeSocket()
+        await asyncio.wait_for(ws_server.handler(socket), 5)
+        return socket.events(), socket.close_code
+
+    events, close_code = asyncio.run(scenario())
+
+    assert events[0]["type"] == "busy" and close_code == 1013
+    assert ws_server.ACTIVE_SESSIONS == 0
+
+
+def test_a_full_asr_stage_sheds_the_utterance(services, monkeypatch):
+    monkeypatch.setitem(ws_server.STAGES, "asr", StageLimiter("asr", concurrency=1, max_queue=0))
+
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        socket.push(utterance())
+        await socket.wait_for(lambda events: events[-1]["type"] == "busy")
+        await hang_up(socket, call)
+        return socket.events()[-1]
+
+    busy = asyncio.run(scenario())
+
+    assert (busy["stage"], busy["retry_after"]) == ("asr", ws_server.BUSY_RETRY_AFTER)
+
+
+def test_an_utterance_overtaken_by_a_newer_one_is_dropped(services):
+    services["whisper"].delay = 0.3
+
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        socket.push(utterance(150))
+        socket.push(utterance(180))  # the caller spoke again while the first was transcribed
+        await socket.wait_for(lambda events: "user_text" in [e["type"] for e in events])
+        await hang_up(socket, call)
+        return [e.get("value", e["type"]) for e in socket.events() if e["type"] in ("vad", "user_text")]
+
+    assert asyncio.run(scenario()) == ["stale_dropped", "user_text"]
+
+
+def test_batch_framed_turn_sends_binary_audio_after_its_header(services):
+    pcm = np.frombuffer(base64.b64decode(utterance()["b64"])[44:], dtype=np.int16)  # past the WAV header
+
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        socket.push({"type": "hello", "framing": "batch"})
+        await socket.wait_for(lambda events: events[-1]["type"] == "hello_ok")
+        greeting_frames = len(socket.sent)
+        for chunk in np.array_split(pcm, 8):
+            socket.push({"type": "audio_chunk", "b64": base64.b64encode(chunk.tobytes()).decode("ascii")})
+        socket.push({"type": "audio_end"})
+        await socket.wait_for(lambda events: isinstance(events[-1], dict) and events[-1]["type"] == "agent_speaking"
+                              and not events[-1]["value"] and "user_text" in socket.types())
+        await hang_up(socket, call)
+        return socket.sent[greeting_frames:]
+
+    frames = asyncio.run(scenario())
+
+    # user_text, state and agent_text leave as one batch; the audio follows its header as binary
+    binary = [i for i, frame in enumerate(frames) if isinstance(frame, bytes)]
+    assert len(binary) == 1 and len(frames) < 8
+    header = json.loads(frames[binary[0] - 1])
+    header = header["events"][-1] if header["type"] == "batch" else header
+    assert header["type"] == "tts_audio" and header["binary"] is True
+    assert header["bytes"] == len(frames[binary[0]])
+    assert json.loads(frames[0])["type"] == "batch"
+
+
+def test_streaming_past_a_forced_cut_stays_within_the_memory_limit(services, monkeypatch):
+    limit = MAX_UTTERANCE_SAMPLES * 2 + 16 * 1024  # one utterance buffer plus history
+    memories = []
+
+    def session_memory():
+        memories.append(SessionMemory(limit=limit))
+        return memories[-1]
+    monkeypatch.setattr(ws_server, "SessionMemory", session_memory)
+    chunk = {"type": "audio_chunk", "b64": base64.b64encode(bytes(32000)).decode("ascii")}  # 1 s of silence
+
+    async def scenario():
+        socket = FakeSocket()
+        call = await open_call(socket)
+        for _ in range(int(MAX_UTTERANCE_SAMPLES / 16000) + 2):
+            socket.push(chunk)
+        await socket.wait_for(lambda events: any(e["type"] == "error" for e in events))
+        await hang_up(socket, call)
+        return [e for e in socket.events() if e["type"] in ("vad", "error")]
+
+    events = asyncio.run(scenario())
+
+    assert {"type": "vad", "value": "max_duration"} in events
+    assert {"type": "error", "message": "Session memory limit reached"} in events
+    assert memories[0].peak <= limit
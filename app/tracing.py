@@ -0,0 +1,133 @@
+# tracing.py
+"""
+Per-turn latency tracing.
+
+A TurnTrace starts when a caller's utterance is complete (audio received /
+recording stopped) and collects:
+- spans: named stages with start/end, e.g. decode, vad, asr, extract, llm, tts, send
+- marks: single instants, e.g. llm_first_token, tts_first_byte, tts_last_byte
+- counters: other per-turn quantities, e.g. bytes_sent, encode_cpu_ms
+
+All times are milliseconds since the start of the turn (time.perf_counter).
+finish() writes one JSON line per turn to TRACE_FILE and feeds STAGE_STATS,
+which keeps a sliding window per stage for p50/p95/p99.
+"""
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from config import TRACE_ENABLED, TRACE_FILE, TRACE_WINDOW, TRACE_SUMMARY_EVERY
+from logger import get_logger, get_record_logger
+from metrics import STAGE_SECONDS, TURN_SECONDS, TURNS
+
+logger = get_logger(__name__)
+
+# Span records go to their own JSON-lines file, not the human-readable log
+_trace_log = get_record_logger("trace", TRACE_FILE) if TRACE_ENABLED else None
+
+
+class StageStats:
+    def __init__(self, window: int = TRACE_WINDOW):
+        """
+        Last `window` durations (ms) per stage, for in-process percentiles.
+        """
+        self.window = window
+        self.turns = 0
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, ms: float):
+        with self._lock:
+            self._samples[stage].append(ms)
+
+    def percentiles(self) -> dict:
+        with self._lock:
+            samples = {stage: list(values) for stage, values in self._samples.items() if values}
+        summary = {}
+        for stage, values in samples.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            summary[stage] = {"n": len(values), "p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1)}
+        return summary
+
+
+STAGE_STATS = StageStats()
+
+
+class TurnTrace:
+    def __init__(self, session_id: str = None, state: str = None, start: float = None):
+        self.session_id = session_id
+        self.state = state
+        self.start = start if start is not None else time.perf_counter()
+        self.wall_start = time.time() - (time.perf_counter() - self.start)
+        self.spans = {}  # name -> (start_ms, end_ms)
+        self.marks = {}  # name -> ms
+        self.counters = {}  # name -> value
+        self.finished = False
+
+    def _ms(self, t: float) -> float:
+        return round((t - self.start) * 1000, 1)
+
+    def mark(self, name: str):
+        """
+        Records an instant; only the first call per name counts (first token / first byte).
+        """
+        if name not in self.marks:
+            self.marks[name] = self._ms(time.perf_counter())
+
+    @contextmanager
+    def span(self, name: str):
+        begin = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add_span(name, begin, time.perf_counter())
+
+    def add_span(self, name: str, begin: float, end: float):
+        self.spans[name] = (self._ms(begin), self._ms(end))
+
+    def count(self, name: str, value: float):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def finish(self, outcome: str = "ok"):
+        """
+        Emits the span record and updates STAGE_STATS and the Prometheus
+        histograms (metrics.py). Safe to call twice.
+        """
+        if self.finished:
+            return
+        self.finished = True
+        total = self._ms(time.perf_counter())
+
+        TURNS.inc(outcome)
+        TURN_SECONDS.observe(total / 1000)
+        for name, (begin, end) in self.spans.items():
+            STAGE_SECONDS.observe((end - begin) / 1000, name)
+        if not TRACE_ENABLED:
+            return
+
+        record = {
+            "ts": round(self.wall_start, 3),
+            "sid": self.session_id,
+            "state": self.state,
+            "outcome": outcome,
+            "total_ms": total,
+            "spans": {name: [begin, end] for name, (begin, end) in self.spans.items()},
+            "marks": self.marks,
+        }
+        if self.counters:
+            record["counters"] = self.counters
+        _trace_log.info(json.dumps(record))
+
+        for name, (begin, end) in self.spans.items():
+            STAGE_STATS.observe(name, end - begin)
+        for name, at in self.marks.items():
+            STAGE_STATS.observe(name, at)
+        STAGE_STATS.observe("turn", total)
+
+        STAGE_STATS.turns += 1
+        if TRACE_SUMMARY_EVERY and STAGE_STATS.turns % TRACE_SUMMARY_EVERY == 0:
+            logger.info("📊 Stage latency (ms): %s", json.dumps(STAGE_STATS.percentiles()))
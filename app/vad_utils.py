@@ -1,5 +1,9 @@
+import numpy as np
 import webrtcvad
 
+from config import VAD_ENERGY_FLOOR, VAD_MAX_ZCR
+
+
 class VADDetector:
     def __init__(self, aggressiveness: int = 2):
         """
@@ -12,3 +16,88 @@ class VADDetector:
         frame must be 20, 30 or 10 ms of audio.
         """
         return self.vad.is_speech(frame, sample_rate)
+
+    def speech_mask(self, pcm: np.ndarray, sample_rate: int = 16000, frame_ms: int = 30) -> np.ndarray:
+        """
+        Classifies a whole int16 mono buffer at once; returns one bool per
+        complete frame (a trailing partial frame is ignored).
+        Frames that are obviously silence (low energy) or hiss (very high
+        zero-crossing rate) are rejected with vectorised numpy before
+        webrtcvad ever sees them; the rest are handed over as zero-copy
+        memoryview slices.
+        """
+        frame_samples = int(sample_rate * frame_ms / 1000)
+        n_frames = len(pcm) // frame_samples
+        if n_frames == 0:
+            return np.zeros(0, dtype=bool)
+
+        pcm = np.ascontiguousarray(pcm[:n_frames * frame_samples], dtype=np.int16)
+        frames = pcm.reshape(n_frames, frame_samples)  # view, no copy
+
+        as_float = frames.astype(np.float32)
+        mean_square = np.einsum("ij,ij->i", as_float, as_float) / frame_samples
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_samples
+        mask = (mean_square >= VAD_ENERGY_FLOOR ** 2) & (zcr <= VAD_MAX_ZCR)
+
+        raw = memoryview(pcm).cast("B")
+        frame_bytes = frame_samples * 2
+        for i in np.flatnonzero(mask):
+            mask[i] = self.vad.is_speech(raw[i * frame_bytes:(i + 1) * frame_bytes], sample_rate)
+        return mask
+
+    @staticmethod
+    def speech_segments(mask: np.ndarray, frame_samples: int, max_gap_frames: int = 0) -> list:
+        """
+        Turns a speech mask into [(start_sample, end_sample), ...], merging
+        segments separated by at most max_gap_frames of non-speech.
+        """
+        if not mask.any():
+            return []
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        segments = [[starts[0], ends[0]]]
+        for start, end in zip(starts[1:], ends[1:]):
+            if start - segments[-1][1] <= max_gap_frames:
+                segments[-1][1] = end
+            else:
+                segments.append([start, end])
+        return [(int(s) * frame_samples, int(e) * frame_samples) for s, e in segments]
+
+    @staticmethod
+    def pause_frames(mask: np.ndarray) -> list:
+        """
+        Lengths (in frames) of the non-speech runs between the first and last
+        speech frame, i.e. the caller's mid-utterance pauses.
+        """
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return [int(n) for n in starts[1:] - ends[:-1]]
+
+    @staticmethod
+    def trim_speech(pcm: np.ndarray, mask: np.ndarray, frame_samples: int,
+                    pad_frames: int = 5, max_pause_frames: int = 0) -> np.ndarray:
+        """
+        Cuts non-speech off both ends of `pcm` using an existing speech mask,
+        keeping pad_frames of context. With max_pause_frames > 0, internal
+        pauses longer than that are shortened to it as well.
+        Returns an empty array if the mask has no speech.
+        """
+        gap = max_pause_frames if max_pause_frames > 0 else len(mask)
+        segments = VADDetector.speech_segments(mask, frame_samples, max_gap_frames=gap)
+        if not segments:
+            return pcm[:0]
+
+        pad = pad_frames * frame_samples
+        keep_pause = max(pad, max_pause_frames * frame_samples // 2)
+        pieces = []
+        for i, (start, end) in enumerate(segments):
+            lead = pad if i == 0 else keep_pause
+            tail = pad if i == len(segments) - 1 else keep_pause
+            pieces.append(pcm[max(0, start - lead):min(len(pcm), end + tail)])
+        return pieces[0] if len(pieces) == 1 else np.concatenate(pieces)
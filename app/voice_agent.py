@@ -1,18 +1,71 @@
+"""
+File-based pipeline: audio file → Whisper → Ollama → TTS file.
+
+    python voice_agent.py                                   # INPUT_AUDIO_FILE → OUTPUT_AUDIO_FILE
+    python voice_agent.py --batch ./calls --out calls.ndjson --workers 4 --no-tts
+    python voice_agent.py --batch manifest.txt --out calls.ndjson
+
+Batch mode reprocesses archives of recorded calls: a directory (recursive) or
+a manifest (one path per line, or JSON lines with a "path") goes through ASR
+(batched Whisper) → lead extraction → LLM [→ TTS] in a process pool, one
+model set per process. One JSON line per file is appended to --out as soon
+as it is done; that file is also the checkpoint, so rerunning the same
+command skips files already in it (failed ones are retried).
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
 import os
+import re
+import time
+
 from services.whisper_service import WhisperService
 from services.ollama_service import OllamaService
 from services.tts_service import TTSService
-from config import INPUT_AUDIO_FILE, OUTPUT_AUDIO_FILE
+from lead_agent import LeadAgent
+from config import INPUT_AUDIO_FILE, OUTPUT_AUDIO_FILE, WHISPER_DEVICE
 from logger import get_logger
 
 logger = get_logger(__name__)
 
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".m4a", ".webm")
+PROGRESS_SECONDS = 5
+
+# Cues introducing a lead field in a free-running call; the first hit per field wins
+LEAD_CUES = (
+    ("company", re.compile(r"\b(i work (at|for)|i am from|i'm from|my company is|i represent|representing)\b", re.I),
+     LeadAgent.extract_company),
+    ("budget", re.compile(r"\$\s?\d|\bbudget\b.*\d|\d[\d,]*\s*(k|thousand|dollars)\b", re.I),
+     LeadAgent.extract_budget),
+    ("interest", re.compile(r"\b(interested in|i need|i want|i would like|looking for)\b", re.I),
+     LeadAgent.extract_interest),
+    ("name", re.compile(r"\b(my name is|this is|i am|i'm)\b(?!\s+(from|interested|looking))", re.I),
+     LeadAgent.extract_name),
+)
+
+
+def extract_lead(transcript: str) -> dict:
+    """
+    Lead fields found in a whole-call transcript, using the live flow's extractors.
+    """
+    lead = {}
+    for sentence in re.split(r"(?<=[.!?])\s+", transcript):
+        for field, cue, extract in LEAD_CUES:
+            match = cue.search(sentence)
+            if match and field not in lead:
+                value = extract(sentence[match.start():])
+                if value:
+                    lead[field] = value
+    return lead
+
+
 class VoiceAgent:
-    def __init__(self):
+    def __init__(self, tts: bool = True):
         logger.info("🤖 Initializing VoiceAgent...")
         self.whisper = WhisperService()
         self.ollama = OllamaService()
-        self.tts = TTSService()
+        self.tts = TTSService() if tts else None
         logger.info("✅ VoiceAgent ready!")
 
     def process_audio(self, audio_file: str = INPUT_AUDIO_FILE) -> str:
@@ -23,24 +76,172 @@ class VoiceAgent:
         3. Convert response to speech
         4. Return response audio path
         """
-        logger.info(f"🎤 Processing audio file: {audio_file}")
+        logger.info("🎤 Processing audio file: %s", audio_file)
 
         # Step 1: Transcribe
         text_input = self.whisper.transcribe(audio_file)
-        logger.info(f"📝 Transcribed text: {text_input}")
+        logger.info("📝 Transcribed text: %s", text_input)
 
         # Step 2: Ollama LLM response
         llm_response = self.ollama.generate(text_input)
-        logger.info(f"🧠 LLM response: {llm_response}")
+        logger.info("🧠 LLM response: %s", llm_response)
 
         # Step 3: TTS synthesis
         audio_output = self.tts.synthesize(llm_response, output_file=OUTPUT_AUDIO_FILE)
 
-        logger.info(f"✅ VoiceAgent pipeline complete. Output: {os.path.abspath(audio_output)}")
+        logger.info("✅ VoiceAgent pipeline complete. Output: %s", os.path.abspath(audio_output))
         return audio_output
 
+    def process_recording(self, path: str, llm: bool = True, audio_dir: str = None) -> dict:
+        """
+        Batch-mode pipeline for one recorded call; returns its result record.
+        """
+        started = time.perf_counter()
+        transcript = self.whisper.transcribe_batched(path).strip()
+        result = {"path": path, "transcript": transcript, "lead": extract_lead(transcript)}
+
+        if llm and transcript:
+            result["reply"] = self.ollama.generate(transcript).strip()
+        if self.tts is not None and result.get("reply"):
+            # Same stem from different folders must not collide
+            stem = os.path.splitext(os.path.basename(path))[0]
+            name = f"{stem}-{hashlib.blake2b(path.encode('utf-8'), digest_size=4).hexdigest()}.wav"
+            result["audio"] = self.tts.synthesize(result["reply"], output_file=os.path.join(audio_dir, name))
+
+        result["ms"] = round((time.perf_counter() - started) * 1000)
+        return result
+
+
+# ====================== BATCH MODE ======================
+def iter_inputs(source: str):
+    """
+    Audio paths from a directory (recursive, sorted) or a manifest file.
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.join(root, name)
+        return
+
+    base = os.path.dirname(os.path.abspath(source))
+    with open(source, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            yield path if os.path.isabs(path) else os.path.join(base, path)
+
+
+def load_done(out_path: str) -> set:
+    """
+    Paths already processed successfully according to an earlier (possibly cut-off) run.
+    """
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # half-written last line of an interrupted run
+            if "error" not in record:
+                done.add(record["path"])
+    return done
+
+
+_worker_agent = None
+_worker_options = None
+
+
+def _init_worker(options: dict):
+    global _worker_agent, _worker_options
+    _worker_options = options
+    _worker_agent = VoiceAgent(tts=options["tts"])
+
+
+def _process_path(path: str) -> dict:
+    try:
+        return _worker_agent.process_recording(path, llm=_worker_options["llm"], audio_dir=_worker_options["audio_dir"])
+    except Exception as e:
+        logger.error("❌ Failed to process %s: %s", path, e)
+        return {"path": path, "error": str(e)}
+
+
+def run_batch(source: str, out_path: str, workers: int, llm: bool = True, tts: bool = True, fresh: bool = False):
+    paths = list(iter_inputs(source))
+    done = set() if fresh else load_done(out_path)
+    todo = [path for path in paths if path not in done]
+    logger.info("📦 %d recordings, %d already done, %d to process with %d worker(s)",
+                len(paths), len(paths) - len(todo), len(todo), workers)
+    if not todo:
+        return
+
+    audio_dir = os.path.splitext(out_path)[0] + "_audio"
+    if tts and llm:
+        os.makedirs(audio_dir, exist_ok=True)
+    options = {"llm": llm, "tts": tts and llm, "audio_dir": audio_dir}
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    if not fresh and os.path.exists(out_path) and os.path.getsize(out_path):
+        with open(out_path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            torn = f.read(1) != b"\n"
+    else:
+        torn = False
+
+    started = last_report = time.time()
+    finished = errors = 0
+    with open(out_path, "w" if fresh else "a", encoding="utf-8") as out, \
+            mp.Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        if torn:
+            out.write("\n")
+        try:
+            for result in pool.imap_unordered(_process_path, todo):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                out.flush()
+                finished += 1
+                errors += "error" in result
+
+                now = time.time()
+                if now - last_report >= PROGRESS_SECONDS or finished == len(todo):
+                    last_report = now
+                    rate = finished / (now - started)
+                    eta = (len(todo) - finished) / rate if rate else 0
+                    logger.info("📦 %d/%d (%.1f%%), %.2f files/s, ETA %.0fs, %d error(s)",
+                                finished, len(todo), 100 * finished / len(todo), rate, eta, errors)
+        except KeyboardInterrupt:
+            pool.terminate()
+            logger.info("✋ Interrupted after %d file(s); rerun the same command to resume", finished)
+            return
+
+    logger.info("✅ Batch complete: %d file(s) in %.0fs, %d error(s) → %s",
+                finished, time.time() - started, errors, out_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="File-based voice agent (single file or batch)")
+    parser.add_argument("--batch", metavar="DIR_OR_MANIFEST", help="process a directory or manifest of recordings")
+    parser.add_argument("--out", default="batch_results.ndjson", help="NDJSON results / resume checkpoint")
+    parser.add_argument("--workers", type=int,
+                        default=1 if WHISPER_DEVICE == "cuda" else max(1, (os.cpu_count() or 2) // 2),
+                        help="processes, each with its own models (default: 1 on GPU, half the cores on CPU)")
+    parser.add_argument("--no-llm", action="store_true", help="transcripts and leads only")
+    parser.add_argument("--no-tts", action="store_true", help="skip synthesizing the replies")
+    parser.add_argument("--fresh", action="store_true", help="ignore and overwrite an existing --out")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch, args.out, args.workers, llm=not args.no_llm, tts=not args.no_tts, fresh=args.fresh)
+        return
 
-if __name__ == "__main__":
     agent = VoiceAgent()
     result_path = agent.process_audio()
     print(f"🔊 Final response audio file: {result_path}")
+
+
+if __name__ == "__main__":
+    main()
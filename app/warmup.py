@@ -0,0 +1,88 @@
+# warmup.py
+"""
+Warm-up before a process accepts calls.
+
+The first turn after a start otherwise pays for loading the Whisper model and
+its first CTranslate2 run, the TLS handshake to ElevenLabs and Ollama loading
+the model into memory. warm_up() does all of that up front (the three steps
+run concurrently) and logs how long each took. A step that fails or times out
+is logged and skipped: a cold first turn beats not serving at all.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+from config import WARMUP_TIMEOUT
+from routes.leads import LeadQualification
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def dummy_pcm(seconds: float = 1.0, sample_rate: int = 16000) -> np.ndarray:
+    """
+    Quiet noise: runs the whole Whisper pipeline (encoder and decoder) like real audio.
+    """
+    rng = np.random.default_rng(0)
+    return rng.normal(0, 300, int(seconds * sample_rate)).astype(np.int16)
+
+
+def warm_whisper(whisper):
+    whisper.transcribe_pcm(dummy_pcm())
+
+
+def static_prompts(mode: str = "bye") -> list:
+    """
+    Prompts of the lead flow that don't depend on what the caller said,
+    in the order a call meets them (the greeting first).
+    """
+    marker = "\x00"
+    flow = LeadQualification(mode)
+    replies = [flow.next_prompt()]
+    while not flow.is_qualified():
+        replies.append(flow.next_prompt(marker))
+    replies.append(flow.next_prompt(marker))  # the fixed reply once the lead is captured
+    return [reply for reply in replies if marker not in reply]
+
+
+async def _step(name: str, func, timings: dict):
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.to_thread(func), WARMUP_TIMEOUT)
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        logger.info("🔥 Warm-up %s: %.0f ms", name, timings[name])
+    except Exception as e:
+        timings[name] = None
+        logger.warning("⚠️ Warm-up %s failed after %.0f ms: %s", name,
+                       (time.perf_counter() - started) * 1000, e or type(e).__name__)
+
+
+async def warm_up(load_services, synthesize_prompt=None, tts_prompts: int = 1) -> dict:
+    """
+    load_services() returns the shared {"whisper", "ollama", "tts"} services;
+    synthesize_prompt(text) renders one prompt through TTS (and caches it).
+    Returns {step: ms or None if it failed}.
+    """
+    started = time.perf_counter()
+    timings = {}
+    await _step("services", load_services, timings)
+    if timings["services"] is None:
+        return timings
+    services = load_services()
+
+    def tts():
+        for text in static_prompts()[:tts_prompts]:
+            synthesize_prompt(text)
+
+    steps = [
+        _step("whisper", lambda: warm_whisper(services["whisper"]), timings),
+        _step("ollama", services["ollama"].preload, timings),
+    ]
+    if synthesize_prompt is not None and tts_prompts > 0:
+        steps.append(_step("tts", tts, timings))
+    await asyncio.gather(*steps)
+
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("🔥 Warm-up done in %.0f ms %s", timings["total"], timings)
+    return timings
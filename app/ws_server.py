@@ -1,21 +1,107 @@
 # ws_server.py
 import asyncio
 import base64
-import io
 import json
 import os
-import tempfile
+import threading
 import time
 import wave
+from urllib.parse import urlparse, parse_qs
 
+import numpy as np
 import websockets
 
-from realtime_agent_v2 import RealTimeAgentVAD, SAMPLE_RATE, FRAME_DURATION  # uses your integrated pipeline :contentReference[oaicite:1]{index=1}
+from lead_agent import LeadAgent, SAMPLE_RATE, FRAME_DURATION  # lead flow without mic/speaker (realtime_agent_v2 adds those)
 from vad_utils import VADDetector
-
+from routes.leads import LeadQualification
+from config import (
+    WS_HOST, WS_PORT, WS_MAX_MESSAGE_BYTES, INFERENCE_MODE, MAX_ACTIVE_SESSIONS, BUSY_RETRY_AFTER,
+    ASR_TRIM_PAD_MS, ASR_MAX_PAUSE_MS, OUTPUT_SAMPLE_RATE, TTS_CACHE_MAX_BYTES, METRICS_PORT,
+    WARMUP_ENABLED, WARMUP_TTS_PROMPTS, WARMUP_TTS_CODECS, TTS_FALLBACK, SESSION_HISTORY_TURNS,
+    SPECULATION_ENABLED,
+)
+from admission import STAGES, Busy, hold_audio_b64
+from services.whisper_service import WhisperService
+from services.inference_client import RemoteWhisperService, RemoteTTSService
+from services.ollama_service import OllamaService
+from services.tts_service_v2 import TTSService, SynthesisCancelled
+from services.tts_router import TTSRouter
+from endpointing import EndpointPolicy
+from audio_format import PolyphaseResampler, decode_wav, downmix, to_pipeline_pcm
+from audio_codecs import OPUS_SAMPLE_RATES, available_codecs, create_codec
+from lru_cache import SizedLRUCache
+from transcript_cache import TRANSCRIPTS, remember, transcript_key
+from speculation import Speculation, predicted_reply
+from session_memory import MAX_UTTERANCE_SAMPLES, PCM_POOL, SessionMemory, UtteranceBuffer
+from logger import get_logger
+from session_store import create_session_store, new_session_id, make_snapshot, restore_snapshot
+from tracing import TurnTrace
+from profiling import end_session, profiling_requested, start_turn_profile
+from warmup import warm_up
+from framing import Framer, dumps, loads
+from metrics import (
+    BUSY, LEADS, TURN_BYTES_SENT, TURN_ENCODE_SECONDS, WHISPER_RTF, Counter, Gauge, start_metrics_server,
+)
+
+logger = get_logger(__name__)
 
 LEADS_FILE = "leads.json"
 
+# Shared by every connection in this process (see session_store.py)
+SESSIONS = create_session_store()
+
+# Models/clients shared by every connection in this process (loaded on first call)
+_SERVICES = None
+
+# Open connections in this process (reported by supervisor.py health checks)
+ACTIVE_SESSIONS = 0
+
+# Encoded "tts_audio" payloads by (text, codec, sample_rate): fixed prompts are synthesized once
+TTS_AUDIO_CACHE = SizedLRUCache(TTS_CACHE_MAX_BYTES)
+
+# 📈 Read at scrape time (metrics.py), nothing extra on the hot path
+Gauge("voice_active_sessions", "Open caller connections in this process", callback=lambda: ACTIVE_SESSIONS)
+Gauge("voice_stage_queue_depth", "Jobs waiting for a stage slot", ["stage"],
+      callback=lambda: {(name,): stage.waiting for name, stage in STAGES.items()})
+Gauge("voice_stage_running", "Jobs running in a stage", ["stage"],
+      callback=lambda: {(name,): stage.running for name, stage in STAGES.items()})
+CACHES = {"tts": TTS_AUDIO_CACHE, "transcript": TRANSCRIPTS}
+Counter("voice_cache_hits_total", "Cache hits", ["cache"],
+        callback=lambda: {(name,): cache.hits for name, cache in CACHES.items()})
+Counter("voice_cache_misses_total", "Cache misses", ["cache"],
+        callback=lambda: {(name,): cache.misses for name, cache in CACHES.items()})
+Gauge("voice_pcm_pool_free", "Pooled utterance buffers ready for reuse", callback=lambda: len(PCM_POOL.free))
+Counter("voice_pcm_pool_misses_total", "Utterance buffers allocated because the pool was empty",
+        callback=lambda: PCM_POOL.misses)
+Gauge("voice_cache_bytes", "Bytes held by a cache", ["cache"],
+      callback=lambda: {(name,): cache.bytes for name, cache in CACHES.items()})
+
+
+def shared_services() -> dict:
+    global _SERVICES
+    if _SERVICES is None:
+        # INFERENCE_MODE=remote: Whisper runs in inference_worker.py processes
+        whisper = RemoteWhisperService() if INFERENCE_MODE == "remote" else WhisperService()
+        _SERVICES = {"whisper": whisper, "ollama": OllamaService(), "tts": shared_tts()}
+    return _SERVICES
+
+
+def shared_tts():
+    """
+    ElevenLabs, hedged to a local engine when TTS_FALLBACK is set (services/tts_router.py).
+    """
+    tts = TTSService()
+    if TTS_FALLBACK == "local":
+        from services.tts_service import TTSService as CoquiTTSService
+        tts = TTSRouter(tts, CoquiTTSService())
+    elif TTS_FALLBACK == "worker":
+        tts = TTSRouter(tts, RemoteTTSService())
+    return tts
+
+
+def new_agent() -> LeadAgent:
+    return LeadAgent(**shared_services())
+
 
 def load_leads():
     if not os.path.exists(LEADS_FILE):
@@ -36,128 +122,628 @@ def save_lead(lead: dict):
         json.dump(leads, f, indent=2)
 
 
-def wav_b64_from_text(agent: RealTimeAgentVAD, text: str) -> str:
-    # uses your ElevenLabs TTS memory synth :contentReference[oaicite:2]{index=2}
-    audio_buf = agent.tts.synthesize_to_memory(text)
-    return base64.b64encode(audio_buf.read()).decode("utf-8")
-
+def tts_audio_message(agent: LeadAgent, text: str, output: dict, cancel_event=None, trace=None) -> dict:
+    """
+    "tts_audio" message for text in the connection's output codec
+    (WAV as before, or µ-law / A-law / Opus at output["sample_rate"]).
+    Audio stays raw ("audio" bytes, or Opus "packets"); Framer.send_audio
+    encodes it for the wire.
+    """
+    key = (text, output["codec"], output["sample_rate"])
+    message = TTS_AUDIO_CACHE.get(key)
+    if message is not None:
+        if trace is not None:
+            trace.mark("tts_cached")
+        return message
 
-def wav_is_speech_by_webrtcvad(wav_path: str, vad: VADDetector) -> bool:
+    # uses your ElevenLabs TTS memory synth :contentReference[oaicite:2]{index=2}
+    wav_bytes = agent.tts.synthesize_to_memory(text, cancel_event=cancel_event, trace=trace).read()
+    if output["codec"] == "wav":
+        message = {"type": "tts_audio", "mime": "audio/wav", "audio": wav_bytes}
+    else:
+        samples, rate = decode_wav(wav_bytes)
+        pcm = downmix(samples)
+        if rate != output["sample_rate"]:
+            resampler = PolyphaseResampler(rate, output["sample_rate"])
+            pcm = np.concatenate((resampler.process(pcm), resampler.flush()))
+        encoded = create_codec(output["codec"], output["sample_rate"]).encode(pcm)
+        message = {"type": "tts_audio", "codec": output["codec"], "sample_rate": output["sample_rate"]}
+        if isinstance(encoded, list):
+            message["packets"] = encoded  # opus: one packet per frame
+        else:
+            message["audio"] = encoded
+
+    size = sum(len(v) for v in message.get("packets", [])) + len(message.get("audio", b""))
+    TTS_AUDIO_CACHE.put(key, message, size)
+    return message
+
+
+def negotiate_output(payload: dict) -> dict:
     """
-    Returns True if webrtcvad detects speech in enough frames.
-    WAV must be 16kHz mono 16-bit PCM (frontend will send that).
+    First codec in the client's "accept" list we can produce; WAV otherwise.
     """
-    with wave.open(wav_path, "rb") as wf:
-        ch = wf.getnchannels()
-        sw = wf.getsampwidth()
-        sr = wf.getframerate()
+    try:
+        rate = int(payload.get("output_sample_rate", OUTPUT_SAMPLE_RATE))
+    except (TypeError, ValueError):
+        rate = OUTPUT_SAMPLE_RATE
+    accept = payload.get("accept")
+    for codec in accept if isinstance(accept, list) else []:
+        if codec == "wav":
+            break
+        if codec not in available_codecs() or not 8000 <= rate <= 48000:
+            continue
+        if codec == "opus" and rate not in OPUS_SAMPLE_RATES:
+            continue
+        return {"codec": codec, "sample_rate": rate}
+    return {"codec": "wav", "sample_rate": None}
 
-        if ch != 1 or sw != 2 or sr != SAMPLE_RATE:
-            # If format mismatch, don't hard-fail the demo; just allow it through.
-            return True
 
-        frame_ms = FRAME_DURATION  # 30ms in your pipeline :contentReference[oaicite:3]{index=3}
-        frame_samples = int(sr * frame_ms / 1000)
-        bytes_per_frame = frame_samples * 2  # int16 mono
+def speech_for_asr(pcm: np.ndarray, vad: VADDetector, endpointing: EndpointPolicy = None) -> np.ndarray:
+    """
+    Runs the webrtcvad gate on 16 kHz mono int16 PCM and trims it to the
+    speech. Returns an empty array if there is no real speech.
+    The utterance's pauses are fed to `endpointing`, so the endpoint_ms sent
+    to this caller adapts to how they speak.
+    """
+    # 30ms frames, classified in one batch :contentReference[oaicite:3]{index=3}
+    frame_samples = int(SAMPLE_RATE * FRAME_DURATION / 1000)
+    mask = vad.speech_mask(pcm, SAMPLE_RATE, FRAME_DURATION)
+
+    # Require at least a few speech frames (filters random short noise)
+    if int(mask.sum()) < 3:
+        return pcm[:0]
+    if endpointing is not None:
+        endpointing.observe(vad.pause_frames(mask))
+
+    # ✂️ Whisper only gets the speech: edges trimmed, long pauses shortened
+    speech = vad.trim_speech(
+        pcm, mask, frame_samples,
+        pad_frames=ASR_TRIM_PAD_MS // FRAME_DURATION,
+        max_pause_frames=ASR_MAX_PAUSE_MS // FRAME_DURATION,
+    )
+    logger.info("✂️ Trimmed utterance %.2fs → %.2fs before ASR", len(pcm) / SAMPLE_RATE, len(speech) / SAMPLE_RATE)
+    return speech
+
+
+def transcribe_timed(whisper, speech: np.ndarray) -> str:
+    """
+    whisper.transcribe_pcm, recording voice_whisper_rtf. Runs in the executor,
+    so the time spent waiting for an ASR slot is not counted.
+    """
+    started = time.perf_counter()
+    text = whisper.transcribe_pcm(speech)
+    WHISPER_RTF.observe((time.perf_counter() - started) / (len(speech) / SAMPLE_RATE))
+    return text
 
-        speech_frames = 0
-        total_frames = 0
 
-        while True:
-            frame = wf.readframes(frame_samples)
-            if not frame:
-                break
-            if len(frame) < bytes_per_frame:
-                break
+def session_id_from_request(websocket):
+    """
+    Reads ?session_id=... from the connection URL (works with both the legacy
+    and the new websockets server APIs).
+    """
+    request = getattr(websocket, "request", None)
+    path = request.path if request is not None else getattr(websocket, "path", "")
+    values = parse_qs(urlparse(path or "").query).get("session_id")
+    return values[0] if values else None
 
-            total_frames += 1
-            if vad.is_speech(frame, sr):
-                speech_frames += 1
 
-        if total_frames == 0:
-            return False
+def last_agent_text(history: list):
+    for role, text in reversed(history):
+        if role == "a":
+            return text
+    return None
 
-        # Require at least a few speech frames (filters random short noise)
-        return speech_frames >= 3
 
+async def reject_busy(websocket):
+    """
+    Admission control: tell the caller to retry later (with hold audio if configured).
+    """
+    BUSY.inc("sessions")
+    await websocket.send(dumps({"type": "busy", "retry_after": BUSY_RETRY_AFTER}))
+    hold = hold_audio_b64()
+    if hold:
+        await websocket.send(dumps({"type": "tts_audio", "mime": "audio/wav", "b64": hold}))
+    await websocket.close(code=1013, reason="busy")
 
-async def handler(websocket):
-    agent = RealTimeAgentVAD()  # integrated lead flow + extractors :contentReference[oaicite:4]{index=4}
-    vad = VADDetector(aggressiveness=2)
 
-    flow = agent.lead_logic  # LeadQualification inside your agent :contentReference[oaicite:5]{index=5}
+# Marks the end of a connection in CallSession.inbox
+_CLOSED = object()
 
-    # Initial prompt
-    await websocket.send(json.dumps({"type": "state", "value": flow.state}))
-    prompt = flow.next_prompt()
-    await websocket.send(json.dumps({"type": "agent_text", "text": prompt}))
 
-    # Tell frontend "agent speaking", send audio, then "agent done"
-    await websocket.send(json.dumps({"type": "agent_speaking", "value": True}))
-    await websocket.send(json.dumps({"type": "tts_audio", "mime": "audio/wav", "b64": wav_b64_from_text(agent, prompt)}))
-    await websocket.send(json.dumps({"type": "agent_speaking", "value": False}))
+class CallSession:
+    """
+    One connected caller. Messages are read by a separate task so that a newer
+    utterance can make the one still being processed stale.
+    """
 
-    async for msg in websocket:
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.framer = Framer(websocket)  # per-event JSON frames until "hello" asks for "framing": "batch"
+        self.agent = new_agent()  # integrated lead flow + extractors :contentReference[oaicite:4]{index=4}
+        self.vad = VADDetector(aggressiveness=2)
+        self.endpointing = EndpointPolicy(FRAME_DURATION)
+        self.session_id = None
+        self.history = []
+        self.inbox = asyncio.Queue()
+        self.disconnected = False  # read_loop saw the connection close
+        self.latest_audio = 0  # sequence number of the newest utterance received
+        self.turn_cancel = threading.Event()  # set on barge-in; aborts TTS of the current turn
+        self.speculation = None  # next prompt being rendered while ASR runs (speculation.py)
+
+        # What this call holds (audio, payloads, history) against SESSION_MEMORY_MAX_BYTES
+        self.memory = SessionMemory()
+
+        # Streamed input ("hello" + "audio_chunk"... + "audio_end"), decoded and
+        # converted to 16 kHz mono on arrival into a pooled buffer
+        self.input_format = {"sample_rate": SAMPLE_RATE, "channels": 1, "encoding": "pcm_s16le"}
+        self.decoder = create_codec("pcm_s16le", SAMPLE_RATE)
+        self.resampler = PolyphaseResampler(SAMPLE_RATE)
+        self.stream = None  # UtteranceBuffer of the utterance being streamed
+
+        # Codec for "tts_audio" (negotiated in "hello"; WAV for clients that don't ask)
+        self.output_format = {"codec": "wav", "sample_rate": None}
+
+        # Every turn of this session is profiled once enabled via a "profile" message (profiling.py)
+        self.profiling = False
+
+    @property
+    def flow(self):
+        return self.agent.lead_logic  # LeadQualification inside your agent :contentReference[oaicite:5]{index=5}
+
+    async def send(self, message: dict):
+        await self.framer.send(message)
+
+    async def send_state(self):
+        # endpoint_ms: how long a pause should end the caller's next answer (client-side endpointing)
+        state = self.flow.state
+        await self.send({"type": "state", "value": state, "endpoint_ms": self.endpointing.hangover_ms(state)})
+
+    def save(self):
+        SESSIONS.save(make_snapshot(self.session_id, self.flow, self.history))
+
+    def add_history(self, role: str, text: str):
+        # Only what a snapshot keeps (session_store.py) is needed in memory too
+        self.history.append((role, text))
+        del self.history[:-SESSION_HISTORY_TURNS * 2]
+        self.memory.set("history", sum(len(item) for _, item in self.history))
+
+    def is_stale(self, payload: dict) -> bool:
+        # The caller has already spoken again; answering this utterance is pointless.
+        # A forced max_duration cut is not: what follows it is the rest of the same speech.
+        return payload["_seq"] < self.latest_audio and not payload.get("_forced")
+
+    def release_payload(self, payload):
+        """
+        Gives an utterance's pooled buffer and accounted memory back.
+        """
+        if not isinstance(payload, dict):
+            return
+        if "_buffer" in payload:
+            payload.pop("_buffer").release()
+        for kind, nbytes in payload.pop("_held", ()):
+            self.memory.release(kind, nbytes)
+
+    async def read_loop(self):
         try:
-            payload = json.loads(msg)
-        except Exception:
-            await websocket.send(json.dumps({"type": "error", "message": "Expected JSON message"}))
-            continue
+            async for msg in self.websocket:
+                received = time.perf_counter()
+                try:
+                    payload = loads(msg)
+                except Exception:
+                    payload = None
+                parsed = time.perf_counter()
+
+                msg_type = payload.get("type") if isinstance(payload, dict) else None
+
+                if msg_type == "barge_in":
+                    # Handled right away, not queued behind the turn it interrupts
+                    await self.barge_in()
+                    continue
+
+                if msg_type == "profile":
+                    if not profiling_requested(payload):
+                        await self.send({"type": "error", "message": "Profiling not allowed"})
+                        continue
+                    self.profiling = bool(payload.get("enabled", True))
+                    await self.send({"type": "profile_ok", "enabled": self.profiling})
+                    continue
+
+                if msg_type in ("hello", "audio_chunk"):
+                    # Cheap and order-sensitive: converted as it arrives, while the caller talks
+                    decode_start = time.perf_counter()
+                    buffer = await self.handle_stream_message(payload)
+                    if buffer is None:
+                        continue
+                    # ⏱️ MAX_UTTERANCE_SECONDS reached: forced endpoint, the caller's next words start a new turn
+                    await self.send({"type": "vad", "value": "max_duration"})
+                    payload = {"type": "audio", "pcm": buffer.pcm(), "_buffer": buffer, "_forced": True,
+                               "_decode": (decode_start, time.perf_counter())}
+
+                if msg_type == "audio_end":
+                    # Chunks were decoded as they arrived; this only flushes the resampler
+                    decode_start = time.perf_counter()
+                    buffer = self.finish_stream()
+                    payload = {"type": "audio", "pcm": buffer.pcm(), "_buffer": buffer,
+                               "_decode": (decode_start, time.perf_counter())}
+
+                if msg_type == "audio":
+                    # Whole WAV in one message: held until its turn has run
+                    if not self.memory.fits(len(msg)):
+                        await self.send({"type": "error", "message": "Session memory limit reached"})
+                        continue
+                    self.memory.charge("payload", len(msg))
+                    payload["_held"] = [("payload", len(msg))]
+
+                if isinstance(payload, dict) and payload.get("type") == "audio":
+                    self.latest_audio += 1
+                    payload["_seq"] = self.latest_audio
+                    payload["_trace"] = trace = TurnTrace(self.session_id, self.flow.state, start=received)
+                    trace.add_span("receive", received, parsed)
+                    if "_decode" in payload:
+                        trace.add_span("decode", *payload.pop("_decode"))
+                    payload["_queued"] = time.perf_counter()
+                await self.inbox.put(payload)
+        finally:
+            self.disconnected = True
+            await self.inbox.put(_CLOSED)
+
+    async def handle_stream_message(self, payload: dict):
+        """
+        Applies a "hello" or decodes an "audio_chunk" into the stream buffer.
+        Returns the utterance buffer if it just reached MAX_UTTERANCE_SECONDS.
+        """
+        if payload["type"] == "hello":
+            try:
+                fmt = {
+                    "sample_rate": int(payload.get("sample_rate", SAMPLE_RATE)),
+                    "channels": int(payload.get("channels", 1)),
+                    "encoding": payload.get("encoding", "pcm_s16le"),
+                }
+            except (TypeError, ValueError):
+                fmt = None
+            decoder = None
+            if fmt is not None and 8000 <= fmt["sample_rate"] <= 192000 and 1 <= fmt["channels"] <= 8:
+                try:
+                    decoder = create_codec(fmt["encoding"], fmt["sample_rate"], fmt["channels"])
+                except Exception:
+                    decoder = None
+            if decoder is None:
+                await self.send({"type": "error", "message": "Unsupported audio format"})
+                return
+
+            self.input_format = fmt
+            self.decoder = decoder
+            self.resampler = PolyphaseResampler(fmt["sample_rate"])
+            if self.stream is not None:
+                self.stream.release()
+                self.stream = None
+            self.output_format = negotiate_output(payload)
+            if payload.get("framing") == "batch":
+                self.framer.enable_batching()
+            await self.send({
+                "type": "hello_ok",
+                "input": fmt,
+                "output": self.output_format,
+                "framing": "batch" if self.framer.batching else "json",
+                "pipeline": {"sample_rate": SAMPLE_RATE, "channels": 1, "encoding": "pcm_s16le"},
+                "encodings": available_codecs(),
+            })
+            return None
+
+        # One chunk in "b64", or (opus) a list of packets in "packets"
+        packets = payload.get("packets")
+        if not isinstance(packets, list):
+            packets = [payload.get("b64") or ""]
+        if self.stream is None:
+            if not self.memory.fits(MAX_UTTERANCE_SAMPLES * 2):
+                await self.send({"type": "error", "message": "Session memory limit reached"})
+                return None
+            self.stream = UtteranceBuffer(self.memory)
+
+        cut = None
+        for packet in packets:
+            try:
+                raw = base64.b64decode(packet)
+            except Exception:
+                await self.send({"type": "error", "message": "Invalid base64 audio"})
+                return cut
+            try:
+                samples = self.decoder.decode(raw)
+            except Exception:
+                await self.send({"type": "error", "message": f"Chunk is not {self.input_format['encoding']} audio"})
+                return cut
+            rest = self.stream.append(self.resampler.process(downmix(samples)))
+            if len(rest) and cut is None:
+                # Full: what did not fit opens the next utterance (decoder state carries on)
+                cut, self.stream = self.stream, None
+                if not self.memory.fits(MAX_UTTERANCE_SAMPLES * 2):
+                    await self.send({"type": "error", "message": "Session memory limit reached"})
+                    return cut
+                self.stream = UtteranceBuffer(self.memory)
+                self.stream.append(rest)
+        return cut
+
+    def finish_stream(self) -> UtteranceBuffer:
+        """
+        The streamed utterance at "audio_end"; its turn releases the buffer.
+        """
+        buffer = self.stream if self.stream is not None else UtteranceBuffer(self.memory)
+        self.stream = None
+        buffer.append(self.resampler.flush())
+        self.resampler = PolyphaseResampler(self.input_format["sample_rate"])
+        if self.input_format["encoding"] == "opus":
+            self.decoder = create_codec("opus", self.input_format["sample_rate"], self.input_format["channels"])
+        return buffer
+
+    async def barge_in(self):
+        """
+        The caller started talking over the agent: abort the in-flight
+        synthesis and tell the browser to stop playback.
+        """
+        self.turn_cancel.set()
+        if self.speculation is not None:
+            self.speculation.discard()
+            self.speculation = None
+        await self.send({"type": "tts_cancel"})
+
+    def speculate(self):
+        """
+        Starts rendering the reply the flow gives whatever the caller said
+        (speculation.py), if the TTS stage has a slot to spare.
+        """
+        if not SPECULATION_ENABLED or not STAGES["tts"].has_free_slot():
+            return
+        text = predicted_reply(self.flow)
+        if text is None:
+            return
+        agent, output = self.agent, self.output_format
+        self.speculation = Speculation(
+            text, lambda cancel_event: STAGES["tts"].run(tts_audio_message, agent, text, output, cancel_event)
+        )
+
+    async def speak(self, text: str, trace: TurnTrace = None):
+        await self.send({"type": "agent_text", "text": text})
+
+        # Tell frontend "agent speaking", send audio, then "agent done"
+        cancel_event = self.turn_cancel
+        speculation, self.speculation = self.speculation, None
+        tts_start = time.perf_counter()
+        try:
+            audio = await speculation.confirm(text) if speculation is not None else None
+            if audio is not None and trace is not None:
+                trace.mark("tts_speculated")
+            if audio is None:
+                audio = await STAGES["tts"].run(tts_audio_message, self.agent, text, self.output_format, cancel_event, trace)
+        except SynthesisCancelled:
+            return
+        finally:
+            if trace is not None:
+                trace.add_span("tts", tts_start, time.perf_counter())
+        if cancel_event.is_set():
+            return
+
+        send_start = time.perf_counter()
+        await self.send({"type": "agent_speaking", "value": True})
+        await self.framer.send_audio(audio)
+        await self.send({"type": "agent_speaking", "value": False})
+        if trace is not None:
+            trace.add_span("send", send_start, time.perf_counter())
+
+    async def start(self, resume_id: str = None):
+        """
+        Starts a fresh session, or continues a stored one when resume_id is known.
+        """
+        # A barge-in on the previous prompt must not silence this one
+        self.turn_cancel = threading.Event()
+        snapshot = SESSIONS.load(resume_id) if resume_id else None
+
+        if snapshot:
+            self.agent.lead_logic, self.history = restore_snapshot(snapshot)
+            self.memory.set("history", sum(len(text) for _, text in self.history))
+            self.session_id = resume_id
+        else:
+            self.agent.lead_logic = LeadQualification()
+            self.history = []
+            self.memory.set("history", 0)
+            self.session_id = new_session_id()
+
+        await self.send({"type": "session", "id": self.session_id, "resumed": bool(snapshot)})
+        await self.send_state()
+
+        # On resume, repeat the question the caller still owes us an answer to
+        prompt = last_agent_text(self.history) if snapshot else None
+        if prompt is None:
+            prompt = self.flow.next_prompt()
+            self.add_history("a", prompt)
+
+        self.save()
+        await self.speak(prompt)
+
+    async def run(self):
+        reader = asyncio.create_task(self.read_loop())
+        try:
+            # Initial prompt (or resume a dropped session)
+            try:
+                await self.start(session_id_from_request(self.websocket))
+            except Busy as e:
+                BUSY.inc(e.stage)
+                await self.send({"type": "busy", "stage": e.stage, "retry_after": BUSY_RETRY_AFTER})
+
+            while True:
+                payload = await self.inbox.get()
+                if payload is _CLOSED or self.disconnected:
+                    # Utterances still queued have nobody left to answer
+                    break
+                try:
+                    await self.dispatch(payload)
+                except Busy as e:
+                    # Shed this utterance rather than queue it behind everyone else
+                    BUSY.inc(e.stage)
+                    await self.send({"type": "busy", "stage": e.stage, "retry_after": BUSY_RETRY_AFTER})
+                    hold = hold_audio_b64()
+                    if hold:
+                        await self.send({"type": "tts_audio", "mime": "audio/wav", "b64": hold})
+                except websockets.ConnectionClosed:
+                    break
+                except Exception as e:
+                    await self.send({"type": "error", "message": str(e)})
+        finally:
+            reader.cancel()
+            await self.framer.close()
+            if self.stream is not None:
+                self.stream.release()
+            while not self.inbox.empty():
+                self.release_payload(self.inbox.get_nowait())
+            self.memory.report(self.session_id)
+            # Keep the latest state so the caller can reconnect (possibly to another worker)
+            if self.session_id:
+                self.save()
+                end_session(self.session_id)
+
+    async def dispatch(self, payload):
+        if not isinstance(payload, dict):
+            await self.send({"type": "error", "message": "Expected JSON message"})
+            return
 
         msg_type = payload.get("type")
 
         if msg_type == "reset":
-            agent = RealTimeAgentVAD()
-            vad = VADDetector(aggressiveness=2)
-            flow = agent.lead_logic
-
-            await websocket.send(json.dumps({"type": "tell", "message": "reset_ok"}))
-            await websocket.send(json.dumps({"type": "state", "value": flow.state}))
-
-            prompt = flow.next_prompt()
-            await websocket.send(json.dumps({"type": "agent_text", "text": prompt}))
-            await websocket.send(json.dumps({"type": "agent_speaking", "value": True}))
-            await websocket.send(json.dumps({"type": "tts_audio", "mime": "audio/wav", "b64": wav_b64_from_text(agent, prompt)}))
-            await websocket.send(json.dumps({"type": "agent_speaking", "value": False}))
-            continue
+            SESSIONS.delete(self.session_id)
+            self.agent = new_agent()
+            self.vad = VADDetector(aggressiveness=2)
+
+            await self.send({"type": "tell", "message": "reset_ok"})
+            await self.start()
+            return
+
+        if msg_type == "resume":
+            resume_id = payload.get("session_id")
+            if not resume_id or SESSIONS.load(resume_id) is None:
+                await self.send({"type": "error", "message": "Unknown session"})
+                return
+
+            SESSIONS.delete(self.session_id)
+            await self.start(resume_id)
+            return
 
         if msg_type != "audio":
-            await websocket.send(json.dumps({"type": "error", "message": "Unknown message type"}))
-            continue
+            await self.send({"type": "error", "message": "Unknown message type"})
+            return
 
-        b64 = payload.get("b64")
-        if not b64:
-            await websocket.send(json.dumps({"type": "error", "message": "Missing b64 field"}))
-            continue
+        await self.handle_audio(payload)
 
-        try:
-            audio_bytes = base64.b64decode(b64)
-        except Exception:
-            await websocket.send(json.dumps({"type": "error", "message": "Invalid base64 audio"}))
-            continue
+    async def handle_audio(self, payload: dict):
+        trace = payload.pop("_trace", None) or TurnTrace(self.session_id, self.flow.state)
+        if "_queued" in payload:
+            # Time the utterance waited behind the previous turn
+            trace.add_span("queue", payload.pop("_queued"), time.perf_counter())
 
-        tmp_path = None
+        profile = start_turn_profile(self.session_id, self.profiling)
+        bytes_before, encode_before = self.framer.bytes_sent, self.framer.encode_seconds
+        outcome = "error"
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-                tmp.write(audio_bytes)
-                tmp_path = tmp.name
-
-            # ✅ webrtcvad gate: ignore random/noise clips
-            if not wav_is_speech_by_webrtcvad(tmp_path, vad):
-                await websocket.send(json.dumps({"type": "vad", "value": "no_speech"}))
-                continue
-
-            # Transcribe (your WhisperService expects file path) :contentReference[oaicite:6]{index=6}
-            text = (agent.whisper.transcribe(tmp_path) or "").strip()
-            if not text:
-                await websocket.send(json.dumps({"type": "vad", "value": "empty_transcript"}))
-                continue
-
-            await websocket.send(json.dumps({"type": "user_text", "text": text}))
-
-            # ✅ IMPORTANT: use your extractor so “my name is shahid” becomes “shahid”
-            # matches your logic in run(): :contentReference[oaicite:7]{index=7}
-            state = flow.state
+            outcome = await self.run_turn(payload, trace)
+        except Busy:
+            outcome = "busy"
+            raise
+        finally:
+            # Bytes and encoding time are counted when a frame is built: build the batch
+            # still collecting this turn's last events (agent_speaking, lead) now
+            self.framer.flush()
+            framing = "batch" if self.framer.batching else "json"
+            bytes_sent = self.framer.bytes_sent - bytes_before
+            encode_seconds = self.framer.encode_seconds - encode_before
+            trace.count("bytes_sent", bytes_sent)
+            trace.count("encode_cpu_ms", round(encode_seconds * 1000, 3))
+            TURN_BYTES_SENT.observe(bytes_sent, framing)
+            TURN_ENCODE_SECONDS.observe(encode_seconds, framing)
+            trace.finish(outcome)
+            if self.speculation is not None:
+                # The turn ended before its reply (empty transcript, stale, error)
+                self.speculation.discard()
+                self.speculation = None
+            self.release_payload(payload)
+            if profile is not None:
+                profile.stop(outcome)
+
+    async def run_turn(self, payload: dict, trace: TurnTrace) -> str:
+        """
+        One caller utterance -> reply. Returns the turn outcome for the trace.
+        """
+        self.turn_cancel = threading.Event()
+
+        if self.is_stale(payload):
+            await self.send({"type": "vad", "value": "stale_dropped"})
+            return "stale_dropped"
+
+        if "pcm" in payload:
+            pcm = payload["pcm"]  # streamed chunks, already 16 kHz mono
+        else:
+            b64 = payload.pop("b64", None)
+            if not b64:
+                await self.send({"type": "error", "message": "Missing b64 field"})
+                return "invalid"
+
+            with trace.span("decode"):
+                try:
+                    audio_bytes = base64.b64decode(b64)
+                except Exception:
+                    await self.send({"type": "error", "message": "Invalid base64 audio"})
+                    return "invalid"
+
+                try:
+                    samples, rate = decode_wav(audio_bytes)
+                except (wave.Error, EOFError, ValueError):
+                    await self.send({"type": "error", "message": "Invalid WAV audio"})
+                    return "invalid"
+                # Any rate / channel count -> 16 kHz mono, so the VAD gate always runs
+                pcm = to_pipeline_pcm(samples, rate)
+                del b64, audio_bytes, samples  # only the 16 kHz PCM is needed from here on
+            if len(pcm) > MAX_UTTERANCE_SAMPLES:
+                # ⏱️ Same limit as streamed input: only the first MAX_UTTERANCE_SECONDS are used
+                pcm = pcm[:MAX_UTTERANCE_SAMPLES].copy()
+                await self.send({"type": "vad", "value": "max_duration"})
+            self.memory.charge("pcm", pcm.nbytes)
+            payload.setdefault("_held", []).append(("pcm", pcm.nbytes))
+
+        # ✅ webrtcvad gate: ignore random/noise clips
+        with trace.span("vad"):
+            speech = speech_for_asr(pcm, self.vad, self.endpointing)
+        if len(speech) == 0:
+            await self.send({"type": "vad", "value": "no_speech"})
+            return "no_speech"
+
+        # 🔮 The next prompt is often known already: render it while Whisper runs
+        self.speculate()
+
+        # Transcribe straight from memory (no temp file) :contentReference[oaicite:6]{index=6}
+        with trace.span("asr"):
+            # A retried or resent utterance doesn't need an ASR slot
+            whisper = self.agent.whisper
+            key = transcript_key(speech, whisper.profile)
+            text = TRANSCRIPTS.get(key)
+            if text is not None:
+                trace.mark("asr_cached")
+            else:
+                text = await STAGES["asr"].run(transcribe_timed, whisper, speech)
+                remember(key, text)
+        text = (text or "").strip()
+        if not text:
+            await self.send({"type": "vad", "value": "empty_transcript"})
+            return "empty_transcript"
+
+        if self.is_stale(payload):
+            await self.send({"type": "vad", "value": "stale_dropped"})
+            return "stale_dropped"
+
+        await self.send({"type": "user_text", "text": text})
+        self.add_history("u", text)
+
+        # ✅ IMPORTANT: use your extractor so “my name is shahid” becomes “shahid”
+        # matches your logic in run(): :contentReference[oaicite:7]{index=7}
+        agent, flow = self.agent, self.flow
+        state = flow.state
+        with trace.span("extract"):
             if state == "ask_name":
                 text = agent.extract_name(text)  # :contentReference[oaicite:8]{index=8}
             elif state == "ask_company":
@@ -168,32 +754,68 @@ async def handler(websocket):
                 text = agent.extract_interest(text)  # :contentReference[oaicite:11]{index=11}
 
             agent_reply = flow.next_prompt(text)
+        self.add_history("a", agent_reply)
+        self.save()
 
-            await websocket.send(json.dumps({"type": "state", "value": flow.state}))
-            await websocket.send(json.dumps({"type": "agent_text", "text": agent_reply}))
+        await self.send_state()
+        await self.speak(agent_reply, trace)
 
-            await websocket.send(json.dumps({"type": "agent_speaking", "value": True}))
-            await websocket.send(json.dumps({"type": "tts_audio", "mime": "audio/wav", "b64": wav_b64_from_text(agent, agent_reply)}))
-            await websocket.send(json.dumps({"type": "agent_speaking", "value": False}))
+        if flow.is_qualified():
+            lead = flow.get_lead_data()
+            save_lead(lead)
+            LEADS.inc()
+            await self.send({"type": "lead", "data": lead})
+        return "cancelled" if self.turn_cancel.is_set() else "ok"
 
-            if flow.is_qualified():
-                lead = flow.get_lead_data()
-                save_lead(lead)
-                await websocket.send(json.dumps({"type": "lead", "data": lead}))
 
-        except Exception as e:
-            await websocket.send(json.dumps({"type": "error", "message": str(e)}))
-        finally:
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    os.remove(tmp_path)
-                except Exception:
-                    pass
+async def handler(websocket):
+    global ACTIVE_SESSIONS
+    if ACTIVE_SESSIONS >= MAX_ACTIVE_SESSIONS:
+        await reject_busy(websocket)
+        return
+
+    ACTIVE_SESSIONS += 1
+    try:
+        await CallSession(websocket).run()
+    finally:
+        ACTIVE_SESSIONS -= 1
+
+
+def warm_prompt(text: str):
+    """
+    Synthesizes a prompt into TTS_AUDIO_CACHE for each WARMUP_TTS_CODECS output.
+    """
+    agent = new_agent()
+    for codec in WARMUP_TTS_CODECS.split(","):
+        tts_audio_message(agent, text, negotiate_output({"accept": [codec.strip()]}))
+
+    # A hedged request should find the fallback engine warm too
+    if isinstance(agent.tts, TTSRouter):
+        agent.tts.local.synthesize_to_memory(text)
+
+
+async def prepare():
+    """
+    Loads and warms the shared services; call before serve() so the process
+    only accepts calls once it is ready.
+    """
+    if WARMUP_ENABLED:
+        await warm_up(shared_services, warm_prompt, WARMUP_TTS_PROMPTS)
+
+
+def serve(reuse_port: bool = False):
+    """
+    websockets server for this process. With reuse_port=True several worker
+    processes can bind the same port (see supervisor.py).
+    """
+    return websockets.serve(handler, WS_HOST, WS_PORT, max_size=WS_MAX_MESSAGE_BYTES, reuse_port=reuse_port)
 
 
 async def main():
-    print("WebSocket server running on ws://localhost:8765")
-    async with websockets.serve(handler, "localhost", 8765, max_size=20 * 1024 * 1024):
+    await start_metrics_server(METRICS_PORT)
+    await prepare()
+    print(f"WebSocket server running on ws://{WS_HOST}:{WS_PORT}")
+    async with serve():
         await asyncio.Future()
 
 